@@ -1,10 +1,23 @@
 import streamlit as st
 import pandas as pd
-import pickle
-import plotly.graph_objects as go
-import plotly.express as px
+from contextlib import nullcontext
 from datetime import datetime
+from functools import partial
 import os
+import shutil
+import tempfile
+import time
+import weakref
+from churn_engine import (ID_COLUMN, NO_RISK_FACTORS, RECOMMENDATION_THRESHOLD, RISK_LABELS,
+                          TOP_DRIVERS, FeatureEncoder, FusedScorer, LookupScorer, PredictionCache,
+                          assign_risk_levels, find_risk_factors, impact_level, model_digest, recommend_retention, what_if)
+from churn_batch import (DEFAULT_CHUNKSIZE, FORMAT_EXTENSIONS, INPUT_FORMATS, MIME_TYPES, OUTPUT_FORMATS,
+                         ChunkReader, ResultIndex, ScoreSummary, attach_scores, detect_format, export_frame,
+                         model_columns, parallel_score_frame, read_frame, source_columns, stream_score)
+from churn_optimizer import ACTION_ECONOMICS, CHARGES_COLUMN, MONTHS_AFTER_TERM, RetentionPlanner, check_actions
+from churn_perf import PROFILE_EXTENSIONS, PROFILERS, RunProfile, stage
+from churn_registry import MAX_VERSIONS, MODELS_DIR, ModelRegistry
+from churn_store import STORE_PATH, ScoreStore
 
 #======== PAGE CONFIG ========
 st.set_page_config(
@@ -15,259 +28,16 @@ st.set_page_config(
 )
 
 #======== PREMIUM DESIGN SYSTEM ========
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Space+Grotesk:wght@500;700&display=swap');
-
-:root {
-    --primary-color: #6366f1;
-    --secondary-color: #8b5cf6;
-    --success-color: #10b981;
-    --danger-color: #ef4444;
-    --warning-color: #f59e0b;
-    --bg-dark: #0f172a;
-    --bg-card: rgba(30,41,59,0.5);
-    --text-primary: #f8fafc;
-    --text-secondary: #cbd5e1;
-    --border-color: rgba(148,163,184,0.1);
-}
-
-.stApp {
-    background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
-}
-html, body, [class*="css"], .stMarkdown {
-    font-family: 'Inter', sans-serif;
-    color: var(--text-primary);
-}
-
-#MainMenu, header, footer {visibility: hidden;}
-
-/* Hero */
-.hero-section {
-    text-align: center; 
-    padding: 2rem 0 3rem 0;
-    margin-bottom: 2rem;
-}
-.hero-title {
-    font-size: 3.5rem; 
-    font-weight: 700;
-    background: linear-gradient(135deg,#6366f1,#8b5cf6,#ec4899);
-    -webkit-background-clip: text; 
-    -webkit-text-fill-color: transparent;
-    margin-bottom: 1rem;
-}
-.hero-subtitle {
-    font-size: 1.2rem; 
-    color: var(--text-secondary);
-}
-
-/* Cards */
-.glass-card {
-    background: var(--bg-card); 
-    backdrop-filter: blur(18px);
-    padding: 1.7rem; 
-    border-radius: 20px;
-    border: 1px solid var(--border-color);
-    margin-bottom: 1.5rem;
-    box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-    transition: all 0.3s ease;
-}
-
-.glass-card:hover {
-    transform: translateY(-2px);
-    box-shadow: 0 12px 40px rgba(99, 102, 241, 0.2);
-}
-
-/* Buttons */
-.stButton > button {
-    background: linear-gradient(135deg,#6366f1,#8b5cf6);
-    border-radius: 12px; 
-    border: none; 
-    color: white;
-    padding: 0.75rem 1.5rem; 
-    font-size: 1.05rem;
-    font-weight: 600;
-    width: 100%;
-    transition: all 0.3s ease;
-    box-shadow: 0 4px 15px rgba(99, 102, 241, 0.4);
-}
-
-.stButton > button:hover {
-    transform: translateY(-2px);
-    box-shadow: 0 6px 25px rgba(99, 102, 241, 0.6);
-}
-
-/* Result Cards */
-.result-card-high-risk {
-    background: linear-gradient(135deg, rgba(239,68,68,0.1), rgba(220,38,38,0.1));
-    border: 2px solid var(--danger-color);
-    border-radius: 20px; 
-    padding: 2.5rem; 
-    text-align: center;
-    animation: pulse-danger 2s ease-in-out infinite;
-    margin: 2rem 0;
-}
-
-.result-card-medium-risk {
-    background: linear-gradient(135deg, rgba(245,158,11,0.1), rgba(217,119,6,0.1));
-    border: 2px solid var(--warning-color);
-    border-radius: 20px; 
-    padding: 2.5rem; 
-    text-align: center;
-    animation: pulse-warning 2s ease-in-out infinite;
-    margin: 2rem 0;
-}
-
-.result-card-low-risk {
-    background: linear-gradient(135deg, rgba(16,185,129,0.1), rgba(5,150,105,0.1));
-    border: 2px solid var(--success-color);
-    border-radius: 20px; 
-    padding: 2.5rem; 
-    text-align: center;
-    animation: pulse-success 2s ease-in-out infinite;
-    margin: 2rem 0;
-}
-
-@keyframes pulse-danger {
-    0%, 100% { box-shadow: 0 0 20px rgba(239, 68, 68, 0.3); }
-    50% { box-shadow: 0 0 40px rgba(239, 68, 68, 0.5); }
-}
-
-@keyframes pulse-warning {
-    0%, 100% { box-shadow: 0 0 20px rgba(245, 158, 11, 0.3); }
-    50% { box-shadow: 0 0 40px rgba(245, 158, 11, 0.5); }
-}
-
-@keyframes pulse-success {
-    0%, 100% { box-shadow: 0 0 20px rgba(16, 185, 129, 0.3); }
-    50% { box-shadow: 0 0 40px rgba(16, 185, 129, 0.5); }
-}
-
-.result-icon {
-    font-size: 4rem;
-    margin-bottom: 1rem;
-}
-
-.result-title {
-    font-family: 'Space Grotesk', sans-serif;
-    font-size: 2.25rem;
-    font-weight: 700;
-    margin-bottom: 0.5rem;
-}
-
-.result-subtitle {
-    font-size: 1.1rem;
-    color: var(--text-secondary);
-    margin-bottom: 1.5rem;
-}
-
-.probability-display {
-    font-size: 3.5rem; 
-    font-weight: 700;
-    font-family: 'Space Grotesk', sans-serif;
-    margin: 1rem 0;
-}
-
-.section-header {
-    font-family: 'Space Grotesk', sans-serif;
-    font-size: 1.75rem; 
-    margin-bottom: 1.5rem; 
-    font-weight: 600;
-    color: var(--text-primary);
-    display: flex;
-    align-items: center;
-    gap: 0.75rem;
-}
-
-.section-header::before {
-    content: '';
-    width: 4px;
-    height: 28px;
-    background: linear-gradient(180deg, #6366f1, #8b5cf6);
-    border-radius: 2px;
-}
-
-/* Stat Cards */
-.stat-card {
-    background: var(--bg-card);
-    border-radius: 16px;
-    padding: 1.5rem;
-    border: 1px solid var(--border-color);
-    text-align: center;
-}
-
-.stat-value {
-    font-size: 2rem;
-    font-weight: 700;
-    font-family: 'Space Grotesk', sans-serif;
-    background: linear-gradient(135deg, #6366f1, #8b5cf6);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-}
-
-.stat-label {
-    font-size: 0.9rem;
-    color: var(--text-secondary);
-    margin-top: 0.5rem;
-}
-
-/* Risk Factors */
-.risk-factor {
-    display: flex;
-    align-items: center;
-    justify-content: space-between;
-    padding: 1rem;
-    background: rgba(30, 41, 59, 0.3);
-    border-radius: 12px;
-    margin-bottom: 0.75rem;
-    border-left: 3px solid var(--primary-color);
-}
-
-.risk-badge {
-    padding: 0.25rem 0.75rem;
-    border-radius: 20px;
-    font-size: 0.85rem;
-    font-weight: 600;
-}
-
-.risk-high { 
-    background: rgba(239, 68, 68, 0.2); 
-    color: #fca5a5;
-    border: 1px solid rgba(239, 68, 68, 0.3);
-}
-
-.risk-medium { 
-    background: rgba(245, 158, 11, 0.2); 
-    color: #fcd34d;
-    border: 1px solid rgba(245, 158, 11, 0.3);
-}
-
-.risk-low { 
-    background: rgba(16, 185, 129, 0.2); 
-    color: #6ee7b7;
-    border: 1px solid rgba(16, 185, 129, 0.3);
-}
-
-/* Alert boxes */
-.alert-error {
-    background: rgba(239, 68, 68, 0.1);
-    border: 1px solid rgba(239, 68, 68, 0.3);
-    border-radius: 12px;
-    padding: 1rem;
-    color: #fca5a5;
-    margin: 1rem 0;
-}
-
-.alert-info {
-    background: rgba(99, 102, 241, 0.1);
-    border: 1px solid rgba(99, 102, 241, 0.3);
-    border-radius: 12px;
-    padding: 1rem;
-    color: #a5b4fc;
-    margin: 1rem 0;
-}
-</style>
-""", unsafe_allow_html=True)
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "premium.css")
+
+
+@st.cache_resource
+def load_css(path=CSS_PATH):
+    """Read the design-system stylesheet once per process instead of on every rerun"""
+    with open(path, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
 
 #======== HERO ========
 st.markdown("""
@@ -279,61 +49,148 @@ st.markdown("""
 
 
 #======== LOAD MODEL ========
-@st.cache_resource
-def load_model():
-    """Load the trained model pipeline with error handling"""
-    try:
-        # Check if file exists
-        if not os.path.exists("churn_pipeline.pkl"):
-            st.error("⚠️ Model file 'churn_pipeline.pkl' not found!")
-            st.info("Please ensure the model file is in the same directory as this script.")
-            st.stop()
-        
-        with open("churn_pipeline.pkl", "rb") as f:
-            pipeline = pickle.load(f)
-        
-        # Validate pipeline structure
-        if not all(key in pipeline for key in ["model", "scaler", "columns"]):
-            st.error("⚠️ Invalid model file structure!")
-            st.stop()
-            
-        return pipeline["model"], pipeline["scaler"], pipeline["columns"]
-    
-    except Exception as e:
-        st.error(f"⚠️ Error loading model: {str(e)}")
-        st.stop()
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+AUTO_MODEL = "Newest (auto)"
+NO_SHADOW = "None"
 
-model, scaler, feature_cols = load_model()
+
+@st.cache_resource
+def load_registry():
+    """
+    Model versions shared by every session: the current model is loaded now, and files
+    dropped into models/ (or a replaced churn_model.npz / churn_pipeline.pkl) are loaded
+    in the background and picked up on the next rerun, without a restart
+    """
+    registry = ModelRegistry(os.path.join(APP_DIR, MODELS_DIR), default_directory=APP_DIR)
+    registry.refresh()
+    return registry.start()
+
+registry = load_registry()
+if registry.active is None:
+    st.error(f"⚠️ No model could be loaded from '{APP_DIR}' or '{MODELS_DIR}/'!")
+    for path, (_, message) in registry.errors.items():
+        st.info(f"{os.path.basename(path)}: {message}")
+    st.stop()
+
+# A session may pin a resident version (A/B) and score a second one in shadow, both by path;
+# versions evicted since fall back to the newest
+active_model = registry.get(st.session_state.get("model_choice")) or registry.active
+shadow_model = registry.get(st.session_state.get("shadow_model"))
+if shadow_model is active_model:
+    shadow_model = None
+model_labels = registry.labels
+
+
+def model_label(version):
+    """Name to show for a resident version; two files of one name are told apart by directory"""
+    return model_labels.get(version.path, version.name)
+scorer, feature_cols = active_model.scorer, active_model.feature_cols
+model_version = active_model.key
+
+
+@st.cache_resource(max_entries=MAX_VERSIONS)
+def load_prediction_cache(fingerprint):
+    """Single-customer LRU cache per model version, shared across sessions and rebuilt when the file changes"""
+    return PredictionCache(maxsize=1024)
+
+prediction_cache = load_prediction_cache(model_version)
+
+
+@st.cache_resource(max_entries=MAX_VERSIONS)
+def load_model_digest(fingerprint):
+    """Content hash of the model file, tagging the incremental score store"""
+    return model_digest(fingerprint[0])
+
+
+@st.cache_resource(max_entries=MAX_VERSIONS)
+def load_lookup_scorer(fingerprint, _fused):
+    """Log-odds table of a linear model version, built once and shared across sessions"""
+    return LookupScorer(_fused)
+
+
+def open_score_store(batch_scorer):
+    """Score store for incremental batch runs, kept next to the app"""
+    path = os.path.join(APP_DIR, STORE_PATH)
+    return ScoreStore(path, load_model_digest(model_version), batch_scorer, TOP_DRIVERS)
+
+
+def show_store_stats(store):
+    """Caption with how much of the batch the incremental store saved"""
+    note = " (new model, store rebuilt)" if store.invalidated else ""
+    st.caption(f"♻️ Reused {store.reused:,} stored scores, scored {store.scored:,} new or changed customers{note}")
+
+
+def score_customer(customer):
+    """(churn probability, key risk factors) for one customer from the form"""
+    encoded = load_encoder(feature_cols).transform_records([customer])
+    churn_prob = float(scorer.predict_proba(encoded)[0])
+    if isinstance(scorer, FusedScorer):
+        # The features that actually raised this customer's score, with their log-odds share
+        risk_factors = [(f"{label} (+{impact:.2f})", impact_level(impact))
+                        for label, impact in scorer.top_factors(encoded, 4)]
+    else:
+        risk_factors = find_risk_factors(customer)
+    return churn_prob, risk_factors or [NO_RISK_FACTORS]
+
+
+def score_shadow(customer):
+    """Churn probability of one customer under the session's shadow model"""
+    encoded = load_encoder(shadow_model.feature_cols).transform_records([customer])
+    return float(shadow_model.scorer.predict_proba(encoded)[0])
+
+
+def shadow_comparison(frame):
+    """Caption comparing the shadow model's scores of a scored batch with the active model's"""
+    with stage("shadow", len(frame)):
+        shadow = shadow_model.scorer.predict_proba(load_encoder(shadow_model.feature_cols).transform(frame))
+    shift = shadow.mean() - frame['Churn_Probability'].mean()
+    changed = (assign_risk_levels(shadow).codes != frame['Risk_Level'].cat.codes.to_numpy()).mean()
+    return (f"🌓 Shadow model {model_label(shadow_model)}: mean churn probability {shadow.mean():.1%} "
+            f"({shift * 100:+.1f} pts vs. {model_label(active_model)}), risk level differs for {changed:.1%} of customers")
+
+
+#======== WHAT-IF PANEL ========
+WHAT_IF_ROWS = 10
+
+
+def show_what_if(customer, pairs):
+    """Ranked table of the changes that would lower this customer's churn probability the most"""
+    st.markdown('<div class="section-header">🔀 What-If Analysis</div>', unsafe_allow_html=True)
+    start = time.perf_counter()
+    baseline, variants = what_if(scorer, load_encoder(feature_cols), customer, pairs)
+    ms = (time.perf_counter() - start) * 1000
+    helpful = variants[variants["Reduction"] > 0]
+    st.caption(f"Scored {len(variants):,} counterfactual profiles in one batch in {ms:.1f} ms; "
+               f"{len(helpful):,} lower the churn probability from {baseline:.1%}")
+    if helpful.empty:
+        st.info("No single change" + (" or pair of changes" if pairs else "") + " lowers this customer's churn risk.")
+        return
+    st.dataframe(
+        helpful.head(WHAT_IF_ROWS).drop(columns="Changes"),
+        column_config={
+            "Churn_Probability": st.column_config.NumberColumn("Churn Probability", format="percent"),
+            "Risk_Level": "Risk Level",
+            "Reduction": st.column_config.NumberColumn("Reduction", format="percent"),
+        },
+        hide_index=True, use_container_width=True,
+    )
 
 
 #======== FIXED: PROPER ENCODING FUNCTION ========
+@st.cache_resource
+def load_encoder(feature_cols):
+    """Compile the fixed-schema encoder once per model column list"""
+    return FeatureEncoder(feature_cols)
+
+
 def prepare_input_for_model(raw_df, feature_cols):
     """
     Properly encode input data to match training format.
-    Handles both numeric and categorical columns correctly.
+    Numeric columns pass through, categorical columns are one-hot encoded
+    straight into a preallocated float32 matrix by the cached encoder.
     """
     try:
-        # Make a copy to avoid modifying original
-        df = raw_df.copy()
-        
-        # Identify numeric columns (these should NOT be one-hot encoded)
-        numeric_cols = ['tenure', 'MonthlyCharges', 'TotalCharges', 'SeniorCitizen']
-        
-        # Separate numeric and categorical columns
-        categorical_cols = [col for col in df.columns if col not in numeric_cols]
-        
-        # One-hot encode only categorical columns
-        df_encoded = pd.get_dummies(df, columns=categorical_cols, drop_first=False)
-        
-        # Ensure all expected columns are present
-        for col in feature_cols:
-            if col not in df_encoded.columns:
-                df_encoded[col] = 0
-        
-        # Ensure correct column order and select only required columns
-        df_encoded = df_encoded[feature_cols]
-        
-        return df_encoded
+        return load_encoder(feature_cols).transform_frame(raw_df)
     
     except Exception as e:
         st.error(f"Error in data preparation: {str(e)}")
@@ -343,6 +200,446 @@ def prepare_input_for_model(raw_df, feature_cols):
         raise e
 
 
+#======== BATCH HELPERS ========
+def show_column_check(columns, read_columns=None):
+    """Warn about missing model columns and list the ones the model ignores"""
+    missing_cols, passthrough_cols = load_encoder(feature_cols).check_columns(columns)
+    if missing_cols:
+        st.warning(f"⚠️ Missing model columns (scored as blank): {', '.join(missing_cols)}")
+    kept = [col for col in passthrough_cols if read_columns is None or col in read_columns]
+    skipped = [col for col in passthrough_cols if col not in kept]
+    if kept:
+        st.caption(f"Not used by the model, kept in the export: {', '.join(kept)}")
+    if skipped:
+        st.caption(f"Not used by the model, skipped on read: {', '.join(skipped)}")
+
+
+def risk_counts_html(rows, risk_counts):
+    """Compact stat cards for a running LOW/MEDIUM/HIGH tally"""
+    cards = [
+        ("🚨", f"{risk_counts['HIGH']:,}", "High Risk", "#ef4444"),
+        ("⚠️", f"{risk_counts['MEDIUM']:,}", "Medium Risk", "#f59e0b"),
+        ("✅", f"{risk_counts['LOW']:,}", "Low Risk", "#10b981"),
+        ("📊", f"{rows:,}", "Scored", "#f8fafc"),
+    ]
+    return "".join(f"""
+    <div class="stat-card" style="display:inline-block;width:23%;margin:0 1%;">
+        <div style="font-size: 2rem; margin-bottom: 0.5rem;">{icon}</div>
+        <div class="stat-value" style="color: {color};">{value}</div>
+        <div class="stat-label">{label}</div>
+    </div>
+    """ for icon, value, label, color in cards)
+
+
+def show_summary_cards(summary):
+    """High / medium / low risk counts and the average churn probability of a scored batch"""
+    cards = [
+        ("🚨", summary.risk_counts['HIGH'], "High Risk", "#ef4444"),
+        ("⚠️", summary.risk_counts['MEDIUM'], "Medium Risk", "#f59e0b"),
+        ("✅", summary.risk_counts['LOW'], "Low Risk", "#10b981"),
+        ("📊", f"{summary.mean:.1%}", "Avg Risk", None),
+    ]
+    for col, (icon, value, label, color) in zip(st.columns(4), cards):
+        style = f' style="color: {color};"' if color else ""
+        with col:
+            st.markdown(f"""
+            <div class="stat-card">
+                <div style="font-size: 2rem; margin-bottom: 0.5rem;">{icon}</div>
+                <div class="stat-value"{style}>{value}</div>
+                <div class="stat-label">{label}</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+
+def results_columns(frame):
+    """Columns of the detailed results table that the scored frame has"""
+    display_cols = [ID_COLUMN, 'Churn_Probability', 'Risk_Level', 'tenure', 'MonthlyCharges', 'Contract',
+                    'Risk_Factors', 'Recommendations']
+    display_cols += [f'Driver_{rank}' for rank in range(1, TOP_DRIVERS + 1)]
+    return [col for col in display_cols if col in frame.columns]
+
+
+SESSION_DIR_PREFIX = "churn_"
+# Session directories left this long by a process that didn't exit cleanly are swept at startup
+STALE_SESSION_DIR_SECONDS = 24 * 3600
+
+
+class SessionDir:
+    """A session's temp directory, deleted when Streamlit drops the session and its state"""
+
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix=SESSION_DIR_PREFIX)
+        weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+
+
+@st.cache_resource
+def sweep_session_dirs(max_age=STALE_SESSION_DIR_SECONDS):
+    """Once per process: delete session directories untouched for `max_age` seconds"""
+    root = tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    for entry in os.scandir(root):
+        try:
+            if entry.name.startswith(SESSION_DIR_PREFIX) and entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            continue
+    return root
+
+sweep_session_dirs()
+
+
+def session_dir():
+    """Temp directory of this session's exports and profiles"""
+    if "export_dir" not in st.session_state:
+        st.session_state["export_dir"] = SessionDir()
+    path = st.session_state["export_dir"].path
+    # Recreated if a sweep by another process removed it while the session sat idle
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def replace_export(results, key, spec, path, write):
+    """
+    Path of results[key]'s file for `spec`, calling write(tmp_path) when
+    the spec changed. The file it replaces is deleted, so a session keeps
+    one export of each kind on disk.
+    """
+    previous_spec, previous_path = results.get(key, (None, None))
+    if previous_spec != spec or not os.path.exists(previous_path):
+        if previous_path and previous_path != path and os.path.exists(previous_path):
+            os.remove(previous_path)
+        write(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        results[key] = (spec, path)
+    return path
+
+
+def export_file(results, fmt, columns):
+    """
+    Path of the scored batch as a `fmt` file of `columns`. It is written to
+    the session's temp directory in chunks and reused until the format,
+    columns or results change. Call it from the script thread.
+    """
+    return replace_export(results, "export", (fmt, tuple(columns)),
+                          os.path.join(results["export_dir"], f"churn_predictions.{fmt}"),
+                          lambda tmp: export_frame(results["frame"], tmp, fmt, list(columns)))
+
+
+def read_export(path):
+    """
+    Contents of an export file, read when its download is clicked. Streamlit
+    keeps them in its in-memory media store, so a downloaded file is held
+    in memory once; until then only the file on disk exists.
+    """
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def stream_outputs(fmt):
+    """
+    Paths of a streamed run's scored file and target list in the session
+    directory. The previous streamed run's files are deleted first, so a
+    session keeps one run on disk.
+    """
+    for path in st.session_state.pop("stream_outputs", ()):
+        if os.path.exists(path):
+            os.remove(path)
+    paths = [os.path.join(session_dir(), f"streamed_{name}.{fmt}") for name in ("predictions", "retention_targets")]
+    st.session_state["stream_outputs"] = paths
+    return paths
+
+
+RESULTS_PAGE_SIZES = [25, 50, 100, 250]
+
+
+def show_results_table(index):
+    """Filters and one page of a ResultIndex, highest risk first; only that page is sent to the browser"""
+    frame = index.frame
+    filter_risk, filter_contract, filter_tenure = st.columns([2, 2, 3])
+    with filter_risk:
+        risk_levels = st.multiselect("Risk level", RISK_LABELS[::-1], default=RISK_LABELS[::-1], key="results_risk")
+    contracts = None
+    if 'Contract' in frame.columns:
+        options = list(frame['Contract'].cat.categories if frame['Contract'].dtype == "category"
+                       else frame['Contract'].dropna().unique())
+        with filter_contract:
+            contracts = st.multiselect("Contract", options, default=options)
+        contracts = None if len(contracts) == len(options) else contracts
+    tenure = None
+    if 'tenure' in frame.columns and frame['tenure'].notna().any():
+        low, high = int(frame['tenure'].min()), int(frame['tenure'].max())
+        if low < high:
+            with filter_tenure:
+                tenure = st.slider("Tenure (months)", low, high, (low, high))
+            tenure = None if tenure == (low, high) else tenure
+
+    mask = index.mask(risk_levels=None if len(risk_levels) == len(RISK_LABELS) else risk_levels,
+                      contracts=contracts, tenure=tenure)
+    matches = index.count(mask)
+
+    col_size, col_page = st.columns([1, 1])
+    with col_size:
+        page_size = st.selectbox("Rows per page", RESULTS_PAGE_SIZES, index=1, key="results_page_size")
+    pages = max(-(-matches // page_size), 1)
+    # A narrower filter can leave the remembered page past the end
+    if st.session_state.get("results_page", 1) > pages:
+        st.session_state["results_page"] = 1
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=pages, key="results_page")
+
+    # Ranking the page and serializing it for the browser
+    with stage("table") as timed:
+        rows = index.page(page - 1, page_size, mask)
+        st.dataframe(rows[results_columns(frame)], use_container_width=True, height=400)
+        timed.rows = len(rows)
+    first = (page - 1) * page_size
+    st.caption(f"Rows {min(first + 1, matches):,}–{first + len(rows):,} of {matches:,} matching customers "
+               f"(page {page:,} of {pages:,}, {len(index):,} scored), sorted by churn probability")
+
+
+#======== PERFORMANCE PANEL ========
+PROFILER_LABELS = {None: "None", "cprofile": "cProfile", "py-spy": "py-spy"}
+
+
+def batch_perf_run(profiler):
+    """RunProfile of this rerun of the batch view; a profile goes to a new file in the session directory"""
+    if profiler is None:
+        return RunProfile("batch")
+    handle, path = tempfile.mkstemp(suffix=PROFILE_EXTENSIONS[profiler], prefix="profile_", dir=session_dir())
+    os.close(handle)
+    try:
+        return RunProfile("batch", profiler, path)
+    except ValueError as e:
+        os.remove(path)
+        st.warning(f"⏱️ {e}")
+        return RunProfile("batch")
+
+
+def keep_perf_run(run, analyzed):
+    """Remember the run if it analyzed a batch, and delete the profiles of runs no longer shown"""
+    previous = st.session_state.get("perf_run")
+    kept = run if analyzed else previous
+    for other in (previous, run):
+        if other is not None and other is not kept and other.profile_path and os.path.exists(other.profile_path):
+            os.remove(other.profile_path)
+    st.session_state["perf_run"] = kept
+
+
+def show_performance_panel(run):
+    """Stage timings of the session's last batch analysis, with metrics and profile downloads"""
+    st.markdown('<div class="section-header">⏱️ Performance</div>', unsafe_allow_html=True)
+    if run is None:
+        st.caption("Analyze a batch to see where its time and memory go.")
+        return
+
+    peaks = "per stage" if run.per_stage_peaks else "process peak since start, per-stage peaks unavailable"
+    st.caption(f"Last analysis at {run.started:%H:%M:%S} UTC: {run.seconds:.2f} s, {run.staged_seconds:.2f} s of it "
+               f"in the stages below · peak memory {run.peak_rss / 2**20:,.0f} MiB ({peaks}). "
+               "Nested stages are listed as parent/child.")
+    st.dataframe(pd.DataFrame([{
+        "Stage": stats.name,
+        "Calls": stats.calls,
+        "Seconds": round(stats.seconds, 4),
+        "Rows": stats.rows,
+        "Rows/s": round(stats.rows_per_second) if stats.rows_per_second else None,
+        "Peak RSS (MiB)": round(stats.peak_rss / 2**20, 1),
+    } for stats in run.stages.values()]), hide_index=True, use_container_width=True)
+
+    stamp = run.started.strftime('%Y%m%d_%H%M%S')
+    col_json, col_prom, col_profile = st.columns(3)
+    with col_json:
+        st.download_button("📥 Metrics JSON", run.to_json(), file_name=f"churn_perf_{stamp}.json",
+                           mime="application/json", use_container_width=True)
+    with col_prom:
+        st.download_button("📥 Prometheus Text", run.to_prometheus(), file_name=f"churn_perf_{stamp}.prom",
+                           mime="text/plain", use_container_width=True)
+    if run.profile_path and os.path.exists(run.profile_path):
+        with col_profile, open(run.profile_path, "rb") as f:
+            st.download_button(f"📥 {PROFILER_LABELS[run.profiler]} Profile", f.read(),
+                               file_name=f"churn_profile_{stamp}{PROFILE_EXTENSIONS[run.profiler]}",
+                               mime="application/octet-stream", use_container_width=True,
+                               help="Open .prof files with snakeviz or `python -m pstats`, "
+                                    "speedscope files at speedscope.app")
+
+
+#======== RETENTION PLAN ========
+TARGETS_SHOWN = 100
+
+
+def retention_options():
+    """
+    The batch page's budget inputs as (budget, spec), where spec is the
+    hashable (actions, months after the contract term) a planner is built from; None
+    while planning is off or the action table is invalid
+    """
+    with st.expander("🎯 Retention Budget"):
+        enabled = st.checkbox("Pick the customers to target within a budget",
+                              help="Chooses who gets which recommended action so the budget saves "
+                                   "the most revenue at risk")
+        budget = st.number_input("Budget ($)", 0.0, 1e9, 10_000.0, step=1_000.0, disabled=not enabled)
+        after_term = st.number_input("Expected months after the contract term", 0, 120, MONTHS_AFTER_TERM,
+                                     disabled=not enabled,
+                                     help="How long a customer who doesn't churn is expected to stay once their "
+                                          "current contract term ends. Revenue at risk is churn probability x "
+                                          "monthly charges x (the rest of the term + this)")
+        edited = st.data_editor(
+            pd.DataFrame([(title, cost, uplift) for title, (cost, uplift) in ACTION_ECONOMICS.items()],
+                         columns=["Action", "Cost", "Uplift"]),
+            column_config={
+                "Cost": st.column_config.NumberColumn("Cost per customer ($)", min_value=0.01, format="$%.2f"),
+                "Uplift": st.column_config.NumberColumn("Uplift (share of churn risk removed)",
+                                                        min_value=0.0, max_value=1.0, format="%.2f"),
+            },
+            disabled=["Action"], hide_index=True, use_container_width=True, key="retention_actions",
+        )
+    if not enabled:
+        return None
+    try:
+        actions = check_actions({row.Action: (row.Cost, row.Uplift) for row in edited.itertuples()})
+    except (TypeError, ValueError) as e:
+        st.error(f"🎯 Retention actions: {e}")
+        return None
+    return budget, (tuple(actions.items()), int(after_term))
+
+
+def plannable(plan_options, columns):
+    """`plan_options`, or None with a warning when the batch has no MonthlyCharges to plan from"""
+    if plan_options is not None and CHARGES_COLUMN not in columns:
+        st.warning(f"🎯 No retention plan: the upload has no {CHARGES_COLUMN} column to value customers by")
+        return None
+    return plan_options
+
+
+def new_planner(spec):
+    """Empty RetentionPlanner for a retention_options() spec"""
+    actions, after_term = spec
+    return RetentionPlanner(dict(actions), after_term)
+
+
+def results_plan(results, budget, spec):
+    """Plan for an in-memory batch; its candidates are collected once per spec and kept with the results"""
+    planners = results.setdefault("planners", {})
+    if spec not in planners:
+        planners.clear()
+        with stage("plan", len(results["frame"])):
+            planners[spec] = new_planner(spec).update(results["frame"])
+    with stage("optimize", planners[spec].candidates):
+        return planners[spec].solve(budget)
+
+
+def targets_file(results, plan, fmt):
+    """Path of a plan's target list as a `fmt` file, written once and reused until the plan changes"""
+    return replace_export(results, "targets_export", (fmt, plan.budget, plan.spent, len(plan.targets)),
+                          os.path.join(results["export_dir"], f"retention_targets.{fmt}"),
+                          lambda tmp: export_frame(plan.targets, tmp, fmt))
+
+
+def show_retention_plan(plan, data, fmt):
+    """Spend and savings cards, the top of a RetentionPlan's target list, and its download from `data`"""
+    st.markdown('<div class="section-header">🎯 Retention Targets</div>', unsafe_allow_html=True)
+    roi = "–" if plan.return_on_spend is None else f"{plan.return_on_spend:,.1f}x"
+    cards = [
+        ("🎯", f"{len(plan.targets):,}", "Customers Targeted"),
+        ("💸", f"${plan.spent:,.0f}", f"Spent of ${plan.budget:,.0f}"),
+        ("💰", f"${plan.saved:,.0f}", "Revenue Saved"),
+        ("📈", roi, "Return per $"),
+    ]
+    for col, (icon, value, label) in zip(st.columns(4), cards):
+        with col:
+            st.markdown(f"""
+            <div class="stat-card">
+                <div style="font-size: 2rem; margin-bottom: 0.5rem;">{icon}</div>
+                <div class="stat-value">{value}</div>
+                <div class="stat-label">{label}</div>
+            </div>
+            """, unsafe_allow_html=True)
+    counts = ", ".join(f"{title} {count:,}" for title, count in plan.action_counts().items() if count)
+    # The greedy plan is within one action of the best any split of this budget could do
+    gap = plan.bound - plan.saved
+    st.caption(f"{plan.candidates:,} of {plan.rows:,} customers have a recommendation worth its cost; "
+               f"${plan.revenue_at_risk:,.0f} revenue at risk in the batch. "
+               + (f"At most ${gap:,.0f} more could be saved with this budget. " if gap >= 1 else "")
+               + (f"Actions: {counts}." if counts else ""))
+    if plan.targets.empty:
+        return
+    st.dataframe(plan.targets.head(TARGETS_SHOWN), hide_index=True, use_container_width=True)
+    st.download_button(
+        label=f"📥 Download Target List {fmt.upper()}",
+        data=data,
+        file_name=f"retention_targets_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}",
+        mime=MIME_TYPES[fmt],
+        use_container_width=True
+    )
+
+
+#======== CHARTS ========
+# Plotly is imported on first use so the form page never pays for it
+
+def probability_histogram(summary):
+    """Churn probability distribution of a scored batch, from its ScoreSummary's fixed bins"""
+    import plotly.express as px
+
+    edges, counts = summary.histogram()
+    fig_dist = px.bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        title='Churn Probability Distribution',
+        labels={'x': 'Churn Probability', 'y': 'count'},
+        color_discrete_sequence=['#6366f1']
+    )
+    fig_dist.update_traces(width=edges[1] - edges[0])
+    fig_dist.update_layout(
+        bargap=0,
+        paper_bgcolor='#0d1117',
+        plot_bgcolor='rgba(30, 41, 59, 0.3)',
+        font={'color': "#f8fafc", 'family': "Inter"},
+        title_font_size=16,
+        showlegend=False,
+        margin=dict(l=10, r=10, t=40, b=10)
+    )
+    return fig_dist
+
+
+def risk_pie(risk_counts):
+    """LOW / MEDIUM / HIGH share of a scored batch, from its risk level counts"""
+    import plotly.express as px
+
+    fig_pie = px.pie(
+        values=list(risk_counts.values()),
+        names=list(risk_counts),
+        title='Risk Level Distribution',
+        color=list(risk_counts),
+        color_discrete_map={
+            'LOW': '#10b981',
+            'MEDIUM': '#f59e0b',
+            'HIGH': '#ef4444'
+        }
+    )
+    fig_pie.update_layout(
+        paper_bgcolor='#0d1117',
+        plot_bgcolor='#0d1117',
+        font={'color': "#f8fafc", 'family': "Inter"},
+        title_font_size=16,
+        margin=dict(l=10, r=10, t=40, b=10)
+    )
+    return fig_pie
+
+
+def show_distribution(summary):
+    """Quantiles, histogram and risk pie of a scored batch, drawn from its ScoreSummary alone"""
+    st.caption(
+        f"Churn probability: median {summary.quantile(0.5):.1%} · 90th percentile {summary.quantile(0.9):.1%} · "
+        f"99th percentile {summary.quantile(0.99):.1%} · range {summary.minimum:.1%}–{summary.maximum:.1%}"
+    )
+    col_chart1, col_chart2 = st.columns(2)
+    # Building the figures and serializing them for the browser
+    with stage("charts"):
+        with col_chart1:
+            st.plotly_chart(probability_histogram(summary), use_container_width=True)
+        with col_chart2:
+            st.plotly_chart(risk_pie(summary.risk_counts), use_container_width=True)
+
+
 #======== SIDEBAR ========
 with st.sidebar:
     st.markdown('<div style="padding: 1rem;">', unsafe_allow_html=True)
@@ -365,6 +662,29 @@ with st.sidebar:
         <div style="font-size:1.8rem;font-weight:700;color:#10b981;">~80%</div>
     </div>
     """, unsafe_allow_html=True)
+    st.caption("⚡ Scoring engine: " + ("fused linear" if isinstance(scorer, FusedScorer) else "scikit-learn pipeline")
+               + f" · {model_label(active_model)}")
+    # Filled in at the end of the run so this rerun's lookup is counted
+    cache_stats_slot = st.empty()
+
+    st.markdown("### 🧠 Model Versions")
+    model_paths = [version.path for version in registry.versions]
+    # A version pinned in an earlier run may have been evicted since
+    for key, default in (("model_choice", AUTO_MODEL), ("shadow_model", NO_SHADOW)):
+        if st.session_state.get(key, default) not in [default] + model_paths:
+            st.session_state[key] = default
+    st.selectbox("Scoring model", [AUTO_MODEL] + model_paths, key="model_choice",
+                 format_func=lambda path: model_labels.get(path, path),
+                 help="Score this session with a resident version; by default the newest one in models/")
+    st.selectbox("Shadow model", [NO_SHADOW] + model_paths, key="shadow_model",
+                 format_func=lambda path: model_labels.get(path, path),
+                 help="Also score with this version and compare, without changing any results")
+    for version in registry.versions:
+        marker = "🟢" if version is active_model else "🌓" if version is shadow_model else "⚪"
+        st.caption(f"{marker} {model_label(version)} · loaded in {version.load_seconds * 1000:,.0f} ms · "
+                   f"{version.footprint / 2**10:,.1f} KB · since {datetime.fromtimestamp(version.loaded_at):%H:%M:%S}")
+    for path, (_, message) in registry.errors.items():
+        st.caption(f"⚠️ {os.path.basename(path)} failed to load: {message}")
     
     st.markdown("---")
     st.markdown("### ℹ️ About")
@@ -439,6 +759,13 @@ if mode == "🎯 Single Customer":
                                        float(charges * tenure), step=100.0)
         st.markdown("</div>", unsafe_allow_html=True)
 
+    with st.expander("🔀 What-If Options"):
+        what_if_panel = st.checkbox("Show what-if analysis", value=True,
+                                    help="Score every change to contract, billing and services in one pass "
+                                         "and rank them by how much they lower the churn probability")
+        what_if_pairs = st.checkbox("Include pairs of changes",
+                                    help="Also score every compatible combination of two changes")
+
     st.markdown("<br>", unsafe_allow_html=True)
     
     col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
@@ -449,7 +776,7 @@ if mode == "🎯 Single Customer":
         with st.spinner("🔄 Analyzing customer data..."):
             
             # Create input dataframe
-            raw = pd.DataFrame([{
+            customer = {
                 "gender": gender,
                 "SeniorCitizen": senior,
                 "Partner": partner,
@@ -469,13 +796,11 @@ if mode == "🎯 Single Customer":
                 "PaymentMethod": payment,
                 "MonthlyCharges": charges,
                 "TotalCharges": total_charges
-            }])
+            }
 
             try:
-                # Encode and scale
-                df_encoded = prepare_input_for_model(raw, feature_cols)
-                df_scaled = scaler.transform(df_encoded)
-                churn_prob = model.predict_proba(df_scaled)[0][1]
+                # Repeat profiles come straight from the cache; new ones are encoded and scored
+                churn_prob, risk_factors = prediction_cache.get_or_compute(customer, score_customer)
 
                 # Determine risk level
                 if churn_prob >= 0.7:
@@ -507,30 +832,14 @@ if mode == "🎯 Single Customer":
                     <div style="color: var(--text-secondary); font-size: 0.95rem;">Churn Probability</div>
                 </div>
                 """, unsafe_allow_html=True)
+                if shadow_model is not None:
+                    shadow_prob = score_shadow(customer)
+                    st.caption(f"🌓 Shadow model {model_label(shadow_model)}: {shadow_prob:.1%} "
+                               f"({(shadow_prob - churn_prob) * 100:+.1f} pts vs. {model_label(active_model)})")
 
                 # Risk factors analysis
                 st.markdown('<div class="section-header">🎯 Key Risk Factors</div>', unsafe_allow_html=True)
-                
-                risk_factors = []
-                
-                if contract == "Month-to-month":
-                    risk_factors.append(("Month-to-month contract", "HIGH"))
-                if tenure < 12:
-                    risk_factors.append(("Short tenure (<12 months)", "HIGH"))
-                if payment == "Electronic check":
-                    risk_factors.append(("Electronic check payment", "MEDIUM"))
-                if internet == "Fiber optic" and charges > 80:
-                    risk_factors.append(("High fiber optic charges", "MEDIUM"))
-                if online_security == "No":
-                    risk_factors.append(("No online security", "MEDIUM"))
-                if tech_support == "No":
-                    risk_factors.append(("No tech support", "MEDIUM"))
-                if senior == 1:
-                    risk_factors.append(("Senior citizen", "LOW"))
-                
-                if not risk_factors:
-                    risk_factors.append(("No major risk factors identified", "LOW"))
-                
+
                 col_risk1, col_risk2 = st.columns(2)
                 
                 with col_risk1:
@@ -542,6 +851,8 @@ if mode == "🎯 Single Customer":
                             <span class="risk-badge {badge_class}">{level}</span>
                         </div>
                         """, unsafe_allow_html=True)
+                    if isinstance(scorer, FusedScorer):
+                        st.caption("Exact contribution of each feature to the model's churn log-odds")
                 
                 with col_risk2:
                     # Customer metrics
@@ -562,41 +873,22 @@ if mode == "🎯 Single Customer":
                     """, unsafe_allow_html=True)
 
                 # Retention recommendations
-                if churn_prob >= 0.4:
+                if churn_prob >= RECOMMENDATION_THRESHOLD:
                     st.markdown('<div class="section-header">💡 Retention Recommendations</div>', unsafe_allow_html=True)
                     
-                    recommendations = []
-                    
-                    if contract == "Month-to-month":
-                        recommendations.append(("📋 Contract Upgrade", 
-                                              "Offer 15% discount to upgrade to 1-year or 2-year contract"))
-                    
-                    if tenure < 12:
-                        recommendations.append(("🎁 Welcome Package", 
-                                              "Provide onboarding support and loyalty rewards for first year"))
-                    
-                    if online_security == "No" or tech_support == "No":
-                        recommendations.append(("🛡️ Service Bundle", 
-                                              "Offer free trial of security and support services for 3 months"))
-                    
-                    if charges > 80:
-                        recommendations.append(("💰 Price Optimization", 
-                                              "Review pricing plan and offer customized package"))
-                    
-                    if payment == "Electronic check":
-                        recommendations.append(("💳 Payment Method", 
-                                              "Incentivize automatic payment methods with $5/month discount"))
-                    
-                    for emoji_title, text in recommendations[:3]:
+                    for icon, title, text in recommend_retention(customer):
                         st.markdown(f"""
                         <div style="background: linear-gradient(135deg, rgba(99,102,241,0.05), rgba(139,92,246,0.05));
                              border: 1px solid rgba(99,102,241,0.2); border-radius: 16px; padding: 1.5rem; margin: 1rem 0;">
                             <div style="font-size: 1.1rem; font-weight: 600; color: var(--text-primary); 
-                                 margin-bottom: 0.75rem;">{emoji_title}</div>
+                                 margin-bottom: 0.75rem;">{icon} {title}</div>
                             <div style="color: var(--text-secondary); line-height: 1.6;">{text}</div>
                         </div>
                         """, unsafe_allow_html=True)
 
+                if what_if_panel:
+                    show_what_if(customer, what_if_pairs)
+
             except Exception as e:
                 st.markdown(f"""
                 <div class="alert-error">
@@ -607,8 +899,7 @@ if mode == "🎯 Single Customer":
                 """, unsafe_allow_html=True)
                 
                 with st.expander("🔍 Debug Information"):
-                    st.write("Input DataFrame shape:", raw.shape)
-                    st.write("Input columns:", raw.columns.tolist())
+                    st.write("Input fields:", list(customer))
                     st.write("Expected features:", len(feature_cols))
 
 
@@ -617,187 +908,259 @@ else:  # Batch Analysis Mode
 
     st.markdown("""
     <div class="alert-info">
-        📁 Upload a CSV file with customer data to analyze multiple customers at once.
+        📁 Upload a CSV, Parquet or Arrow file with customer data to analyze multiple customers at once.
         The file should contain the same columns as the training data.
     </div>
     """, unsafe_allow_html=True)
 
-    uploaded = st.file_uploader("Choose a CSV file", type="csv", 
-                                help="Upload a CSV with customer data")
-
-    if uploaded:
-        try:
-            df_batch = pd.read_csv(uploaded)
-            st.success(f"✅ Successfully loaded {len(df_batch)} customers")
-            
-            # Show preview
-            with st.expander("👁️ Preview Data"):
-                st.dataframe(df_batch.head(10), use_container_width=True)
-
-            if st.button("🔮 Analyze All Customers", use_container_width=True):
-                with st.spinner("🔄 Processing batch predictions..."):
-                    
-                    try:
-                        # Encode and scale
-                        df_encoded = prepare_input_for_model(df_batch, feature_cols)
-                        df_scaled = scaler.transform(df_encoded)
-                        predictions = model.predict_proba(df_scaled)[:, 1]
-
-                        # Add results to dataframe
-                        df_batch['Churn_Probability'] = predictions
-                        df_batch['Risk_Level'] = pd.cut(predictions,
-                                                        bins=[0, 0.4, 0.7, 1.0],
-                                                        labels=["LOW", "MEDIUM", "HIGH"])
-
-                        # Summary statistics
-                        st.markdown('<div class="section-header">📊 Analysis Summary</div>', unsafe_allow_html=True)
-
-                        col1, col2, col3, col4 = st.columns(4)
+    uploaded = st.file_uploader("Choose a customer file",
+                                type=[ext.lstrip(".") for fmt in INPUT_FORMATS for ext in FORMAT_EXTENSIONS[fmt]],
+                                help="Upload a CSV, Parquet or Arrow IPC file with customer data")
+
+    with st.expander("⚡ Performance Options"):
+        workers = int(st.number_input("Worker processes", 1, os.cpu_count() or 1, 1,
+                                      help="Score row partitions in parallel across CPU cores"))
+        sparse_mode = st.checkbox("Sparse one-hot encoding",
+                                  disabled=not isinstance(scorer, FusedScorer),
+                                  help="Scores without materialising the dummy columns (linear models only)")
+        lookup_mode = st.checkbox("Lookup-table scoring",
+                                  disabled=not isinstance(scorer, FusedScorer) or sparse_mode,
+                                  help="Scores from a table of precomputed log-odds per combination of categories, "
+                                       "built once per model (linear models only, no churn drivers)")
+        lookup_mode = lookup_mode and isinstance(scorer, FusedScorer) and not sparse_mode
+        stream_mode = st.checkbox("Score in chunks without loading the whole file",
+                                  help="Reads, scores and writes the upload a chunk at a time")
+        chunk_size = st.number_input("Rows per chunk", 1_000, 1_000_000, DEFAULT_CHUNKSIZE, step=10_000)
+        output_format = st.selectbox("Output format", OUTPUT_FORMATS)
+        # Only the fused scorer's drivers cost enough for reuse to beat rescoring
+        incremental = st.checkbox("Only rescore new and changed customers",
+                                  disabled=not isinstance(scorer, FusedScorer) or lookup_mode,
+                                  help="Reuses the stored score, drivers and recommendations of every customerID "
+                                       "whose inputs are unchanged since the last incremental run; a new model "
+                                       "rescores everyone (linear models only)")
+        incremental = incremental and isinstance(scorer, FusedScorer) and not lookup_mode
+        perf_panel = st.checkbox("Show performance panel",
+                                 help="Times every pipeline stage (read, encode, predict, rules, charts, ...) "
+                                      "with its rows/s and peak memory")
+        profiler = st.selectbox("Profiler", [None, *PROFILERS], format_func=PROFILER_LABELS.get,
+                                disabled=not perf_panel,
+                                help="Also profile the analysis: cProfile the script thread, or sample the whole "
+                                     "process and its workers with py-spy. Every rerun of this page is profiled "
+                                     "while one is selected, so expect it to be slower.")
+
+    plan_options = retention_options()
+
+    # Each rerun is timed when the panel is on; the panel shows the last one that analyzed a batch
+    perf_run = batch_perf_run(profiler) if perf_panel else None
+    analyzed = False
+    with perf_run or nullcontext():
+        if uploaded:
+            input_format = detect_format(uploaded.name)
+            # Uploads are projected onto the model's columns (+ customerID) on read
+            read_columns = model_columns(load_encoder(feature_cols))
+
+        batch_scorer = scorer
+        if lookup_mode:
+            batch_scorer = load_lookup_scorer(model_version, scorer)
+            batch_prepare = batch_scorer.prepare
+        elif sparse_mode:
+            batch_prepare = load_encoder(feature_cols).transform_sparse
+        elif workers > 1:
+            # Worker processes need a picklable encode step
+            batch_prepare = load_encoder(feature_cols).transform
+        else:
+            batch_prepare = lambda chunk: prepare_input_for_model(chunk, feature_cols)
 
-                        high_risk = (df_batch['Risk_Level'] == 'HIGH').sum()
-                        medium_risk = (df_batch['Risk_Level'] == 'MEDIUM').sum()
-                        low_risk = (df_batch['Risk_Level'] == 'LOW').sum()
-                        avg_prob = df_batch['Churn_Probability'].mean()
+        if uploaded and stream_mode:
+            try:
+                upload_columns = source_columns(uploaded, input_format)
+                show_column_check(upload_columns, read_columns)
+                uploaded.seek(0)
+                preview = next(iter(ChunkReader(uploaded, input_format, 10, read_columns))).head(10)
+                uploaded.seek(0)
+
+                with st.expander("👁️ Preview Data"):
+                    st.dataframe(preview, use_container_width=True)
+
+                analyzed = st.button("🔮 Analyze All Customers", use_container_width=True)
+                if analyzed:
+                    st.markdown('<div class="section-header">📊 Analysis Summary</div>', unsafe_allow_html=True)
+                    progress_bar = st.progress(0.0, text="🔄 Streaming batch predictions...")
+                    live_counts = st.empty()
+
+                    def show_progress(summary, fraction):
+                        if fraction is not None:
+                            progress_bar.progress(fraction, text=f"🔄 Scored {summary.rows:,} customers...")
+                        live_counts.markdown(risk_counts_html(summary.rows, summary.risk_counts), unsafe_allow_html=True)
+
+                    output_path, targets_path = stream_outputs(output_format)
+                    store = open_score_store(batch_scorer) if incremental else None
+                    plan_options = plannable(plan_options, upload_columns)
+                    planner = new_planner(plan_options[1]) if plan_options is not None else None
+                    summary = stream_score(
+                        uploaded, output_path, batch_prepare, batch_scorer,
+                        chunksize=int(chunk_size), fmt=output_format, on_chunk=show_progress,
+                        workers=workers, input_format=input_format, columns=read_columns, store=store,
+                        planner=planner
+                    )
+                    progress_bar.progress(1.0, text=f"✅ Scored {summary.rows:,} customers")
+                    live_counts.markdown(risk_counts_html(summary.rows, summary.risk_counts), unsafe_allow_html=True)
+                    if store is not None:
+                        show_store_stats(store)
+
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    show_distribution(summary)
+
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    # Read from the file only when clicked; Streamlit then holds it in memory once
+                    st.download_button(
+                        label=f"📥 Download Results {output_format.upper()}",
+                        data=partial(read_export, output_path),
+                        file_name=f"churn_predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{output_format}",
+                        mime=MIME_TYPES[output_format],
+                        use_container_width=True
+                    )
+
+                    if planner is not None:
+                        with stage("optimize", planner.candidates):
+                            plan = planner.solve(plan_options[0])
+                        export_frame(plan.targets, targets_path, output_format)
+                        show_retention_plan(plan, partial(read_export, targets_path), output_format)
 
-                        with col1:
-                            st.markdown(f"""
-                            <div class="stat-card">
-                                <div style="font-size: 2rem; margin-bottom: 0.5rem;">🚨</div>
-                                <div class="stat-value" style="color: #ef4444;">{high_risk}</div>
-                                <div class="stat-label">High Risk</div>
-                            </div>
-                            """, unsafe_allow_html=True)
+            except Exception as e:
+                st.markdown(f"""
+                <div class="alert-error">
+                    <strong>❌ Batch Processing Error</strong><br>
+                    {str(e)}<br><br>
+                    Please ensure your CSV has the correct columns.
+                </div>
+                """, unsafe_allow_html=True)
 
-                        with col2:
+        elif uploaded:
+            try:
+                # Scored results live in the session, so paging and filtering the
+                # table reruns the script without re-reading or rescoring the upload
+                batch_key = (getattr(uploaded, "file_id", uploaded.name), model_version)
+                results = st.session_state.get("batch_results")
+                if results is not None and results["key"] != batch_key:
+                    results = st.session_state["batch_results"] = None
+
+                # Only the model's source columns are encoded; IDs and extras pass through
+                upload_columns = source_columns(uploaded, input_format)
+                show_column_check(upload_columns, read_columns)
+                uploaded.seek(0)
+
+                df_batch = read_frame(uploaded, input_format, read_columns) if results is None else results["frame"]
+                st.success(f"✅ Successfully loaded {len(df_batch)} customers")
+
+                # Show preview
+                with st.expander("👁️ Preview Data"):
+                    st.dataframe(df_batch[[col for col in read_columns if col in df_batch.columns]].head(10),
+                                 use_container_width=True)
+
+                analyzed = st.button("🔮 Analyze All Customers", use_container_width=True)
+                if analyzed:
+                    with st.spinner("🔄 Processing batch predictions..."):
+                    
+                        try:
+                            if incremental:
+                                # Only new and changed customers are encoded and scored
+                                store = open_score_store(batch_scorer)
+                                store.score_frame(df_batch, batch_prepare, workers)
+                                store.save()
+                                show_store_stats(store)
+                            else:
+                                # Encode and score (across worker processes if configured)
+                                predictions, drivers = parallel_score_frame(df_batch, batch_prepare, batch_scorer,
+                                                                            workers, top_k=TOP_DRIVERS)
+
+                                # Add results, risk factors and recommendations to dataframe
+                                with stage("rules", len(df_batch)):
+                                    attach_scores(df_batch, predictions, drivers)
+
+                            # Summary statistics, aggregated in one pass; the cards and charts only read these
+                            with stage("summary", len(df_batch)):
+                                summary = ScoreSummary().update(df_batch['Churn_Probability'], df_batch['Risk_Level'])
+                            with stage("index", len(df_batch)):
+                                index = ResultIndex(df_batch)
+                            results = st.session_state["batch_results"] = {
+                                "key": batch_key,
+                                "frame": df_batch,
+                                "summary": summary,
+                                "index": index,
+                                "shadow": shadow_comparison(df_batch) if shadow_model is not None else None,
+                                "export_dir": session_dir(),
+                            }
+
+                        except Exception as e:
                             st.markdown(f"""
-                            <div class="stat-card">
-                                <div style="font-size: 2rem; margin-bottom: 0.5rem;">⚠️</div>
-                                <div class="stat-value" style="color: #f59e0b;">{medium_risk}</div>
-                                <div class="stat-label">Medium Risk</div>
+                            <div class="alert-error">
+                                <strong>❌ Batch Processing Error</strong><br>
+                                {str(e)}<br><br>
+                                Please ensure your CSV has the correct columns.
                             </div>
                             """, unsafe_allow_html=True)
+                        
+                            with st.expander("🔍 Debug Information"):
+                                st.write("DataFrame shape:", df_batch.shape)
+                                st.write("Columns in uploaded file:", df_batch.columns.tolist())
+                                st.write("Expected columns:", feature_cols[:10], "... (first 10 shown)")
+
+                if results is not None:
+                    st.markdown('<div class="section-header">📊 Analysis Summary</div>', unsafe_allow_html=True)
+                    show_summary_cards(results["summary"])
+                    if results["shadow"]:
+                        st.caption(results["shadow"])
+                    st.markdown("<br>", unsafe_allow_html=True)
+
+                    # Visualizations
+                    show_distribution(results["summary"])
+
+                    # Results table: one page of the highest-risk-first ranking at a time
+                    st.markdown('<div class="section-header">📋 Detailed Results</div>', unsafe_allow_html=True)
+                    show_results_table(results["index"])
+
+                    # Download button: exported to disk in chunks once per format and columns, read on click
+                    all_columns = list(results["frame"].columns)
+                    export_columns = st.multiselect("Export columns", all_columns, default=all_columns)
+                    st.download_button(
+                        label=f"📥 Download Results {output_format.upper()}",
+                        data=partial(read_export, export_file(results, output_format, export_columns))
+                        if export_columns else b"",
+                        file_name=f"churn_predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{output_format}",
+                        mime=MIME_TYPES[output_format],
+                        disabled=not export_columns,
+                        use_container_width=True
+                    )
+
+                    plan_options = plannable(plan_options, results["frame"].columns)
+                    if plan_options is not None:
+                        plan = results_plan(results, *plan_options)
+                        show_retention_plan(plan, partial(read_export, targets_file(results, plan, output_format)),
+                                            output_format)
 
-                        with col3:
-                            st.markdown(f"""
-                            <div class="stat-card">
-                                <div style="font-size: 2rem; margin-bottom: 0.5rem;">✅</div>
-                                <div class="stat-value" style="color: #10b981;">{low_risk}</div>
-                                <div class="stat-label">Low Risk</div>
-                            </div>
-                            """, unsafe_allow_html=True)
+            except Exception as e:
+                st.markdown(f"""
+                <div class="alert-error">
+                    <strong>❌ File Upload Error</strong><br>
+                    {str(e)}<br><br>
+                    Please ensure you're uploading a valid CSV, Parquet or Arrow file.
+                </div>
+                """, unsafe_allow_html=True)
 
-                        with col4:
-                            st.markdown(f"""
-                            <div class="stat-card">
-                                <div style="font-size: 2rem; margin-bottom: 0.5rem;">📊</div>
-                                <div class="stat-value">{avg_prob:.1%}</div>
-                                <div class="stat-label">Avg Risk</div>
-                            </div>
-                            """, unsafe_allow_html=True)
+    if perf_run is not None:
+        keep_perf_run(perf_run, analyzed)
+        show_performance_panel(st.session_state.get("perf_run"))
 
-                        st.markdown("<br>", unsafe_allow_html=True)
-
-                        # Visualizations
-                        col_chart1, col_chart2 = st.columns(2)
-
-                        with col_chart1:
-                            # Distribution histogram
-                            fig_dist = px.histogram(
-                                df_batch,
-                                x='Churn_Probability',
-                                nbins=30,
-                                title='Churn Probability Distribution',
-                                labels={'Churn_Probability': 'Churn Probability'},
-                                color_discrete_sequence=['#6366f1']
-                            )
-                            fig_dist.update_layout(
-                                paper_bgcolor='#0d1117',
-                                plot_bgcolor='rgba(30, 41, 59, 0.3)',
-                                font={'color': "#f8fafc", 'family': "Inter"},
-                                title_font_size=16,
-                                showlegend=False,
-                                margin=dict(l=10, r=10, t=40, b=10)
-                            )
-                            st.plotly_chart(fig_dist, use_container_width=True)
-
-                        with col_chart2:
-                            # Risk level pie chart
-                            risk_counts = df_batch['Risk_Level'].value_counts()
-                            fig_pie = px.pie(
-                                values=risk_counts.values,
-                                names=risk_counts.index,
-                                title='Risk Level Distribution',
-                                color=risk_counts.index,
-                                color_discrete_map={
-                                    'LOW': '#10b981',
-                                    'MEDIUM': '#f59e0b',
-                                    'HIGH': '#ef4444'
-                                }
-                            )
-                            fig_pie.update_layout(
-                                paper_bgcolor='#0d1117',
-                                plot_bgcolor='#0d1117',
-                                font={'color': "#f8fafc", 'family': "Inter"},
-                                title_font_size=16,
-                                margin=dict(l=10, r=10, t=40, b=10)
-                            )
-                            st.plotly_chart(fig_pie, use_container_width=True)
-
-                        # Results table
-                        st.markdown('<div class="section-header">📋 Detailed Results</div>', unsafe_allow_html=True)
-
-                        display_cols = []
-                        if 'customerID' in df_batch.columns:
-                            display_cols.append('customerID')
-                        display_cols += ['Churn_Probability', 'Risk_Level']
-                        
-                        if 'tenure' in df_batch.columns:
-                            display_cols.append('tenure')
-                        if 'MonthlyCharges' in df_batch.columns:
-                            display_cols.append('MonthlyCharges')
-                        if 'Contract' in df_batch.columns:
-                            display_cols.append('Contract')
-
-                        display_cols = [col for col in display_cols if col in df_batch.columns]
-
-                        st.dataframe(
-                            df_batch[display_cols].sort_values('Churn_Probability', ascending=False),
-                            use_container_width=True,
-                            height=400
-                        )
-
-                        # Download button
-                        csv = df_batch.to_csv(index=False)
-                        st.download_button(
-                            label="📥 Download Results CSV",
-                            data=csv,
-                            file_name=f"churn_predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                            mime="text/csv",
-                            use_container_width=True
-                        )
-
-                    except Exception as e:
-                        st.markdown(f"""
-                        <div class="alert-error">
-                            <strong>❌ Batch Processing Error</strong><br>
-                            {str(e)}<br><br>
-                            Please ensure your CSV has the correct columns.
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        with st.expander("🔍 Debug Information"):
-                            st.write("DataFrame shape:", df_batch.shape)
-                            st.write("Columns in uploaded file:", df_batch.columns.tolist())
-                            st.write("Expected columns:", feature_cols[:10], "... (first 10 shown)")
 
-        except Exception as e:
-            st.markdown(f"""
-            <div class="alert-error">
-                <strong>❌ File Upload Error</strong><br>
-                {str(e)}<br><br>
-                Please ensure you're uploading a valid CSV file.
-            </div>
-            """, unsafe_allow_html=True)
+#======== CACHE STATS ========
+cache_stats = prediction_cache.stats()
+hit_rate = "–" if cache_stats["hit_rate"] is None else f"{cache_stats['hit_rate']:.0%}"
+cache_stats_slot.caption(
+    f"🗂️ Prediction cache: {cache_stats['size']}/{cache_stats['maxsize']} profiles · "
+    f"{cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+    f"{cache_stats['evictions']} evictions · {hit_rate} hit rate"
+)
 
 
 # Footer
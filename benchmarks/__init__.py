@@ -0,0 +1 @@
+"""Performance benchmarks for the churn scoring pipeline (run with `python -m benchmarks.<name>`)."""
@@ -0,0 +1,70 @@
+"""
+Model load time and parity: the pickled pipeline vs. the .npz artifact.
+
+    python -m benchmarks.bench_artifact [rows]
+
+Loads each model file with churn_engine.open_model() in a fresh
+interpreter and reports the time from a bare interpreter to a ready
+scorer, and whether sklearn had to be imported. Then scores `rows`
+synthetic customers with the artifact and with the pickled scaler and
+model's own predict_proba and reports the largest difference. Export
+the artifact first with `python churn_artifact.py`.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks.synthetic import make_customers
+from churn_engine import (ARTIFACT_PATH, MODEL_PATH, FeatureEncoder, PipelineScorer, build_scorer,
+                          load_artifact, load_pipeline)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_ms(path, repeats=5):
+    """
+    Best (ms to import churn_engine, ms to load `path` into a scorer) over
+    fresh interpreters, and whether loading imported sklearn
+    """
+    code = f"""
+import json, sys, time
+start = time.perf_counter()
+from churn_engine import open_model
+imported = time.perf_counter()
+open_model({path!r})
+print(json.dumps({{"import": (imported - start) * 1000, "load": (time.perf_counter() - imported) * 1000,
+                  "sklearn": "sklearn" in sys.modules}}))
+"""
+    runs = [json.loads(subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True,
+                                      text=True, check=True, cwd=ROOT).stdout.strip().splitlines()[-1])
+            for _ in range(repeats)]
+    return min(run["import"] for run in runs), min(run["load"] for run in runs), runs[0]["sklearn"]
+
+
+def main(n_rows=100_000):
+    pickled, artifact = os.path.join(ROOT, MODEL_PATH), os.path.join(ROOT, ARTIFACT_PATH)
+    if not os.path.exists(artifact):
+        sys.exit(f"{artifact} not found: run `python churn_artifact.py` first")
+
+    print(f"{'model file':<20} {'bytes':>7} {'import ms':>10} {'load ms':>8}  sklearn imported")
+    for path in (pickled, artifact):
+        import_ms, ms, sklearn = load_ms(path)
+        print(f"{os.path.basename(path):<20} {os.path.getsize(path):>7,} {import_ms:>10.1f} {ms:>8.1f}  {sklearn}")
+
+    model, scaler, feature_cols = load_pipeline(pickled)
+    scorer, manifest = load_artifact(artifact)
+    encoded = FeatureEncoder(feature_cols).transform(make_customers(n_rows))
+    probabilities = scorer.predict_proba(encoded)
+    # predict_proba scales the float32 encoded block in float32, the fused scorers work in float64
+    sklearn_error = np.max(np.abs(probabilities - PipelineScorer(scaler, model, feature_cols).predict_proba(encoded)))
+    fused_error = np.max(np.abs(probabilities - build_scorer(model, scaler, feature_cols).predict_proba(encoded)))
+    print(f"parity on {n_rows:,} synthetic customers (artifact from sklearn {manifest['sklearn_version']}): "
+          f"max |probability difference| {sklearn_error:.1e} vs. predict_proba, "
+          f"{fused_error:.1e} vs. the pickle's fused scorer")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
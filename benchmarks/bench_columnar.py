@@ -0,0 +1,62 @@
+"""
+End-to-end stream_score() throughput for CSV vs. Parquet vs. Arrow IPC.
+
+    python -m benchmarks.bench_columnar [rows] [chunksize]
+
+Writes the same synthetic customers in each format, then times read +
+encode + score + write with input and output in that format. Inputs
+are projected onto the model's columns plus customerID, as the app and
+CLI do.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from benchmarks.synthetic import make_customers
+from churn_batch import INPUT_FORMATS, model_columns, stream_score
+from churn_engine import FeatureEncoder, build_scorer, load_pipeline
+
+
+def write_input(frame, path, fmt):
+    if fmt == "csv":
+        frame.to_csv(path, index=False)
+    elif fmt == "parquet":
+        frame.to_parquet(path, index=False)
+    else:
+        feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), path,
+                              compression="uncompressed", chunksize=64 * 1024)
+
+
+def main(n_rows=1_000_000, chunksize=50_000):
+    model, scaler, feature_cols = load_pipeline()
+    encoder = FeatureEncoder(feature_cols)
+    scorer = build_scorer(model, scaler, feature_cols)
+    raw = make_customers(n_rows)
+    columns = model_columns(encoder)
+
+    print(f"{n_rows:,} rows, {chunksize:,} per chunk")
+    print(f"{'format':>8} {'input':>10} {'seconds':>9} {'rows/sec':>12} {'speedup':>8}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in INPUT_FORMATS:
+            src, dst = os.path.join(tmp, f"in.{fmt}"), os.path.join(tmp, f"out.{fmt}")
+            write_input(raw, src, fmt)
+
+            start = time.perf_counter()
+            stream_score(src, dst, encoder.transform, scorer, chunksize=chunksize,
+                         fmt=fmt, input_format=fmt, columns=columns)
+            elapsed = time.perf_counter() - start
+
+            baseline = baseline or elapsed
+            size = os.path.getsize(src) / 2**20
+            print(f"{fmt:>8} {size:>7.1f}MiB {elapsed:>9.2f} {n_rows / elapsed:>12,.0f} "
+                  f"{baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
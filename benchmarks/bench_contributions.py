@@ -0,0 +1,40 @@
+"""
+Cost of the per-row churn driver breakdown next to scoring itself.
+
+    python -m benchmarks.bench_contributions [rows] [k]
+
+Times FusedScorer.predict_proba and top_contributions on the same
+encoded synthetic batch, and checks that the contributions plus the
+model's intercept reproduce its log-odds.
+"""
+import sys
+
+import numpy as np
+
+from benchmarks.bench_encoder import best_of
+from benchmarks.synthetic import make_customers
+from churn_engine import FeatureEncoder, FusedScorer, load_pipeline
+
+
+def main(n_rows=2_000_000, k=3):
+    model, scaler, feature_cols = load_pipeline()
+    scorer = FusedScorer.from_pipeline(model, scaler, feature_cols)
+    encoded = FeatureEncoder(feature_cols).transform(make_customers(n_rows))
+
+    sample = encoded[:10_000].astype(np.float64)
+    error = np.max(np.abs(scorer.contributions(sample).sum(axis=1) + model.intercept_[0]
+                          - scorer.decision_function(sample)))
+    print(f"{n_rows:,} rows, top {k}; max |sum(contributions) + b - log-odds| = {error:.1e}")
+
+    print(f"{'step':<20} {'seconds':>9} {'rows/sec':>12}")
+    for name, fn in [
+        ("predict_proba", lambda: scorer.predict_proba(encoded)),
+        ("top_contributions", lambda: scorer.top_contributions(encoded, k)),
+    ]:
+        elapsed, _ = best_of(fn)
+        print(f"{name:<20} {elapsed:>9.3f} {n_rows / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
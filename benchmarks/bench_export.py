@@ -0,0 +1,81 @@
+"""
+Peak memory and time of exporting a scored batch for download.
+
+    python -m benchmarks.bench_export [rows]
+
+Builds a scored frame of synthetic customers in a fresh interpreter per
+variant, then measures the peak resident memory the export adds on top
+of the frame (Linux VmHWM, reset once the frame is built) and how long
+it takes:
+
+    to_csv    frame.to_csv(index=False), encoded for the download, as the
+              batch view used to build it
+    buffer    the whole frame through ResultWriter into an in-memory buffer
+    csv       churn_batch.export_frame() to a temporary file, in chunks
+    csv.gz    the same, gzip-compressed
+    parquet   the same, as Parquet
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+
+VARIANTS = {
+    "to_csv": "data = frame.to_csv(index=False).encode('utf-8'); size = len(data)",
+    "buffer": "buffer = io.BytesIO()\n"
+              "with ResultWriter(buffer, 'csv') as writer:\n"
+              "    writer.write(frame)\n"
+              "size = len(buffer.getvalue())",
+    "csv": "export_frame(frame, path, 'csv'); size = os.path.getsize(path)",
+    "csv.gz": "export_frame(frame, path, 'csv.gz'); size = os.path.getsize(path)",
+    "parquet": "export_frame(frame, path, 'parquet'); size = os.path.getsize(path)",
+}
+
+
+def measure(variant, n_rows, path):
+    """Seconds, peak MiB added and output bytes of one export"""
+    code = f"""
+import io, json, os, time, warnings
+warnings.filterwarnings("ignore")
+import numpy as np
+from benchmarks.synthetic import make_customers
+from churn_batch import ResultWriter, attach_scores, conform_inputs, export_frame
+
+def peak_kib():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+
+def reset_peak():
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+path = {path!r}
+frame = conform_inputs(make_customers({n_rows}))
+attach_scores(frame, np.random.default_rng(0).random(len(frame)))
+reset_peak()
+before = peak_kib()
+start = time.perf_counter()
+{VARIANTS[variant]}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "peak_mib": (peak_kib() - before) / 1024, "bytes": size}}))
+"""
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True,
+                            text=True, check=True, cwd=ROOT)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(n_rows=1_000_000):
+    print(f"{n_rows:,} scored rows")
+    print(f"{'export':<8} {'seconds':>8} {'peak MiB':>9} {'output MiB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for variant in VARIANTS:
+            result = measure(variant, n_rows, os.path.join(tmp, f"scored.{variant}"))
+            print(f"{variant:<8} {result['seconds']:>8.2f} {result['peak_mib']:>9.0f} "
+                  f"{result['bytes'] / 2**20:>11.1f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
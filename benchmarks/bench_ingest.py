@@ -0,0 +1,92 @@
+"""
+Memory and parse time of reading a batch CSV: inferred dtypes vs. the input schema.
+
+    python -m benchmarks.bench_ingest [rows]
+
+Writes synthetic customers in the Telco export layout, including the
+blank TotalCharges of customers with no bill yet, then reads the file in
+a fresh interpreter per variant:
+
+    inferred  pd.read_csv(path), as batch uploads used to be read
+    schema    churn_batch.read_frame() projected onto the model's columns:
+              text as `category`, compact numerics, blanks coerced
+
+and reports parse time, the frame's in-memory bytes per row and the
+peak resident memory the read added (Linux: VmHWM, which unlike
+ru_maxrss does not inherit the parent's peak across exec).
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import make_customers
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VARIANTS = {
+    "inferred": "pd.read_csv(path)",
+    "schema": "read_frame(path, 'csv', model_columns(FeatureEncoder(load_pipeline()[2])))",
+}
+
+
+def write_export(path, n_rows):
+    """Synthetic Telco export with TotalCharges blank wherever tenure is 0"""
+    raw = make_customers(n_rows)
+    raw["TotalCharges"] = raw["TotalCharges"].astype(str).where(raw["tenure"] > 0, " ")
+    raw.to_csv(path, index=False)
+
+
+def measure(variant, path):
+    """Parse seconds, bytes per row, peak RSS added and TotalCharges dtype of one read"""
+    code = f"""
+import json, time, warnings
+warnings.filterwarnings("ignore")
+import pandas as pd
+from churn_batch import model_columns, read_frame
+from churn_engine import FeatureEncoder, load_pipeline
+
+def peak_kib():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+
+path = {path!r}
+FeatureEncoder(load_pipeline()[2])
+before = peak_kib()
+start = time.perf_counter()
+frame = {VARIANTS[variant]}
+seconds = time.perf_counter() - start
+peak = peak_kib() - before
+print(json.dumps({{
+    "seconds": seconds,
+    "bytes_per_row": int(frame.memory_usage(deep=True).sum()) / len(frame),
+    "peak_mib": peak / 1024,
+    "total_charges": str(frame["TotalCharges"].dtype),
+}}))
+"""
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True,
+                            text=True, check=True, cwd=ROOT)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(n_rows=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "customers.csv")
+        write_export(path, n_rows)
+        size = os.path.getsize(path)
+        results = {variant: measure(variant, path) for variant in VARIANTS}
+
+    print(f"{n_rows:,} rows, {size / 2**20:.1f} MiB CSV ({size / n_rows:.0f} bytes/row on disk)")
+    print(f"{'read':<10} {'seconds':>8} {'bytes/row':>10} {'peak MiB':>9}  TotalCharges")
+    for variant, result in results.items():
+        print(f"{variant:<10} {result['seconds']:>8.2f} {result['bytes_per_row']:>10.0f} "
+              f"{result['peak_mib']:>9.0f}  {result['total_charges']}")
+    inferred, schema = results["inferred"], results["schema"]
+    print(f"schema read: {inferred['bytes_per_row'] / schema['bytes_per_row']:.1f}x fewer bytes/row, "
+          f"{inferred['peak_mib'] / schema['peak_mib']:.1f}x lower peak, "
+          f"{inferred['seconds'] / schema['seconds']:.1f}x faster parse")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,61 @@
+"""
+Lookup-table scoring vs. the scikit-learn pipeline and the fused scorer.
+
+    python -m benchmarks.bench_lookup [rows]
+
+Builds the LookupScorer table, reporting its build time and size, then
+scores `rows` synthetic customers end to end (prepare + predict) through
+the pickled scaler and model, the fused scorer and the lookup table, on
+plain-string frames as read from CSV and on compact categorical frames
+as conform_inputs() leaves them. Also checks the table against the
+pipeline on rows it can't cover (an unseen category and a non-0/1
+SeniorCitizen), which are scored through the fused fallback.
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_encoder import best_of
+from benchmarks.synthetic import make_customers
+from churn_engine import INPUT_COLUMNS, FeatureEncoder, FusedScorer, LookupScorer, PipelineScorer, load_pipeline
+
+
+def main(n_rows=1_000_000):
+    model, scaler, feature_cols = load_pipeline()
+    encoder = FeatureEncoder(feature_cols)
+    pipeline = PipelineScorer(scaler, model, feature_cols)
+    fused = FusedScorer.from_pipeline(model, scaler, feature_cols)
+
+    start = time.perf_counter()
+    lookup = LookupScorer(fused)
+    print(f"table: {lookup.table.size:,} entries ({lookup.nbytes / 2**20:.0f} MiB) "
+          f"built in {time.perf_counter() - start:.2f} s")
+
+    repeat = 1 if n_rows >= 1_000_000 else 3
+    print(f"{n_rows:,} rows")
+    print(f"{'input':<8} {'engine':<9} {'prepare s':>10} {'predict s':>10} {'rows/s':>12} {'max |diff|':>11}")
+    for label, compact in (("strings", False), ("compact", True)):
+        raw = make_customers(n_rows, compact=compact)[INPUT_COLUMNS]
+        expected = None
+        for name, prepare, scorer in (("sklearn", encoder.transform, pipeline),
+                                      ("fused", encoder.transform, fused),
+                                      ("lookup", lookup.prepare, lookup)):
+            t_prepare, prepared = best_of(lambda: prepare(raw), repeat)
+            t_predict, probabilities = best_of(lambda: scorer.predict_proba(prepared), repeat)
+            if expected is None:
+                expected = probabilities
+            print(f"{label:<8} {name:<9} {t_prepare:>10.3f} {t_predict:>10.3f} "
+                  f"{n_rows / (t_prepare + t_predict):>12,.0f} {np.max(np.abs(probabilities - expected)):>11.1e}")
+
+    # Rows outside the table's levels
+    odd = make_customers(1_000)[INPUT_COLUMNS]
+    odd.loc[::3, "PaymentMethod"] = "Crypto"
+    odd.loc[1::3, "SeniorCitizen"] = 2
+    fallback = np.max(np.abs(lookup.predict_proba(lookup.prepare(odd))
+                             - pipeline.predict_proba(encoder.transform(odd))))
+    print(f"fallback rows: max |diff| {fallback:.1e}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
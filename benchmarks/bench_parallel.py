@@ -0,0 +1,51 @@
+"""
+Scaling of parallel_score_frame with the number of worker processes.
+
+    python -m benchmarks.bench_parallel [rows] [workers ...]
+
+Reports encode + score throughput in rows/sec for each worker count,
+on inputs in the dtypes batch uploads are read in. Counts above
+os.cpu_count() are still run but cannot scale further. The forkserver
+the workers fork from is started before timing.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_customers
+from churn_batch import conform_inputs, parallel_score_frame
+from churn_engine import FeatureEncoder, build_scorer, load_pipeline
+
+
+def main(n_rows=2_000_000, worker_counts=(1, 2, 4, 8, 16)):
+    model, scaler, feature_cols = load_pipeline()
+    encoder = FeatureEncoder(feature_cols)
+    scorer = build_scorer(model, scaler, feature_cols)
+    raw = conform_inputs(make_customers(n_rows))
+
+    # Start the forkserver once, as a long-running app or CLI run would have
+    parallel_score_frame(raw.head(2), encoder.transform, scorer, 2)
+
+    print(f"{n_rows:,} rows on {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'rows/sec':>12} {'speedup':>8}")
+    reference = baseline = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        scores, _ = parallel_score_frame(raw, encoder.transform, scorer, workers)
+        rate = n_rows / (time.perf_counter() - start)
+
+        if reference is None:
+            reference, baseline = scores, rate
+        elif not np.allclose(scores, reference, rtol=0, atol=1e-12):
+            raise AssertionError(f"{workers} workers changed the scores")
+        print(f"{workers:>8} {rate:>12,.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    if len(args) > 1:
+        main(args[0], args[1:])
+    else:
+        main(*args)
@@ -0,0 +1,42 @@
+"""
+Peak memory of batch preparation on a raw Telco export.
+
+    python -m benchmarks.bench_prep_memory [rows ...]
+
+The export carries `customerID` (unique per row) and the raw `Churn`
+label. The old get_dummies path one-hot encoded both, allocating a
+rows x rows dummy block before discarding it; the schema-driven encoder
+only reads the model's source columns.
+"""
+import sys
+import tracemalloc
+
+from benchmarks.bench_encoder import legacy_prepare
+from benchmarks.synthetic import make_customers
+from churn_engine import FeatureEncoder, load_pipeline
+
+
+def peak_mib(fn):
+    """Peak traced allocation in MiB while running `fn`"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def main(sizes):
+    _, _, feature_cols = load_pipeline()
+    encoder = FeatureEncoder(feature_cols)
+
+    print(f"{'rows':>10} {'get_dummies':>12} {'encoder':>10}")
+    for n_rows in sizes:
+        raw = make_customers(n_rows)
+        old = peak_mib(lambda: legacy_prepare(raw, feature_cols))
+        new = peak_mib(lambda: encoder.transform(raw))
+        print(f"{n_rows:>10,} {old:>9.1f}MiB {new:>7.1f}MiB")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [5_000, 10_000, 20_000])
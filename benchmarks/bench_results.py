@@ -0,0 +1,70 @@
+"""
+Detailed results table cost: sorting and shipping the frame vs. a ResultIndex page.
+
+    python -m benchmarks.bench_results [rows ...]
+
+The old batch view sorted the whole scored frame by churn probability
+and handed it to st.dataframe, which serializes every row to Arrow for
+the browser. The ResultIndex ranks the top rows once and serves a page
+at a time. Reports the old sort + serialization, the index build, the
+first page, a filtered page and a page past the ranked top rows, and the
+bytes each sends to the browser.
+"""
+import sys
+import time
+
+import numpy as np
+import pyarrow as pa
+
+from benchmarks.synthetic import make_customers
+from churn_batch import RESULTS_TOP_N, ResultIndex, conform_inputs
+from churn_engine import assign_risk_levels
+
+DISPLAY_COLUMNS = ["customerID", "Churn_Probability", "Risk_Level", "tenure", "MonthlyCharges", "Contract",
+                   "Risk_Factors", "Recommendations"]
+PAGE_SIZE = 50
+
+
+def scored_frame(n_rows):
+    """Synthetic customers with random scores and the table's text columns"""
+    frame = conform_inputs(make_customers(n_rows))
+    probabilities = np.random.default_rng(1).beta(2, 2, n_rows)
+    frame["Churn_Probability"] = probabilities
+    frame["Risk_Level"] = assign_risk_levels(probabilities)
+    frame["Risk_Factors"] = "📅 Month-to-month contract | 🆕 New customer"
+    frame["Recommendations"] = "💰 Offer long-term contract discount"
+    return frame
+
+
+def payload(frame):
+    """Bytes of the Arrow table st.dataframe would send for `frame`"""
+    return pa.Table.from_pandas(frame, preserve_index=True).nbytes
+
+
+def timed(build):
+    start = time.perf_counter()
+    result = build()
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'sort+ship s':>11} {'payload':>9} {'index s':>8} {'page s':>7} "
+          f"{'filtered s':>10} {'deep s':>7} {'payload':>8}")
+    for n_rows in sizes:
+        frame = scored_frame(n_rows)
+        old_seconds, old_bytes = timed(lambda: payload(
+            frame[DISPLAY_COLUMNS].sort_values("Churn_Probability", ascending=False)))
+
+        index_seconds, index = timed(lambda: ResultIndex(frame))
+        page_seconds, page = timed(lambda: payload(index.page(0, PAGE_SIZE)[DISPLAY_COLUMNS]))
+        filtered_seconds, _ = timed(lambda: payload(index.page(
+            0, PAGE_SIZE, index.mask(["LOW"], ["Two year"], (12, 24)))[DISPLAY_COLUMNS]))
+        # A page beyond the ranked top rows partitions the remainder on demand
+        deep_page = RESULTS_TOP_N // PAGE_SIZE * 2
+        deep_seconds, _ = timed(lambda: payload(index.page(deep_page, PAGE_SIZE)[DISPLAY_COLUMNS]))
+        print(f"{n_rows:>10,} {old_seconds:>11.3f} {old_bytes / 2**20:>7.1f}MB {index_seconds:>8.3f} "
+              f"{page_seconds:>7.4f} {filtered_seconds:>10.4f} {deep_seconds:>7.3f} {page / 2**10:>6.0f}KB")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000])
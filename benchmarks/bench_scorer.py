@@ -0,0 +1,48 @@
+"""
+Fused closed-form scorer vs. scaler.transform + predict_proba.
+
+    python -m benchmarks.bench_scorer
+
+Reports single-customer latency, batch throughput and the largest
+probability difference between the two paths.
+"""
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_customers
+from churn_engine import FeatureEncoder, FusedScorer, PipelineScorer, load_pipeline
+
+
+def per_call(fn, number):
+    """Mean seconds per call over `number` calls"""
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def main():
+    model, scaler, feature_cols = load_pipeline()
+    encoder = FeatureEncoder(feature_cols)
+    sklearn_scorer = PipelineScorer(scaler, model, feature_cols)
+    fused = FusedScorer.from_pipeline(model, scaler, feature_cols)
+
+    # Single customer, encoded the way the app does it
+    row = encoder.transform_frame(make_customers(1))
+    row_matrix = row.to_numpy()
+    t_old = per_call(lambda: sklearn_scorer.predict_proba(row), 500)
+    t_new = per_call(lambda: fused.predict_proba(row_matrix), 20_000)
+    print(f"single row   sklearn {t_old * 1e6:>9.1f}us   fused {t_new * 1e6:>7.1f}us   {t_old / t_new:>6.0f}x")
+
+    for n_rows in (100_000, 1_000_000):
+        encoded = encoder.transform(make_customers(n_rows))
+        t_old = per_call(lambda: sklearn_scorer.predict_proba(encoded), 3)
+        t_new = per_call(lambda: fused.predict_proba(encoded), 3)
+        error = np.max(np.abs(sklearn_scorer.predict_proba(encoded) - fused.predict_proba(encoded)))
+        print(f"{n_rows:>10,} rows  sklearn {n_rows / t_old:>11,.0f}/s   fused {n_rows / t_new:>11,.0f}/s   "
+              f"max |diff| {error:.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Sparse one-hot scoring vs. the dense encoded matrix.
+
+    python -m benchmarks.bench_sparse [rows ...]
+
+Compares the size of the encoded representation, the peak memory and
+wall time of encode + score, and checks both paths agree.
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import make_customers
+from churn_engine import FeatureEncoder, FusedScorer, PipelineScorer, load_pipeline
+
+
+def run(fn):
+    """(seconds, peak traced MiB, result) of one call to `fn`"""
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        result = fn()
+        return seconds, tracemalloc.get_traced_memory()[1] / 2**20, result
+    finally:
+        tracemalloc.stop()
+
+
+def nbytes(encoded):
+    if isinstance(encoded, tuple):
+        numeric, onehot = encoded
+        return numeric.nbytes + onehot.data.nbytes + onehot.indices.nbytes + onehot.indptr.nbytes
+    return encoded.nbytes
+
+
+def main(sizes):
+    model, scaler, feature_cols = load_pipeline()
+    encoder = FeatureEncoder(feature_cols)
+    fused = FusedScorer.from_pipeline(model, scaler, feature_cols)
+    sklearn_scorer = PipelineScorer(scaler, model, feature_cols)
+
+    paths = {
+        "sklearn dense": (encoder.transform, sklearn_scorer),
+        "fused dense": (encoder.transform, fused),
+        "fused sparse": (encoder.transform_sparse, fused),
+    }
+
+    for n_rows in sizes:
+        raw = make_customers(n_rows)
+        print(f"\n{n_rows:,} rows")
+        print(f"{'path':>14} {'encoded':>10} {'peak':>10} {'time':>8}  max |diff|")
+        reference = None
+        for name, (encode, scorer) in paths.items():
+            size = nbytes(encode(raw)) / 2**20
+            seconds, peak, scores = run(lambda: scorer.predict_proba(encode(raw)))
+            reference = scores if reference is None else reference
+            error = np.max(np.abs(scores - reference))
+            print(f"{name:>14} {size:>7.1f}MiB {peak:>7.1f}MiB {seconds:>7.3f}s  {error:.1e}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000])
@@ -0,0 +1,94 @@
+"""
+Cold start and rerun timings of the Streamlit app.
+
+    python -m benchmarks.bench_startup [--reruns N] [--max-cold-ms MS] [--max-rerun-ms MS]
+
+Reports, each in a fresh interpreter, the import time of the app's
+heavy dependencies, then drives app_premium.py through Streamlit's
+AppTest: the first script run (module imports + model load + page build)
+and the median / worst script time of reruns that only change a form
+field. With --max-* thresholds it exits non-zero when a timing regresses
+past them, so it can gate CI. AppTest recompiles the script on every
+run where the server caches the bytecode, so rerun times are an upper
+bound.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app_premium.py")
+
+# Imported in a fresh interpreter each; times are cumulative (module + its dependencies)
+MODULES = ["streamlit", "pandas", "sklearn", "pyarrow", "plotly.express", "churn_engine", "churn_batch"]
+
+
+def import_ms(module):
+    """Milliseconds to import `module` in a fresh interpreter"""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print((time.perf_counter() - start) * 1000)"
+    )
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True,
+                            text=True, check=True, cwd=os.path.dirname(APP_PATH))
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def app_timings(reruns):
+    """First run and per-rerun script times of the app in a fresh interpreter"""
+    code = f"""
+import json, time, warnings
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file({APP_PATH!r}, default_timeout=120)
+start = time.perf_counter()
+at.run()
+cold = (time.perf_counter() - start) * 1000
+
+reruns = []
+for i in range({reruns}):
+    at.number_input[0].set_value(1 + i % 70)
+    start = time.perf_counter()
+    at.run()
+    reruns.append((time.perf_counter() - start) * 1000)
+print(json.dumps({{"cold": cold, "reruns": reruns, "plotly_express": "plotly.express" in __import__("sys").modules}}))
+"""
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True,
+                            text=True, check=True, cwd=os.path.dirname(APP_PATH))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the app's cold start and reruns.")
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--max-cold-ms", type=float)
+    parser.add_argument("--max-rerun-ms", type=float, help="limit on the median rerun")
+    args = parser.parse_args(argv)
+
+    print(f"{'import':<16} {'ms':>8}")
+    for module in MODULES:
+        print(f"{module:<16} {import_ms(module):>8.0f}")
+
+    timings = app_timings(args.reruns)
+    median, worst = statistics.median(timings["reruns"]), max(timings["reruns"])
+    print()
+    print(f"{'first run':<16} {timings['cold']:>8.0f} ms")
+    print(f"{'rerun median':<16} {median:>8.1f} ms")
+    print(f"{'rerun worst':<16} {worst:>8.1f} ms")
+    print(f"plotly.express imported by the form page: {'yes' if timings['plotly_express'] else 'no'}")
+
+    failures = []
+    if args.max_cold_ms is not None and timings["cold"] > args.max_cold_ms:
+        failures.append(f"first run {timings['cold']:.0f} ms > {args.max_cold_ms:.0f} ms")
+    if args.max_rerun_ms is not None and median > args.max_rerun_ms:
+        failures.append(f"median rerun {median:.1f} ms > {args.max_rerun_ms:.1f} ms")
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Peak memory of chunked streaming scoring vs. whole-file scoring.
+
+    python -m benchmarks.bench_streaming [rows ...]
+
+Writes synthetic CSVs of increasing size, then scores each one in a
+single read_csv / predict_proba call and with stream_score(). The
+streaming peak should stay flat as the input grows. (tracemalloc makes
+both paths slow, so only memory is reported.)
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import make_customers
+from churn_batch import score_chunk, stream_score
+from churn_engine import FeatureEncoder, PipelineScorer, load_pipeline
+
+
+def peak_mib(fn):
+    """Peak traced allocation in MiB while running `fn`"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def main(sizes, chunksize=50_000):
+    model, scaler, feature_cols = load_pipeline()
+    prepare = FeatureEncoder(feature_cols).transform_frame
+    scorer = PipelineScorer(scaler, model, feature_cols)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = os.path.join(tmp, "in.csv"), os.path.join(tmp, "out.csv")
+
+        print(f"{'rows':>10} {'whole-file':>12} {'streaming':>12}")
+        for n_rows in sizes:
+            make_customers(n_rows).to_csv(src, index=False)
+
+            def whole_file():
+                scored = score_chunk(pd.read_csv(src), prepare, scorer)
+                scored.to_csv(dst, index=False)
+
+            whole = peak_mib(whole_file)
+            streamed = peak_mib(lambda: stream_score(src, dst, prepare, scorer, chunksize=chunksize))
+            print(f"{n_rows:>10,} {whole:>9.1f}MiB {streamed:>9.1f}MiB")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [50_000, 100_000, 200_000])
@@ -0,0 +1,72 @@
+"""
+Batch summary cost: rescanning the scored frame vs. the running ScoreSummary.
+
+    python -m benchmarks.bench_summary [rows ...]
+
+The old batch view counted each risk level and the mean with separate
+passes over the frame and handed the whole frame to px.histogram, which
+ships every probability to the browser. The summary is aggregated once
+and the charts are drawn from its fixed bins. Reports the time to build
+the numbers and both figures and the size of their JSON payload.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from churn_batch import ScoreSummary
+from churn_engine import assign_risk_levels
+
+
+def rescan(frame):
+    """Summary numbers and figures the way the batch view used to build them"""
+    import plotly.express as px
+
+    counts = [(frame["Risk_Level"] == level).sum() for level in ("HIGH", "MEDIUM", "LOW")]
+    mean = frame["Churn_Probability"].mean()
+    histogram = px.histogram(frame, x="Churn_Probability", nbins=30)
+    value_counts = frame["Risk_Level"].value_counts()
+    pie = px.pie(values=value_counts.values, names=value_counts.index)
+    return counts, mean, [histogram, pie]
+
+
+def aggregated(frame):
+    """Summary numbers and figures from a ScoreSummary"""
+    import plotly.express as px
+
+    summary = ScoreSummary().update(frame["Churn_Probability"], frame["Risk_Level"])
+    edges, counts = summary.histogram()
+    histogram = px.bar(x=(edges[:-1] + edges[1:]) / 2, y=counts)
+    pie = px.pie(values=list(summary.risk_counts.values()), names=list(summary.risk_counts))
+    return summary.risk_counts, summary.mean, [histogram, pie]
+
+
+def measure(build, frame):
+    """(seconds to build and serialize the figures, payload bytes)"""
+    start = time.perf_counter()
+    _, _, figures = build(frame)
+    payload = sum(len(figure.to_json()) for figure in figures)
+    return time.perf_counter() - start, payload
+
+
+def main(sizes):
+    rng = np.random.default_rng(0)
+    # Warm up Plotly (imports, templates) so the first size is not charged for it
+    warmup = pd.DataFrame({"Churn_Probability": [0.5], "Risk_Level": assign_risk_levels(np.array([0.5]))})
+    measure(rescan, warmup)
+    measure(aggregated, warmup)
+
+    print(f"{'rows':>10} {'rescan s':>9} {'payload':>10} {'summary s':>10} {'payload':>9}")
+    for n_rows in sizes:
+        probabilities = rng.beta(2, 2, n_rows)
+        frame = pd.DataFrame({"Churn_Probability": probabilities,
+                              "Risk_Level": assign_risk_levels(probabilities)})
+        old_seconds, old_bytes = measure(rescan, frame)
+        new_seconds, new_bytes = measure(aggregated, frame)
+        print(f"{n_rows:>10,} {old_seconds:>9.3f} {old_bytes / 2**10:>8.0f}KB "
+              f"{new_seconds:>10.3f} {new_bytes / 2**10:>7.0f}KB")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
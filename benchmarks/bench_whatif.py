@@ -0,0 +1,72 @@
+"""
+What-if analysis latency: one batched call vs. one prediction per change.
+
+    python -m benchmarks.bench_whatif [customers]
+
+For each synthetic customer, scores every single change and every
+compatible pair with churn_engine.what_if(), and separately the way
+the form does it, encoding and scoring each changed profile on its own.
+Reports median and p99 milliseconds per customer for the pipeline and
+fused scorers, and the largest difference between the two methods.
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_customers
+from churn_engine import (INPUT_COLUMNS, FeatureEncoder, FusedScorer, PipelineScorer, attribute_changes,
+                          change_pairs, load_pipeline, what_if)
+
+
+def one_by_one(scorer, encoder, customer, pairs):
+    """{label: probability} of every variant, each encoded and scored separately"""
+    changes = attribute_changes(customer)
+    variants = list(changes)
+    if pairs:
+        variants += [(f"{changes[i][0]} + {changes[j][0]}", {**changes[i][1], **changes[j][1]})
+                     for i, j in zip(*change_pairs(changes))]
+    return {label: float(scorer.predict_proba(encoder.transform_records([{**customer, **change}]))[0])
+            for label, change in variants}
+
+
+def timed(fn, customers):
+    """(median ms, p99 ms) of fn(customer) over `customers`, and the last result"""
+    times = []
+    for customer in customers:
+        start = time.perf_counter()
+        result = fn(customer)
+        times.append((time.perf_counter() - start) * 1000)
+    return np.median(times), np.percentile(times, 99), result
+
+
+def main(n_customers=200):
+    model, scaler, feature_cols = load_pipeline()
+    encoder = FeatureEncoder(feature_cols)
+    customers = make_customers(n_customers)[INPUT_COLUMNS].to_dict("records")
+
+    print(f"{n_customers} customers")
+    print(f"{'scorer':<10} {'pairs':<6} {'variants':>8} {'batched p50/p99 ms':>19} {'one-by-one p50/p99 ms':>22}")
+    for name, scorer in [("pipeline", PipelineScorer(scaler, model, feature_cols)),
+                         ("fused", FusedScorer.from_pipeline(model, scaler, feature_cols))]:
+        for pairs in (False, True):
+            error, counts = 0.0, []
+
+            def batched(customer):
+                _, frame = what_if(scorer, encoder, customer, pairs)
+                counts.append(len(frame))
+                return frame
+
+            p50, p99, _ = timed(batched, customers)
+            slow_p50, slow_p99, _ = timed(lambda customer: one_by_one(scorer, encoder, customer, pairs),
+                                          customers[:20])
+            for customer in customers[:20]:
+                _, frame = what_if(scorer, encoder, customer, pairs)
+                expected = one_by_one(scorer, encoder, customer, pairs)
+                error = max(error, np.max(np.abs(frame["Churn_Probability"] - frame["Change"].map(expected))))
+            print(f"{name:<10} {str(pairs):<6} {np.mean(counts):>8.0f} {p50:>9.2f} / {p99:<7.2f} "
+                  f"{slow_p50:>11.2f} / {slow_p99:<8.2f}  max |difference| {error:.1e}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,88 @@
+"""
+Local load test for churn_service.py, with request batching on and off.
+
+    python -m benchmarks.load_test [--requests N] [--concurrency C]
+
+Starts the service in a subprocess for each configuration, fires
+concurrent POST /score requests and reports p50/p99 latency and
+throughput.
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import aiohttp
+import numpy as np
+
+from benchmarks.synthetic import make_customers
+from churn_engine import INPUT_COLUMNS
+
+
+CONFIGS = {
+    "batching off": ["--window-ms", "0"],
+    "batching on": ["--window-ms", "2", "--max-batch", "64"],
+}
+
+
+async def wait_until_up(session, url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Service at {url} did not start")
+
+
+async def run_load(url, customers, concurrency):
+    """Per-request latencies (seconds) and total wall time"""
+    latencies = []
+    queue = iter(customers)
+
+    async with aiohttp.ClientSession() as session:
+        await wait_until_up(session, url)
+
+        async def client():
+            for customer in queue:
+                start = time.perf_counter()
+                async with session.post(f"{url}/score", json=customer) as response:
+                    await response.read()
+                    response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return np.array(latencies), time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    customers = make_customers(args.requests)[INPUT_COLUMNS].to_dict("records")
+    url = f"http://127.0.0.1:{args.port}"
+
+    print(f"{args.requests:,} requests, {args.concurrency} concurrent clients")
+    print(f"{'config':>14} {'p50':>9} {'p99':>9} {'req/sec':>9}")
+    for name, flags in CONFIGS.items():
+        server = subprocess.Popen([sys.executable, "churn_service.py", "--port", str(args.port), *flags])
+        try:
+            latencies, wall = asyncio.run(run_load(url, customers, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait()
+
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{name:>14} {p50:>7.2f}ms {p99:>7.2f}ms {len(latencies) / wall:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
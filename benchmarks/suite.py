@@ -0,0 +1,336 @@
+"""
+Per-stage benchmark suite: batch throughput and single-row latency of the
+scoring pipeline, saved as JSON and compared against earlier runs.
+
+    python -m benchmarks.suite                                  # 1k to 1M rows
+    python -m benchmarks.suite --sizes 1k 1M 10M --repeats 1
+    python -m benchmarks.suite --baseline benchmarks/results/main.json
+    python -m benchmarks.suite --compare old.json new.json
+
+Customers come from benchmarks.synthetic, seeded, so every run scores the
+same rows. Batch mode runs the pipeline over each size, at most
+--block-rows rows at a time as the streaming path does. It reports each
+stage's total time, rows/s and the process's peak RSS:
+
+    encode    FeatureEncoder.transform, the encoder behind prepare_input_for_model
+    scale     the pickled pipeline's scaler (the fused scorer folds it in)
+    score     FusedScorer.predict_proba
+    drivers   the top churn drivers of each row
+    risk      assign_risk_levels
+    rules     risk factors and recommendations (retention_columns)
+    summary   ScoreSummary.update
+    export    ResultWriter in --export-format, including closing the file
+
+Latency mode runs the same stages on one customer at a time, as the form
+and the scoring service do, and reports the median and 99th percentile.
+
+Each run is written to benchmarks/results/<UTC time>.json (or -o) with
+the machine, library versions and git commit. Against a baseline file,
+a stage more than --threshold slower is flagged as a regression and the
+exit status is 1. Differences below a small noise floor are never
+flagged.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_customers
+from churn_batch import OUTPUT_FORMATS, ResultWriter, ScoreSummary
+from churn_engine import (INPUT_COLUMNS, MODEL_PATH, TOP_DRIVERS, FeatureEncoder, assign_risk_levels,
+                          build_scorer, load_pipeline, retention_columns)
+from churn_perf import peak_rss, reset_peak_rss
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+SUITE_FORMAT = 1
+MODES = ["batch", "latency"]
+STAGES = ["encode", "scale", "score", "drivers", "risk", "rules", "summary", "export"]
+DEFAULT_SIZES = ["1k", "10k", "100k", "1M"]
+# Metric compared across runs, and the smallest difference in it that can count as a change
+METRICS = {"batch": "seconds", "latency": "p50_us"}
+NOISE_FLOOR = {"batch": 0.002, "latency": 2.0}
+SUFFIXES = {"k": 10**3, "M": 10**6}
+
+
+def parse_rows(text):
+    """Row count of a size argument: 5000, 10k or 2.5M"""
+    multiplier = SUFFIXES.get(text[-1:], 1)
+    number = text[:-1] if text[-1:] in SUFFIXES else text
+    try:
+        return int(float(number) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a row count: {text!r}") from None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite",
+                                     description="Benchmark every scoring stage and compare with earlier runs.")
+    parser.add_argument("--sizes", nargs="+", type=parse_rows, default=[parse_rows(s) for s in DEFAULT_SIZES],
+                        help=f"batch sizes in rows, with k/M suffixes (default: {' '.join(DEFAULT_SIZES)})")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES, help="modes to run (default: both)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="batch runs per size; the fastest counts (default: 3)")
+    parser.add_argument("--samples", type=int, default=2000,
+                        help="single-row calls timed per stage in latency mode (default: 2000)")
+    parser.add_argument("--block-rows", type=parse_rows, default=1_000_000,
+                        help="rows per block in batch mode (default: 1M)")
+    parser.add_argument("--export-format", choices=OUTPUT_FORMATS, default="csv",
+                        help="format of the export stage (default: csv)")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic data seed (default: 0)")
+    parser.add_argument("--model", default=os.path.join(ROOT, MODEL_PATH),
+                        help="pickled pipeline; its scaler is timed separately (default: churn_pipeline.pkl)")
+    parser.add_argument("-o", "--output", help="results file (default: benchmarks/results/<UTC time>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare this run with")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two results files without running anything")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="slowdown that counts as a regression, as a fraction (default: 0.20)")
+    return parser.parse_args(argv)
+
+
+#======== STAGES ========
+class Pipeline:
+    """The encoder, the pickled pipeline's scaler and the fused scorer of a model"""
+
+    def __init__(self, path):
+        model, self.scaler, feature_cols = load_pipeline(path)
+        self.encoder = FeatureEncoder(feature_cols)
+        self.scorer = build_scorer(model, self.scaler, feature_cols)
+        self.feature_cols = list(feature_cols)
+
+    def scale(self, encoded):
+        return self.scaler.transform(pd.DataFrame(encoded, columns=self.feature_cols, copy=False))
+
+    def drivers(self, encoded):
+        return self.scorer.driver_columns(*self.scorer.top_contributions(encoded, TOP_DRIVERS))
+
+
+def time_batch(frame, pipeline, block_rows, export_format, path):
+    """{stage: (seconds, peak RSS)} over `frame`, run `block_rows` rows at a time"""
+    seconds = dict.fromkeys(STAGES, 0.0)
+    peaks = dict.fromkeys(STAGES, 0)
+
+    def timed(name, fn, *args):
+        reset_peak_rss()
+        start = time.perf_counter()
+        result = fn(*args)
+        seconds[name] += time.perf_counter() - start
+        peaks[name] = max(peaks[name], peak_rss())
+        return result
+
+    summary = ScoreSummary()
+    writer = ResultWriter(path, export_format)
+    for start in range(0, len(frame), block_rows):
+        block = frame.iloc[start:start + block_rows].copy()
+        encoded = timed("encode", pipeline.encoder.transform, block)
+        timed("scale", pipeline.scale, encoded)
+        probabilities = timed("score", pipeline.scorer.predict_proba, encoded)
+        drivers = timed("drivers", pipeline.drivers, encoded)
+        risk_levels = timed("risk", assign_risk_levels, probabilities)
+        risk_factors, recommendations = timed("rules", retention_columns, block, probabilities)
+
+        block["Churn_Probability"] = probabilities
+        block["Risk_Level"] = risk_levels
+        block["Risk_Factors"], block["Recommendations"] = risk_factors, recommendations
+        for name, column in drivers.items():
+            block[name] = column
+        timed("summary", summary.update, block["Churn_Probability"], block["Risk_Level"])
+        timed("export", writer.write, block)
+    timed("export", writer.close)
+    return {name: (seconds[name], peaks[name]) for name in STAGES}
+
+
+def time_latency(customers, pipeline, samples, export_format, warmup=50):
+    """{stage: per-call seconds} of scoring one customer at a time, cycling through `customers`"""
+    records = customers[INPUT_COLUMNS].to_dict("records")
+    rows = [customers.iloc[[i]].reset_index(drop=True) for i in range(len(customers))]
+    timings = {name: np.empty(samples) for name in STAGES}
+    clock = time.perf_counter
+
+    for i in range(-warmup, samples):
+        j = i % len(records)
+        summary = ScoreSummary()
+        t0 = clock()
+        encoded = pipeline.encoder.transform_records([records[j]])
+        t1 = clock()
+        pipeline.scale(encoded)
+        t2 = clock()
+        probabilities = pipeline.scorer.predict_proba(encoded)
+        t3 = clock()
+        drivers = pipeline.drivers(encoded)
+        t4 = clock()
+        risk_levels = assign_risk_levels(probabilities)
+        t5 = clock()
+        risk_factors, recommendations = retention_columns(rows[j], probabilities)
+        t6 = clock()
+        row = rows[j].assign(Churn_Probability=probabilities, Risk_Level=risk_levels, Risk_Factors=risk_factors,
+                             Recommendations=recommendations, **drivers)
+        t7 = clock()
+        summary.update(row["Churn_Probability"], row["Risk_Level"])
+        t8 = clock()
+        with ResultWriter(io.BytesIO() if export_format != "csv" else io.StringIO(), export_format) as writer:
+            writer.write(row)
+        t9 = clock()
+        if i >= 0:
+            for name, elapsed in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5, t8 - t7,
+                                              t9 - t8)):
+                timings[name][i] = elapsed
+    return timings
+
+
+#======== RUNS ========
+def git_commit():
+    """(short commit, uncommitted changes?) of the checkout, or (None, None) outside git"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def environment():
+    import sklearn
+
+    commit, dirty = git_commit()
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "git_commit": commit,
+        "git_dirty": dirty,
+    }
+
+
+def run_suite(args):
+    pipeline = Pipeline(args.model)
+    largest = max(args.sizes) if "batch" in args.modes else 0
+    customers = make_customers(max(largest, 1000), seed=args.seed, compact=True)
+    results = []
+
+    if "batch" in args.modes:
+        print(f"{'rows':>12} {'stage':<8} {'seconds':>9} {'rows/s':>13} {'peak MiB':>9}")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f"scored.{args.export_format}")
+            for n_rows in sorted(args.sizes):
+                frame = customers.iloc[:n_rows]
+                runs = [time_batch(frame, pipeline, args.block_rows, args.export_format, path)
+                        for _ in range(max(args.repeats, 1))]
+                for name in STAGES:
+                    seconds = min(run[name][0] for run in runs)
+                    peak = max(run[name][1] for run in runs)
+                    results.append({"mode": "batch", "stage": name, "rows": n_rows, "seconds": seconds,
+                                    "rows_per_second": n_rows / seconds if seconds else None,
+                                    "peak_rss_bytes": peak})
+                    print(f"{n_rows:>12,} {name:<8} {seconds:>9.4f} {n_rows / seconds:>13,.0f} {peak / 2**20:>9.0f}")
+
+    if "latency" in args.modes:
+        timings = time_latency(customers.iloc[:1000], pipeline, args.samples, args.export_format)
+        print(f"\n{'single row':<12} {'stage':<8} {'p50 µs':>9} {'p99 µs':>9} {'mean µs':>9}")
+        for name, seconds in timings.items():
+            p50, p99 = np.percentile(seconds, [50, 99]) * 1e6
+            results.append({"mode": "latency", "stage": name, "rows": 1, "samples": len(seconds),
+                            "p50_us": p50, "p99_us": p99, "mean_us": seconds.mean() * 1e6})
+            print(f"{'':<12} {name:<8} {p50:>9.1f} {p99:>9.1f} {seconds.mean() * 1e6:>9.1f}")
+
+    return {
+        "format": SUITE_FORMAT,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "config": {"sizes": sorted(args.sizes), "modes": args.modes, "repeats": args.repeats,
+                   "samples": args.samples, "block_rows": args.block_rows, "export_format": args.export_format,
+                   "seed": args.seed, "model": os.path.basename(args.model)},
+        "results": results,
+    }
+
+
+#======== COMPARISON ========
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        results = json.load(f)
+    if results.get("format") != SUITE_FORMAT:
+        raise ValueError(f"{path} is not a benchmark suite results file (format {SUITE_FORMAT})")
+    return results
+
+
+def compare(baseline, current, threshold):
+    """
+    (mode, stage, rows, old, new, ratio, verdict) of every result in both
+    runs; verdict is "regression", "faster" or "" within the threshold
+    """
+    old = {(r["mode"], r["stage"], r["rows"]): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        key = (result["mode"], result["stage"], result["rows"])
+        if key not in old:
+            continue
+        metric = METRICS[result["mode"]]
+        before, after = old[key][metric], result[metric]
+        ratio = after / before if before else float("inf")
+        verdict = ""
+        if abs(after - before) >= NOISE_FLOOR[result["mode"]]:
+            if ratio > 1 + threshold:
+                verdict = "regression"
+            elif ratio < 1 / (1 + threshold):
+                verdict = "faster"
+        rows.append((*key, before, after, ratio, verdict))
+    return rows
+
+
+def report_comparison(baseline, current, threshold):
+    """Print the comparison; returns the exit status, 1 if anything regressed"""
+    rows = compare(baseline, current, threshold)
+    print(f"\ncompared with the run of {baseline['created']} "
+          f"(commit {baseline['environment'].get('git_commit') or 'unknown'}), threshold {threshold:.0%}")
+    for field in ("processor", "cpu_count", "python", "numpy", "pandas", "sklearn"):
+        before, after = baseline["environment"].get(field), current["environment"].get(field)
+        if before != after:
+            print(f"note: {field} differs ({before} -> {after}), so timings may not be comparable")
+    if baseline["config"].get("export_format") != current["config"].get("export_format"):
+        print("note: the export stages wrote different formats")
+
+    print(f"{'mode':<8} {'stage':<8} {'rows':>12} {'before':>13} {'after':>13} {'change':>8}")
+    for mode, name, n_rows, before, after, ratio, verdict in rows:
+        # Batch results are in seconds, latencies in microseconds
+        scale, unit = (1000, "ms") if mode == "batch" else (1, "µs")
+        print(f"{mode:<8} {name:<8} {n_rows:>12,} {before * scale:>10.3f} {unit} {after * scale:>10.3f} {unit} "
+              f"{ratio - 1:>+8.1%}  {verdict.upper() if verdict == 'regression' else verdict}")
+    regressions = sum(verdict == "regression" for *_, verdict in rows)
+    print(f"{regressions} regression(s) in {len(rows)} comparable results")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        return report_comparison(*(load_results(path) for path in args.compare), args.threshold)
+
+    baseline = load_results(args.baseline) if args.baseline else None
+    results = run_suite(args)
+    path = args.output or os.path.join(RESULTS_DIR, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {path}")
+    return report_comparison(baseline, results, args.threshold) if baseline else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
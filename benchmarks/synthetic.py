@@ -0,0 +1,114 @@
+"""
+Synthetic Telco-schema customers for benchmarking.
+
+Draws the 19 model attributes plus `customerID` and the raw `Churn`
+label, so generated files look like the real Telco export. The draws
+follow the export's shape: a U-shaped tenure, contracts that lengthen
+with tenure, add-ons only with internet service, charges that add up
+from the services taken, and a churn rate near the export's 26%. The
+same seed always gives the same customers, and the first n rows do not
+depend on how many more are drawn.
+"""
+import numpy as np
+import pandas as pd
+
+from churn_engine import CATEGORY_LEVELS, INPUT_COLUMNS, INPUT_DTYPES
+
+# Share of customers with each add-on, among those with internet service
+ADD_ON_RATES = {
+    "OnlineSecurity": 0.37,
+    "OnlineBackup": 0.44,
+    "DeviceProtection": 0.44,
+    "TechSupport": 0.37,
+    "StreamingTV": 0.49,
+    "StreamingMovies": 0.50,
+}
+# Monthly price of each service, before noise
+PRICES = {"phone": 20.0, "MultipleLines": 5.0, "Fiber optic": 50.0, "DSL": 25.0,
+          "OnlineSecurity": 5.0, "OnlineBackup": 5.0, "DeviceProtection": 5.0, "TechSupport": 5.0,
+          "StreamingTV": 10.0, "StreamingMovies": 10.0}
+# Rows drawn at a time; whole blocks are drawn, so row i is the same whatever n_rows is
+BLOCK_ROWS = 65_536
+
+
+def _yes(u, rate):
+    """Code of "Yes" (0) or "No" (1) in a [Yes, No] level list"""
+    return (u >= rate).astype(np.int8)
+
+
+def _draw(rng, n_rows):
+    """Category codes (into CATEGORY_LEVELS) and numeric values of `n_rows` customers"""
+    u = rng.random((n_rows, 20))
+    codes = {}
+    codes["gender"] = (u[:, 0] < 0.5).astype(np.int8)
+    senior = (u[:, 1] < 0.16).astype(np.int8)
+    codes["Partner"] = _yes(u[:, 2], 0.48)
+    codes["Dependents"] = _yes(u[:, 3], np.where(codes["Partner"] == 0, 0.5, 0.1))
+    tenure = np.rint(72 * rng.beta(0.6, 0.6, n_rows)).astype(np.int16)
+
+    phone = u[:, 4] < 0.9
+    codes["PhoneService"] = (~phone).astype(np.int8)
+    codes["MultipleLines"] = np.where(phone, _yes(u[:, 5], 0.47), 2).astype(np.int8)
+    # Fiber optic / DSL / No; customers without phone service all have DSL
+    internet = np.searchsorted([0.44, 0.78], u[:, 6], side="right").astype(np.int8)
+    internet[~phone] = 1
+    codes["InternetService"] = internet
+    for i, (column, rate) in enumerate(ADD_ON_RATES.items()):
+        codes[column] = np.where(internet == 2, 2, _yes(u[:, 7 + i], rate)).astype(np.int8)
+
+    # Month-to-month / One year / Two year, drifting to longer contracts with tenure
+    share = tenure / 72
+    month_to_month = np.clip(0.9 - 0.75 * share, 0.05, 1.0)
+    two_year = (1 - month_to_month) * (0.2 + 0.6 * share)
+    codes["Contract"] = np.where(u[:, 13] < month_to_month, 0,
+                                 np.where(u[:, 13] < month_to_month + two_year, 2, 1)).astype(np.int8)
+    codes["PaperlessBilling"] = _yes(u[:, 14], 0.59)
+    codes["PaymentMethod"] = np.searchsorted([0.34, 0.57, 0.79], u[:, 15], side="right").astype(np.int8)
+
+    monthly = (PRICES["phone"] * phone + PRICES["MultipleLines"] * (codes["MultipleLines"] == 0)
+               + np.choose(internet, [PRICES["Fiber optic"], PRICES["DSL"], 0.0])
+               + rng.normal(0, 3, n_rows))
+    for column in ADD_ON_RATES:
+        monthly += PRICES[column] * (codes[column] == 0)
+    monthly = np.round(np.clip(monthly, 18.25, 118.75), 2)
+    total = np.round(monthly * tenure * (0.95 + 0.1 * u[:, 16]), 2)
+
+    log_odds = (-1.6 + 1.4 * (codes["Contract"] == 0) - 1.0 * (codes["Contract"] == 2)
+                + 0.8 * (internet == 0) + 0.5 * (codes["PaymentMethod"] == 0) + 0.3 * senior - 1.5 * share)
+    churn = u[:, 17] < 1 / (1 + np.exp(-log_odds))
+
+    numeric = {"SeniorCitizen": senior, "tenure": tenure, "MonthlyCharges": monthly, "TotalCharges": total}
+    return codes, numeric, churn
+
+
+def make_customers(n_rows, seed=0, compact=False):
+    """
+    Generate `n_rows` random customers in the Telco export layout.
+
+    By default the text columns hold plain strings, as a freshly read
+    CSV would. With `compact` they are categoricals and the numbers are
+    in INPUT_DTYPES, as conform_inputs() leaves them. That keeps a
+    10M-row frame to about a gigabyte.
+    """
+    rng = np.random.default_rng(seed)
+    blocks = [_draw(rng, BLOCK_ROWS) for _ in range(max(-(-n_rows // BLOCK_ROWS), 1))]
+    codes = {column: np.concatenate([block[0][column] for block in blocks])[:n_rows]
+             for column in CATEGORY_LEVELS}
+    numeric = {column: np.concatenate([block[1][column] for block in blocks])[:n_rows]
+               for column in blocks[0][1]}
+    churn = np.concatenate([block[2] for block in blocks])[:n_rows].astype(np.int8)
+
+    def text(values, levels):
+        if compact:
+            return pd.Categorical.from_codes(values, levels)
+        return np.asarray(levels, dtype=object)[values]
+
+    data = {"customerID": [f"{i:04d}-SYNTH" for i in range(n_rows)]}
+    for column in INPUT_COLUMNS:
+        if column in CATEGORY_LEVELS:
+            data[column] = text(codes[column], CATEGORY_LEVELS[column])
+        else:
+            plain = np.float64 if numeric[column].dtype.kind == "f" else np.int64
+            data[column] = numeric[column].astype(INPUT_DTYPES[column] if compact else plain)
+    data["Churn"] = text(1 - churn, ["Yes", "No"])
+    return pd.DataFrame(data)
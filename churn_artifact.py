@@ -0,0 +1,81 @@
+"""
+Export the pickled churn pipeline as a compact model artifact.
+
+    python churn_artifact.py                              # churn_pipeline.pkl -> churn_model.npz
+    python churn_artifact.py model.pkl -o model.npz
+    python churn_artifact.py --check                      # re-verify an existing artifact
+
+The artifact is an .npz of plain float64 arrays (coefficients, intercept,
+scaler mean and scale) with a JSON manifest of the feature columns,
+category vocabulary, sklearn version and a content hash. The app,
+churn_score.py and churn_service.py load it in place of the pickle when
+it was exported from the pickle beside it as that is now (its manifest's
+source_digest matches the pickle's content hash; modification times
+don't count) or there is no pickle, without unpickling anything or
+importing sklearn. Every export is reloaded and checked against the pickle's own
+predict_proba before it is reported.
+"""
+import argparse
+import os
+import sys
+
+from churn_engine import (ARTIFACT_PATH, MODEL_PATH, PipelineScorer, export_artifact, linear_parameters,
+                          load_artifact, load_pipeline, model_digest, probe_rows)
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="churn-artifact",
+        description="Export the pickled churn pipeline as an .npz model artifact."
+    )
+    parser.add_argument("pipeline", nargs="?", default=os.path.join(HERE, MODEL_PATH),
+                        help="pickled pipeline (default: churn_pipeline.pkl next to this script)")
+    parser.add_argument("-o", "--output", default=os.path.join(HERE, ARTIFACT_PATH),
+                        help="artifact path (default: churn_model.npz next to this script)")
+    parser.add_argument("--check", action="store_true",
+                        help="verify the existing artifact against the pipeline instead of writing it")
+    return parser.parse_args(argv)
+
+
+def parity(path, model, scaler, feature_cols):
+    """(manifest, largest probability difference) of the artifact at `path` against the pickled pipeline"""
+    scorer, manifest = load_artifact(path)
+    if scorer.feature_cols != list(feature_cols):
+        raise ValueError("feature columns differ from the pipeline's")
+    _, _, mean, scale = linear_parameters(model, scaler)
+    error = scorer.verify(PipelineScorer(scaler, model, feature_cols), probe_rows(mean, scale))
+    return manifest, error
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        model, scaler, feature_cols = load_pipeline(args.pipeline)
+        digest = model_digest(args.pipeline)
+    except (OSError, ValueError) as e:
+        print(f"churn-artifact: cannot load pipeline: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        if not args.check:
+            export_artifact(model, scaler, feature_cols, args.output, source_digest=digest)
+        manifest, error = parity(args.output, model, scaler, feature_cols)
+    except (OSError, ValueError) as e:
+        print(f"churn-artifact: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{'checked' if args.check else 'wrote'} {args.output}: {os.path.getsize(args.output) / 2**10:.1f} KB, "
+          f"{len(manifest['feature_columns'])} features, {manifest['model']} "
+          f"(sklearn {manifest['sklearn_version']}), sha256 {manifest['sha256'][:16]}")
+    print(f"max |probability difference| vs. the pipeline: {error:.1e}")
+    if manifest.get("source_digest") != digest:
+        print(f"churn-artifact: warning: exported from a different pipeline than {args.pipeline}",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
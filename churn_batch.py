@@ -0,0 +1,895 @@
+"""
+Batch scoring for the Telecom Churn Intelligence Platform.
+
+Chunked, streaming counterparts of the app's batch mode: the input is
+read, encoded, scaled and scored a chunk at a time and the results are
+appended to an output file, so memory stays flat however large the
+upload is. Like churn_engine, nothing in here imports Streamlit or Plotly.
+"""
+import csv
+import gzip
+import io
+import math
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from churn_engine import (BLANK_AS_ZERO, ID_COLUMN, INPUT_DTYPES, RISK_LABELS, TOP_DRIVERS, FusedScorer,
+                          assign_risk_levels, encoded_rows, retention_columns, retention_labels)
+from churn_perf import stage
+
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# Bars of the churn probability chart; each is split QUANTILE_SUBDIVISIONS
+# times in the running histogram, so quantiles are exact to 1/3000
+HISTOGRAM_BINS = 30
+QUANTILE_SUBDIVISIONS = 100
+# Highest-risk rows a ResultIndex ranks up front; pages beyond them are ranked on demand
+RESULTS_TOP_N = 10_000
+INPUT_FORMATS = ["csv", "parquet", "arrow"]
+OUTPUT_FORMATS = ["csv", "csv.gz", "parquet", "arrow"]
+# gzip level of "csv.gz" output: most of level 9's ratio at a fraction of its time
+GZIP_LEVEL = 6
+
+# File extensions of each format ("arrow" is the Arrow IPC / Feather v2 file format)
+FORMAT_EXTENSIONS = {
+    "csv": [".csv"],
+    "csv.gz": [".csv.gz"],
+    "parquet": [".parquet", ".pq"],
+    "arrow": [".arrow", ".feather", ".ipc"],
+}
+MIME_TYPES = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+def detect_format(name, default="csv"):
+    """Input/output format from a file name's extension"""
+    name = str(name).lower()
+    for fmt, extensions in FORMAT_EXTENSIONS.items():
+        if name.endswith(tuple(extensions)):
+            return fmt
+    return default
+
+
+def model_columns(encoder):
+    """Columns to project a read onto: the model's source columns plus the customer ID"""
+    return encoder.source_columns + [ID_COLUMN]
+
+
+#======== CHUNK SCORING ========
+def score_chunk(chunk, prepare, scorer, top_k=TOP_DRIVERS):
+    """
+    Score one chunk of raw customers in place.
+
+    `prepare` turns the raw chunk into the model's encoded frame (the
+    app passes prepare_input_for_model) and `scorer` is a churn_engine
+    scorer. Adds the columns of attach_scores() and returns the chunk.
+    """
+    probabilities, drivers = score_rows(chunk, prepare, scorer, top_k)
+    with stage("rules", len(chunk)):
+        return attach_scores(chunk, probabilities, drivers)
+
+
+def score_rows(chunk, prepare, scorer, top_k=TOP_DRIVERS):
+    """(probabilities, driver columns or None) of a raw chunk, which is left as it is"""
+    with stage("encode", len(chunk)):
+        encoded = prepare(chunk)
+    probabilities, contributions = score_encoded(encoded, scorer, top_k)
+    return probabilities, driver_columns(scorer, contributions)
+
+
+def explains(scorer, top_k):
+    """Whether `scorer` can break its scores into top_k feature contributions"""
+    return top_k > 0 and isinstance(scorer, FusedScorer)
+
+
+def score_encoded(encoded, scorer, top_k=TOP_DRIVERS):
+    """
+    (probabilities, contributions) of an encoded block.
+
+    contributions is FusedScorer.top_contributions' (codes, impacts) pair,
+    or None when the scorer cannot explain its scores or top_k is 0.
+    """
+    n_rows = encoded_rows(encoded)
+    with stage("predict", n_rows):
+        probabilities = scorer.predict_proba(encoded)
+    if not explains(scorer, top_k):
+        return probabilities, None
+    with stage("drivers", n_rows):
+        return probabilities, scorer.top_contributions(encoded, top_k)
+
+
+def driver_columns(scorer, contributions):
+    """Driver_i / Driver_i_Impact columns for attach_scores(), or None"""
+    if contributions is None:
+        return None
+    return scorer.driver_columns(*contributions)
+
+
+def attach_scores(chunk, probabilities, drivers=None, retention=None):
+    """
+    Add Churn_Probability, Risk_Level, Risk_Factors and Recommendations
+    columns to a chunk in place, plus the `drivers` columns if given.
+    `retention` is the chunk's retention_keys() when already known.
+    """
+    chunk["Churn_Probability"] = probabilities
+    chunk["Risk_Level"] = assign_risk_levels(probabilities)
+    if retention is None:
+        chunk["Risk_Factors"], chunk["Recommendations"] = retention_columns(chunk, probabilities)
+    else:
+        chunk["Risk_Factors"], chunk["Recommendations"] = retention_labels(*retention)
+    for name, column in (drivers or {}).items():
+        chunk[name] = column
+    return chunk
+
+
+def count_risk_levels(risk_levels):
+    """Per-level row counts of a Risk_Level categorical, keyed by label"""
+    codes = risk_levels.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(RISK_LABELS))
+    return dict(zip(RISK_LABELS, counts.tolist()))
+
+
+#======== RUNNING SUMMARY ========
+class ScoreSummary:
+    """
+    Aggregates of a batch's churn probabilities, updated chunk by chunk.
+
+    Keeps the LOW/MEDIUM/HIGH counts, the sum, minimum and maximum, and a
+    fixed histogram over [0, 1], so the summary cards and charts never go
+    back to the scored rows. `rows` counts every row; the statistics skip
+    rows without a probability.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.risk_counts = dict.fromkeys(RISK_LABELS, 0)
+        self._fine = np.zeros(HISTOGRAM_BINS * QUANTILE_SUBDIVISIONS, dtype=np.int64)
+
+    def update(self, probabilities, risk_levels):
+        """Add a scored chunk: its probabilities and Risk_Level column. Returns self."""
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.rows += len(probabilities)
+        for label, count in count_risk_levels(risk_levels).items():
+            self.risk_counts[label] += count
+
+        probabilities = probabilities[np.isfinite(probabilities)]
+        if len(probabilities):
+            self.count += len(probabilities)
+            self.total += float(probabilities.sum())
+            self.minimum = min(self.minimum, float(probabilities.min()))
+            self.maximum = max(self.maximum, float(probabilities.max()))
+            bins = np.clip((probabilities * len(self._fine)).astype(np.intp), 0, len(self._fine) - 1)
+            self._fine += np.bincount(bins, minlength=len(self._fine))
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+    def quantile(self, q):
+        """Probability below which a `q` share of the batch falls, interpolated within a fine bin"""
+        if not self.count:
+            return math.nan
+        cumulative = np.cumsum(self._fine)
+        target = q * self.count
+        i = min(int(np.searchsorted(cumulative, target)), len(self._fine) - 1)
+        below = cumulative[i] - self._fine[i]
+        within = (target - below) / self._fine[i] if self._fine[i] else 0.0
+        value = (i + within) / len(self._fine)
+        return min(max(value, self.minimum), self.maximum)
+
+    def histogram(self):
+        """(bin edges, counts) of the churn probability chart"""
+        counts = self._fine.reshape(HISTOGRAM_BINS, QUANTILE_SUBDIVISIONS).sum(axis=1)
+        return np.linspace(0, 1, HISTOGRAM_BINS + 1), counts
+
+
+#======== RESULTS INDEX ========
+def _ranked(positions, probabilities, k):
+    """The `k` of `positions` with the highest probability, highest first (NaN last)"""
+    if k < len(positions):
+        positions = positions[np.argpartition(-probabilities[positions], k - 1)[:k]]
+    return positions[np.argsort(-probabilities[positions], kind="stable")]
+
+
+class ResultIndex:
+    """
+    Highest-risk-first pages of a scored frame without sorting the frame.
+
+    The `top_n` likeliest churners are found once with argpartition and
+    only they are sorted. A page of the (optionally filtered) ranking is
+    served from them while it fits; a page past them partitions just the
+    filtered rows up to its last position. Pages are `iloc` slices, so
+    only the rows shown are ever copied.
+    """
+
+    def __init__(self, frame, top_n=RESULTS_TOP_N):
+        self.frame = frame
+        self._probabilities = frame["Churn_Probability"].to_numpy(dtype=np.float64, na_value=np.nan)
+        self._top = _ranked(np.arange(len(frame)), self._probabilities, top_n)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def mask(self, risk_levels=None, contracts=None, tenure=None):
+        """Row mask of the filters, or None when none is set; `tenure` is an inclusive (low, high)"""
+        mask = None
+        if risk_levels is not None:
+            mask = self.frame["Risk_Level"].isin(risk_levels).to_numpy()
+        if contracts is not None and "Contract" in self.frame.columns:
+            matches = self.frame["Contract"].isin(contracts).to_numpy()
+            mask = matches if mask is None else mask & matches
+        if tenure is not None and "tenure" in self.frame.columns:
+            values = self.frame["tenure"].to_numpy()
+            matches = (values >= tenure[0]) & (values <= tenure[1])
+            mask = matches if mask is None else mask & matches
+        return mask
+
+    def count(self, mask=None):
+        """Rows passing `mask`"""
+        return len(self.frame) if mask is None else int(np.count_nonzero(mask))
+
+    def page(self, number, size, mask=None):
+        """Rows of 0-based page `number` of the ranking of the rows passing `mask`"""
+        start, stop = number * size, (number + 1) * size
+        ranked = self._top if mask is None else self._top[mask[self._top]]
+        if stop > len(ranked) and self.count(mask) > len(ranked):
+            # Rows outside the top N never outrank rows in it, so only
+            # pages past its filtered part need the remaining rows
+            candidates = np.arange(len(self.frame)) if mask is None else np.flatnonzero(mask)
+            ranked = _ranked(candidates, self._probabilities, stop)
+        return self.frame.iloc[ranked[start:stop]]
+
+
+#======== INPUT SCHEMA ========
+def _csv_convert_options(names):
+    """
+    pyarrow CSV conversion of the columns `names`: the model's text inputs
+    parse straight into dictionaries (pandas `category`), its numeric
+    inputs into strings for _parse_numbers(), as a single blank or junk
+    value would fail a float64 column.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    types = {col: pa.dictionary(pa.int32(), pa.string()) if dtype == "category" else pa.string()
+             for col, dtype in INPUT_DTYPES.items() if col in names}
+    return pa_csv.ConvertOptions(include_columns=names, column_types=types, strings_can_be_null=True)
+
+
+def _parse_numbers(table):
+    """
+    Cast the model's numeric inputs of an Arrow table from text to float64,
+    blanks (the Telco export's " " TotalCharges) as null. A column holding
+    anything else unparseable stays text for conform_inputs() to coerce.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for i, field in enumerate(table.schema):
+        if INPUT_DTYPES.get(field.name, "category") == "category" or not (
+                pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+            continue
+        text = pc.utf8_trim_whitespace(table.column(i))
+        text = pc.if_else(pc.equal(text, ""), pa.scalar(None, text.type), text)
+        try:
+            table = table.set_column(i, field.name, pc.cast(text, pa.float64()))
+        except pa.ArrowInvalid:
+            pass
+    return table
+
+
+def _encode_text(table):
+    """Dictionary-encode the model's text inputs of an Arrow table, so they convert straight to `category`"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for i, field in enumerate(table.schema):
+        if INPUT_DTYPES.get(field.name) == "category" and (pa.types.is_string(field.type)
+                                                            or pa.types.is_large_string(field.type)):
+            table = table.set_column(i, field.name, pc.dictionary_encode(table.column(i)))
+    return table
+
+
+class _Prepended(io.RawIOBase):
+    """A binary stream that reads `head` first and then carries on from `stream`"""
+
+    def __init__(self, head, stream):
+        self._head = head
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._head:
+            n = min(len(buffer), len(self._head))
+            buffer[:n] = self._head[:n]
+            self._head = self._head[n:]
+            return n
+        return self._stream.readinto(buffer)
+
+
+def _csv_header(handle):
+    """
+    (column names in the header line of a binary CSV stream, the stream to
+    read the CSV from). A seekable stream is left where it was and
+    returned; from a pipe the whole header line is read, however many
+    reads it arrives in, and put back in front of the rest.
+    """
+    if getattr(handle, "seekable", lambda: False)():
+        position = handle.tell()
+        line = handle.readline()
+        handle.seek(position)
+    else:
+        line = handle.readline()
+        handle = io.BufferedReader(_Prepended(line, handle))
+    line = line.split(b"\n", 1)[0].decode("utf-8-sig").rstrip("\r")
+    return next(csv.reader([line]), []), handle
+
+
+def _narrow(values, dtype):
+    """float64 `values` as integer `dtype` when all are whole and in range, else as float32"""
+    if np.issubdtype(dtype, np.integer) and len(values):
+        info = np.iinfo(dtype)
+        if (np.isfinite(values).all() and (values == np.trunc(values)).all()
+                and info.min <= values.min() and values.max() <= info.max):
+            return values.astype(dtype)
+    return values.astype(np.float32)
+
+
+def _blank(series):
+    """Mask of the missing, empty and whitespace-only values of a column"""
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.isna().to_numpy()
+    return series.astype("string").str.strip().fillna("").eq("").to_numpy(dtype=bool)
+
+
+def conform_inputs(frame):
+    """
+    Coerce the model input columns of a read chunk to INPUT_DTYPES in place.
+
+    Text becomes `category`. Numbers are parsed with blanks and junk as
+    missing, except that a blank (empty or whitespace-only) TotalCharges
+    is 0; junk there stays missing, leaving the row unscored rather than
+    scored as a new customer. Integer columns that hold missing or
+    fractional values stay float32. Returns the frame.
+    """
+    for col, dtype in INPUT_DTYPES.items():
+        if col not in frame.columns:
+            continue
+        if dtype == "category":
+            if not isinstance(frame[col].dtype, pd.CategoricalDtype):
+                frame[col] = frame[col].astype("category")
+            continue
+        values = pd.to_numeric(frame[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        if col in BLANK_AS_ZERO:
+            values = np.where(_blank(frame[col]), 0, values)
+        frame[col] = _narrow(values, dtype)
+    return frame
+
+
+#======== COLUMNAR INPUT ========
+def _input_size(source):
+    """Total size in bytes of a path or seekable buffer, or None if unknown"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if hasattr(source, "seekable") and not source.seekable():
+        return None
+    if hasattr(source, "seek") and hasattr(source, "tell"):
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return size
+    return None
+
+
+class ChunkReader:
+    """
+    Iterate a CSV, Parquet or Arrow IPC source as DataFrame chunks.
+
+    `columns` projects the read onto those columns (any that the source
+    lacks are ignored); the others are never converted or decoded. Model
+    inputs come back in their compact INPUT_DTYPES (see conform_inputs).
+    `fraction` reports how much of the input has been consumed, or
+    None when that is unknown (e.g. CSV on stdin).
+    """
+
+    def __init__(self, source, fmt="csv", chunksize=DEFAULT_CHUNKSIZE, columns=None):
+        if fmt not in INPUT_FORMATS:
+            raise ValueError(f"Unsupported input format '{fmt}' (choose from {', '.join(INPUT_FORMATS)})")
+        self.source = source
+        self.fmt = fmt
+        self.chunksize = chunksize
+        self.columns = list(columns) if columns is not None else None
+        self.rows_read = 0
+        # Progress in format-specific units: bytes (CSV), rows (Parquet), batches (Arrow)
+        self._done = 0
+        self._total = None
+        self._handle = None
+
+    def __iter__(self):
+        if self.fmt == "csv":
+            return self._iter_csv()
+        return self._iter_columnar()
+
+    @property
+    def fraction(self):
+        if not self._total:
+            return None
+        return min(self._done / self._total, 1.0)
+
+    def _iter_csv(self):
+        import pyarrow.csv as pa_csv
+
+        self._total = _input_size(self.source)
+        owns_handle = isinstance(self.source, (str, os.PathLike))
+        self._handle = open(self.source, "rb") if owns_handle else self.source
+        try:
+            header, stream = _csv_header(self._handle)
+            names = self._present(header) or header
+            reader = pa_csv.open_csv(stream, convert_options=_csv_convert_options(names))
+            yield from self._regroup(reader)
+        finally:
+            if owns_handle:
+                self._handle.close()
+
+    def _iter_columnar(self):
+        import pyarrow as pa
+
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            reader = pq.ParquetFile(self.source)
+            self._total = reader.metadata.num_rows
+            batches = reader.iter_batches(batch_size=self.chunksize,
+                                          columns=self._present(reader.schema_arrow.names))
+        else:
+            reader = pa.ipc.open_file(self.source)
+            self._total = reader.num_record_batches
+            batches = self._iter_ipc_batches(reader, self._present(reader.schema.names))
+        yield from self._regroup(batches)
+
+    def _regroup(self, batches):
+        """Regroup record batches into chunks of at least `chunksize` rows"""
+        batches = iter(batches)
+        while True:
+            # Parsing happens as the batches are pulled, so it is timed here
+            with stage("read") as timed:
+                chunk = self._next_chunk(batches)
+                timed.rows = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+    def _next_chunk(self, batches):
+        """A frame of the next `chunksize` or more rows of `batches`, or None once they run out"""
+        pending, pending_rows = [], 0
+        for batch in batches:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= self.chunksize:
+                break
+        return self._to_frame(pending) if pending_rows else None
+
+    def _iter_ipc_batches(self, reader, columns):
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            yield batch if columns is None else batch.select(columns)
+
+    def _present(self, names):
+        """Requested columns the source actually has, in source order"""
+        if self.columns is None:
+            return None
+        wanted = set(self.columns)
+        return [name for name in names if name in wanted]
+
+    def _to_frame(self, batches):
+        import pyarrow as pa
+
+        table = pa.Table.from_batches(batches)
+        self.rows_read += table.num_rows
+        if self.fmt == "csv":
+            self._done = self._handle.tell() if self._total else 0
+        else:
+            self._done += table.num_rows if self.fmt == "parquet" else len(batches)
+        return conform_inputs(_parse_numbers(_encode_text(table)).to_pandas())
+
+
+def read_frame(source, fmt="csv", columns=None):
+    """Read a whole CSV, Parquet or Arrow IPC source into one DataFrame (see ChunkReader)"""
+    chunks = list(ChunkReader(source, fmt, chunksize=2**62, columns=columns))
+    return chunks[0] if chunks else pd.DataFrame(columns=columns)
+
+
+def source_columns(source, fmt="csv"):
+    """
+    Column names of a CSV, Parquet or Arrow IPC source, read from its header
+    or schema. A CSV stream must be seekable, as its header is read again.
+    """
+    if fmt == "csv":
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                return _csv_header(f)[0]
+        return _csv_header(source)[0]
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt == "parquet":
+        return pq.ParquetFile(source).schema_arrow.names
+    return pa.ipc.open_file(source).schema.names
+
+
+#======== INCREMENTAL OUTPUT ========
+def _plain_schema(schema):
+    """`schema` with dictionary (categorical) fields replaced by their value type"""
+    import pyarrow as pa
+
+    fields = [field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+              for field in schema]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+class ResultWriter:
+    """
+    Append scored chunks to a CSV, gzip CSV, Parquet or Arrow IPC file as
+    they arrive, optionally keeping only `columns` of each.
+
+    `path` may also be an open file object (text or binary for CSV,
+    binary for the others), which is written to but left open.
+    """
+
+    def __init__(self, path, fmt="csv", columns=None):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format '{fmt}' (choose from {', '.join(OUTPUT_FORMATS)})")
+        self.path = path
+        self.fmt = fmt
+        self.columns = columns
+        self.rows = 0
+        self._owns_handle = not hasattr(path, "write")
+        self._handle = None
+        self._columnar = None
+        self._schema = None
+
+    def _open_text(self):
+        """Text handle the CSV rows go to, compressed on the way for csv.gz"""
+        if self.fmt == "csv":
+            return open(self.path, "w", newline="", encoding="utf-8") if self._owns_handle else self.path
+        if self._owns_handle:
+            raw = gzip.open(self.path, "wb", compresslevel=GZIP_LEVEL)
+        else:
+            raw = gzip.GzipFile(fileobj=getattr(self.path, "buffer", self.path), mode="wb",
+                                compresslevel=GZIP_LEVEL)
+        return io.TextIOWrapper(raw, encoding="utf-8", newline="")
+
+    def write(self, chunk):
+        if self.columns is not None:
+            chunk = chunk[self.columns]
+        if self.fmt in ("csv", "csv.gz"):
+            if self._handle is None:
+                self._handle = self._open_text()
+            chunk.to_csv(self._handle, header=self.rows == 0, index=False)
+        else:
+            import pyarrow as pa
+
+            if self._columnar is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if self.fmt == "arrow":
+                    # An IPC file holds one dictionary per field, but every chunk's
+                    # categoricals bring their own, so they are written as plain values
+                    table = table.cast(_plain_schema(table.schema))
+                if self.fmt == "parquet":
+                    import pyarrow.parquet as pq
+                    self._columnar = pq.ParquetWriter(self.path, table.schema)
+                else:
+                    self._columnar = pa.ipc.new_file(self.path, table.schema)
+                self._schema = table.schema
+            elif self.fmt == "arrow":
+                # Cast in Arrow: decoding the dictionaries through pandas is far slower
+                table = pa.Table.from_pandas(chunk, preserve_index=False).cast(self._schema)
+            else:
+                # Later chunks must match the first chunk's schema
+                table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+            self._columnar.write_table(table)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._columnar is not None:
+            self._columnar.close()
+        if self._handle is None and self.rows == 0 and self.fmt in ("csv", "csv.gz"):
+            # Leave a valid (empty) file behind for an empty input
+            self._handle = self._open_text()
+        if self._handle is not None:
+            if self._owns_handle or self.fmt == "csv.gz":
+                # Closing the gzip stream writes its trailer; a caller's file object stays open
+                self._handle.close()
+            else:
+                self._handle.flush()
+        if not self._owns_handle:
+            self.path.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_frame(frame, path, fmt="csv", columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Write a scored frame to `path` (see ResultWriter) `chunksize` rows at a
+    time, so an export never holds more than one chunk's text or Arrow
+    table next to the frame. Returns the number of rows written.
+    """
+    with ResultWriter(path, fmt, columns) as writer:
+        # An empty frame still writes its header / schema
+        for start in range(0, max(len(frame), 1), chunksize):
+            writer.write(frame.iloc[start:start + chunksize])
+    return writer.rows
+
+
+#======== WORKER POOL ========
+_worker_state = {}
+
+
+def _pool_context():
+    """
+    Start method of the worker pools: forkserver where there is one, else
+    spawn. Never a plain fork, which would copy the app's multi-threaded
+    server (registry watcher included) in whatever state its threads are.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # Workers fork from a server that has imported the pipeline once, not from this process
+        context.set_forkserver_preload(["__main__", __name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker(prepare, scorer, top_k):
+    """Receive the pipeline once per worker"""
+    _worker_state.update(prepare=prepare, scorer=scorer, top_k=top_k)
+
+
+class SharedFrame:
+    """
+    The model input columns of a frame, copied into one shared-memory block.
+
+    Numbers are stored as they are, any other column as category codes.
+    Pickling sends only the block's name, its layout and the category
+    labels, so a worker reads the rows it scores straight from the block
+    instead of receiving them. The creating process close()s it.
+    """
+
+    def __init__(self, frame):
+        arrays, self.categories = {}, {}
+        for col in INPUT_DTYPES:
+            if col not in frame.columns:
+                continue
+            values = frame[col]
+            if isinstance(values.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(values.dtype):
+                values = values.astype("category")
+                arrays[col] = values.cat.codes.to_numpy()
+                self.categories[col] = values.cat.categories
+            else:
+                arrays[col] = values.to_numpy(dtype=None if isinstance(values.dtype, np.dtype) else np.float64,
+                                              na_value=np.nan)
+        self.n_rows = len(frame)
+        # (column, dtype, byte offset), each column 8-byte aligned
+        self.layout, size = [], 0
+        for col, array in arrays.items():
+            self.layout.append((col, array.dtype.str, size))
+            size += -(-array.nbytes // 8) * 8
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.name = self._shm.name
+        for col, dtype, offset in self.layout:
+            np.ndarray((self.n_rows,), dtype=dtype, buffer=self._shm.buf, offset=offset)[:] = arrays[col]
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if key != "_shm"}
+
+    def rows(self, start=0, stop=None):
+        """Rows [start, stop) as a DataFrame of their own, in any process"""
+        shm = shared_memory.SharedMemory(name=self.name)
+        try:
+            columns = {}
+            for col, dtype, offset in self.layout:
+                values = np.ndarray((self.n_rows,), dtype=dtype, buffer=shm.buf, offset=offset)[start:stop].copy()
+                if col in self.categories:
+                    values = pd.Categorical.from_codes(values, categories=self.categories[col])
+                columns[col] = values
+            return pd.DataFrame(columns)
+        finally:
+            shm.close()
+
+    def close(self):
+        """Release and remove the block (creating process only)"""
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _scores_in_worker(inputs, start=0, stop=None):
+    """(probabilities, contributions) of rows [start, stop) of a SharedFrame"""
+    return score_encoded(_worker_state["prepare"](inputs.rows(start, stop)), _worker_state["scorer"],
+                         _worker_state["top_k"])
+
+
+def _result_dtype(scorer, top_k):
+    """Row layout of the shared output array: probability, then driver codes and impacts"""
+    code_dtype = scorer.code_dtype if top_k else np.int8
+    return np.dtype([("probability", np.float64), ("code", code_dtype, (top_k,)), ("impact", np.float32, (top_k,))])
+
+
+def _score_partition(inputs, shm_name, start, stop):
+    """Score rows [start, stop) of the shared inputs into the shared output array"""
+    top_k = _worker_state["top_k"]
+    probabilities, contributions = _scores_in_worker(inputs, start, stop)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((inputs.n_rows,), dtype=_result_dtype(_worker_state["scorer"], top_k), buffer=shm.buf)
+        out["probability"][start:stop] = probabilities
+        if contributions is not None:
+            out["code"][start:stop], out["impact"][start:stop] = contributions
+        del out
+    finally:
+        shm.close()
+
+
+def iter_scored_chunks(chunks, prepare, scorer, workers=1, top_k=TOP_DRIVERS, attach=True):
+    """
+    Score an iterable of raw chunks, yielding results in input order.
+    With attach=False each result is (chunk, probabilities, driver columns)
+    and the chunk is left as it is, for callers that attach scores
+    themselves.
+
+    With workers > 1 the chunks are scored in a process pool, keeping at
+    most two chunks per worker in flight so memory stays bounded. Each
+    chunk's model inputs reach the workers through a SharedFrame, and only
+    the probabilities and driver codes travel back; the chunk stays in
+    this process. `prepare` must then be picklable (e.g.
+    FeatureEncoder.transform).
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            if attach:
+                yield score_chunk(chunk, prepare, scorer, top_k)
+            else:
+                yield (chunk, *score_rows(chunk, prepare, scorer, top_k))
+        return
+
+    def finish(chunk, inputs, future):
+        # Encoding and scoring run in the workers; this is the wait for them
+        try:
+            with stage("pool", len(chunk)):
+                probabilities, contributions = future.result()
+        finally:
+            inputs.close()
+        if not attach:
+            return chunk, probabilities, driver_columns(scorer, contributions)
+        with stage("rules", len(chunk)):
+            return attach_scores(chunk, probabilities, driver_columns(scorer, contributions))
+
+    pending = deque()
+    try:
+        with ProcessPoolExecutor(workers, mp_context=_pool_context(), initializer=_init_worker,
+                                 initargs=(prepare, scorer, top_k)) as pool:
+            for chunk in chunks:
+                inputs = SharedFrame(chunk)
+                pending.append((chunk, inputs, pool.submit(_scores_in_worker, inputs)))
+                if len(pending) >= 2 * workers:
+                    yield finish(*pending.popleft())
+            while pending:
+                yield finish(*pending.popleft())
+    finally:
+        # Blocks of chunks still in flight when scoring stopped early
+        for _, inputs, _ in pending:
+            inputs.close()
+
+
+def parallel_score_frame(frame, prepare, scorer, workers, partition_rows=None, top_k=0):
+    """
+    Churn probabilities for every row of an in-memory frame, in row order.
+
+    Returns (probabilities, drivers) where drivers holds the Driver_i /
+    Driver_i_Impact columns of the top_k contributing features, or None
+    when top_k is 0 or the scorer cannot explain its scores.
+
+    The frame is split into row partitions scored across `workers`
+    processes. Each worker gets the pipeline once through the pool
+    initializer, reads its partitions' inputs from a SharedFrame and
+    writes their results straight into a shared-memory array, so no
+    DataFrame is pickled in either direction whatever the start method.
+    """
+    n_rows = len(frame)
+    if workers <= 1 or n_rows == 0:
+        with stage("encode", n_rows):
+            encoded = prepare(frame)
+        probabilities, contributions = score_encoded(encoded, scorer, top_k)
+        return probabilities, driver_columns(scorer, contributions)
+
+    # A few partitions per worker to even out the load
+    partition_rows = partition_rows or max(math.ceil(n_rows / (4 * workers)), 10_000)
+    top_k = top_k if explains(scorer, top_k) else 0
+    dtype = _result_dtype(scorer, top_k)
+
+    inputs = SharedFrame(frame)
+    shm = shared_memory.SharedMemory(create=True, size=n_rows * dtype.itemsize)
+    try:
+        with stage("pool", n_rows), ProcessPoolExecutor(workers, mp_context=_pool_context(),
+                                                        initializer=_init_worker,
+                                                        initargs=(prepare, scorer, top_k)) as pool:
+            futures = [
+                pool.submit(_score_partition, inputs, shm.name, start, min(start + partition_rows, n_rows))
+                for start in range(0, n_rows, partition_rows)
+            ]
+            for future in futures:
+                future.result()
+        results = np.ndarray((n_rows,), dtype=dtype, buffer=shm.buf)
+        probabilities = results["probability"].copy()
+        drivers = scorer.driver_columns(results["code"].copy(), results["impact"].copy()) if top_k else None
+        del results
+        return probabilities, drivers
+    finally:
+        shm.close()
+        shm.unlink()
+        inputs.close()
+
+
+#======== STREAMING PIPELINE ========
+def stream_score(source, output_path, prepare, scorer,
+                 chunksize=DEFAULT_CHUNKSIZE, fmt="csv", on_chunk=None, workers=1,
+                 input_format="csv", columns=None, top_k=TOP_DRIVERS, store=None, planner=None):
+    """
+    Score an input chunk by chunk, writing results to `output_path` as it goes.
+
+    `source` is a path or file-like object in `input_format`, optionally
+    projected onto `columns` (see ChunkReader), and `output_path` a path
+    or open file (see ResultWriter). `workers` > 1 scores chunks in a
+    process pool (see iter_scored_chunks), and `top_k` adds the
+    strongest churn drivers of each row (0 to skip). With a churn_store
+    ScoreStore as `store` only new and changed customers are scored, and
+    the store is saved once the output is complete. A churn_optimizer
+    RetentionPlanner as `planner` collects every scored chunk's retention
+    candidates, ready to solve() for a budget. After every chunk
+    `on_chunk(summary, fraction)` is called with the ScoreSummary of the
+    rows scored so far and the fraction of the input consumed (None when
+    the input size is unknown). Returns the final ScoreSummary.
+    """
+    reader = ChunkReader(source, input_format, chunksize, columns)
+
+    summary = ScoreSummary()
+    with ResultWriter(output_path, fmt) as writer:
+        if store is not None:
+            scored_chunks = store.score_chunks(reader, prepare, workers)
+        else:
+            scored_chunks = iter_scored_chunks(reader, prepare, scorer, workers, top_k)
+        for scored in scored_chunks:
+            with stage("write", len(scored)):
+                writer.write(scored)
+            with stage("summary", len(scored)):
+                summary.update(scored["Churn_Probability"], scored["Risk_Level"])
+            if planner is not None:
+                with stage("plan", len(scored)):
+                    planner.update(scored)
+            if on_chunk is not None:
+                on_chunk(summary, reader.fraction)
+
+    if store is not None:
+        store.save()
+    return summary
@@ -0,0 +1,1107 @@
+"""
+Scoring engine for the Telecom Churn Intelligence Platform.
+
+Pure NumPy/pandas building blocks shared by the Streamlit app and the
+benchmarks. Nothing in here imports Streamlit or Plotly.
+"""
+import functools
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from churn_perf import stage
+
+
+#======== SCHEMA ========
+MODEL_PATH = "churn_pipeline.pkl"
+# Compact export of the same model, loaded without unpickling or importing sklearn
+ARTIFACT_PATH = "churn_model.npz"
+
+# Columns passed to the model as-is (everything else is one-hot encoded)
+NUMERIC_COLS = ['tenure', 'MonthlyCharges', 'TotalCharges', 'SeniorCitizen']
+
+# The 19 customer attributes the model is trained on, in form order
+INPUT_COLUMNS = [
+    "gender", "SeniorCitizen", "Partner", "Dependents", "tenure",
+    "PhoneService", "MultipleLines", "InternetService",
+    "OnlineSecurity", "OnlineBackup", "DeviceProtection",
+    "TechSupport", "StreamingTV", "StreamingMovies",
+    "Contract", "PaperlessBilling", "PaymentMethod",
+    "MonthlyCharges", "TotalCharges"
+]
+
+# Narrowest dtype of each numeric input for batch reads; the text inputs are read as `category`.
+# tenure is int16 as carriers keep customers for more than 127 months
+NUMERIC_DTYPES = {
+    "SeniorCitizen": np.int8,
+    "tenure": np.int16,
+    "MonthlyCharges": np.float32,
+    "TotalCharges": np.float32,
+}
+INPUT_DTYPES = {col: NUMERIC_DTYPES.get(col, "category") for col in INPUT_COLUMNS}
+
+# The Telco export leaves TotalCharges blank for customers with nothing billed yet
+BLANK_AS_ZERO = ["TotalCharges"]
+
+# Identifier and label columns of the Telco export; never model inputs
+ID_COLUMN = "customerID"
+TARGET_COLUMN = "Churn"
+
+# Churn probability cut points for the LOW / MEDIUM / HIGH risk levels
+RISK_BINS = [0, 0.4, 0.7, 1.0]
+RISK_LABELS = ["LOW", "MEDIUM", "HIGH"]
+
+# Full category vocabulary of the Telco export, in form order
+CATEGORY_LEVELS = {
+    "gender": ["Male", "Female"],
+    "Partner": ["Yes", "No"],
+    "Dependents": ["Yes", "No"],
+    "PhoneService": ["Yes", "No"],
+    "MultipleLines": ["Yes", "No", "No phone service"],
+    "InternetService": ["Fiber optic", "DSL", "No"],
+    "OnlineSecurity": ["Yes", "No", "No internet service"],
+    "OnlineBackup": ["Yes", "No", "No internet service"],
+    "DeviceProtection": ["Yes", "No", "No internet service"],
+    "TechSupport": ["Yes", "No", "No internet service"],
+    "StreamingTV": ["Yes", "No", "No internet service"],
+    "StreamingMovies": ["Yes", "No", "No internet service"],
+    "Contract": ["Month-to-month", "One year", "Two year"],
+    "PaperlessBilling": ["Yes", "No"],
+    "PaymentMethod": [
+        "Electronic check",
+        "Mailed check",
+        "Bank transfer (automatic)",
+        "Credit card (automatic)"
+    ],
+}
+
+
+#======== MODEL LOADING ========
+def load_pipeline(path=MODEL_PATH):
+    """Unpickle the model file and return (model, scaler, feature columns)"""
+    with open(path, "rb") as f:
+        pipeline = pickle.load(f)
+
+    if not all(key in pipeline for key in ["model", "scaler", "columns"]):
+        raise ValueError(f"Invalid model file structure in '{path}'")
+
+    return pipeline["model"], pipeline["scaler"], pipeline["columns"]
+
+
+def model_fingerprint(path=MODEL_PATH):
+    """(mtime_ns, size) of the model file, or None if it does not exist; changes when the file is replaced"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def model_digest(path=MODEL_PATH):
+    """SHA-256 of the model file's contents; unlike model_fingerprint it ignores copies and touches"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+#======== MODEL ARTIFACT ========
+# Arrays of an artifact, in the order the content hash reads them
+ARTIFACT_ARRAYS = ["coef", "intercept", "mean", "scale"]
+ARTIFACT_FORMAT = 1
+
+
+def feature_vocabulary(feature_cols, numeric_cols=NUMERIC_COLS):
+    """Categories the model one-hot encodes, per source column, in feature order"""
+    vocabulary = {}
+    for feature in feature_cols:
+        column, sep, category = feature.partition("_")
+        if feature not in numeric_cols and sep:
+            vocabulary.setdefault(column, []).append(category)
+    return vocabulary
+
+
+def artifact_hash(manifest, arrays):
+    """SHA-256 of an artifact's manifest (minus its own hash) and arrays"""
+    digest = hashlib.sha256()
+    fields = {key: value for key, value in manifest.items() if key != "sha256"}
+    digest.update(json.dumps(fields, sort_keys=True).encode("utf-8"))
+    for name in ARTIFACT_ARRAYS:
+        digest.update(np.ascontiguousarray(arrays[name], dtype="<f8").tobytes())
+    return digest.hexdigest()
+
+
+def export_artifact(model, scaler, feature_cols, path=ARTIFACT_PATH, source_digest=None):
+    """
+    Write a fitted scaler + binary linear model to an .npz artifact: its
+    coefficients, intercept and scaler mean / scale as float64 arrays
+    plus a JSON manifest with the feature columns, category vocabulary,
+    sklearn version, the pickle's digest (`source_digest`) and a content
+    hash. The file replaces `path` atomically. Raises ValueError for
+    models that are not linear; returns the manifest.
+    """
+    import sklearn
+
+    coef, intercept, mean, scale = linear_parameters(model, scaler)
+    arrays = {"coef": coef, "intercept": np.array([intercept]), "mean": mean, "scale": scale}
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "model": type(model).__name__,
+        "feature_columns": list(feature_cols),
+        "numeric_columns": [col for col in feature_cols if col in NUMERIC_COLS],
+        "categories": feature_vocabulary(feature_cols),
+        "sklearn_version": sklearn.__version__,
+        "source_digest": source_digest,
+    }
+    manifest["sha256"] = artifact_hash(manifest, arrays)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, manifest=np.frombuffer(json.dumps(manifest).encode("utf-8"), dtype=np.uint8), **arrays)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def _check_manifest(path, manifest):
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format')!r} in '{path}'")
+
+
+def read_manifest(path=ARTIFACT_PATH):
+    """The JSON manifest of an .npz artifact, without reading its arrays"""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            manifest = json.loads(data["manifest"].tobytes())
+    except KeyError:
+        raise ValueError(f"'{path}' is not a model artifact (missing 'manifest')") from None
+    _check_manifest(path, manifest)
+    return manifest
+
+
+def load_artifact(path=ARTIFACT_PATH):
+    """
+    (FusedScorer, manifest) of an .npz artifact. Only plain arrays are
+    read (no pickles), and ValueError is raised when the file is not an
+    artifact or its content hash does not match.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            manifest = json.loads(data["manifest"].tobytes())
+            arrays = {name: data[name].astype(np.float64) for name in ARTIFACT_ARRAYS}
+    except KeyError as e:
+        raise ValueError(f"'{path}' is not a model artifact (missing {e})") from None
+    _check_manifest(path, manifest)
+    if artifact_hash(manifest, arrays) != manifest.get("sha256"):
+        raise ValueError(f"Content hash mismatch in '{path}': the artifact is corrupt or was edited")
+
+    scorer = FusedScorer.from_parameters(arrays["coef"], float(arrays["intercept"][0]), arrays["mean"],
+                                         arrays["scale"], manifest["feature_columns"])
+    return scorer, manifest
+
+
+def open_model(path=MODEL_PATH):
+    """
+    (scorer, feature columns) of a model file: an .npz artifact loads
+    without sklearn, a pickled pipeline goes through build_scorer
+    """
+    if str(path).endswith(".npz"):
+        scorer, _ = load_artifact(path)
+        return scorer, scorer.feature_cols
+    model, scaler, feature_cols = load_pipeline(path)
+    return build_scorer(model, scaler, feature_cols), feature_cols
+
+
+def resolve_model_path(directory=""):
+    """
+    The model file to load from `directory`: the artifact when there is
+    one and it was exported from the pickle there now, else the pickle
+    """
+    return preferred_model_file(os.path.join(directory, ARTIFACT_PATH), os.path.join(directory, MODEL_PATH))
+
+
+def preferred_model_file(artifact, pickled):
+    """`artifact` if it exists and was exported from `pickled` as it is now (or there is no pickle), else `pickled`"""
+    artifact_version = None if artifact is None else model_fingerprint(artifact)
+    pickled_version = None if pickled is None else model_fingerprint(pickled)
+    if artifact_version is None:
+        return pickled
+    if pickled_version is None or _exported_from(artifact, artifact_version, pickled, pickled_version):
+        return artifact
+    return pickled
+
+
+@functools.lru_cache(maxsize=8)
+def _exported_from(artifact, artifact_version, pickled, pickled_version):
+    """Whether `artifact` records `pickled`'s digest; cached per version of the two files"""
+    try:
+        return read_manifest(artifact).get("source_digest") == model_digest(pickled)
+    except (OSError, ValueError):
+        return False
+
+
+#======== FIXED-SCHEMA ENCODER ========
+class FeatureEncoder:
+    """
+    One-hot encoder compiled once from the model's feature column list.
+
+    Every "<column>_<category>" feature is mapped straight to its output
+    index, so encoding fills a preallocated matrix in one vectorized pass
+    per source column instead of building a throwaway get_dummies frame.
+    Categories the model has never seen encode as all-zeros.
+
+    Only the source columns the feature list refers to are read; ID,
+    label and any other extra columns are never touched.
+    """
+
+    def __init__(self, feature_cols, numeric_cols=NUMERIC_COLS, dtype=np.float32):
+        self.feature_cols = list(feature_cols)
+        self.dtype = np.dtype(dtype)
+
+        # Numeric features: source column -> output index
+        self.numeric_index = {}
+        # Categorical features: source column -> (category Index, output indices)
+        self.category_index = {}
+
+        categories = {}
+        for idx, feature in enumerate(self.feature_cols):
+            if feature in numeric_cols:
+                self.numeric_index[feature] = idx
+                continue
+            column, sep, category = feature.partition("_")
+            if not sep:
+                # get_dummies never emits an unprefixed name, so it stays zero
+                continue
+            categories.setdefault(column, []).append((category, idx))
+
+        for column, pairs in categories.items():
+            labels, indices = zip(*pairs)
+            self.category_index[column] = (pd.Index(labels), np.array(indices, dtype=np.intp))
+
+        # Plain dict lookups for encoding a handful of records without pandas
+        self.record_index = {
+            column: dict(zip(labels, indices.tolist()))
+            for column, (labels, indices) in self.category_index.items()
+        }
+
+        # Output positions of the numeric features, in feature order
+        self.numeric_positions = np.array(list(self.numeric_index.values()), dtype=np.intp)
+
+    @property
+    def n_features(self):
+        return len(self.feature_cols)
+
+    @property
+    def source_columns(self):
+        """Raw input columns the model's features are derived from"""
+        return list(self.numeric_index) + list(self.category_index)
+
+    def check_columns(self, columns):
+        """Split input column names into (missing source columns, passthrough columns)"""
+        columns = list(columns)
+        sources = set(self.source_columns)
+        missing = [col for col in self.source_columns if col not in columns]
+        passthrough = [col for col in columns if col not in sources]
+        return missing, passthrough
+
+    @staticmethod
+    def _category_codes(series, labels):
+        """Position of each value in `labels`, -1 for unknown or missing"""
+        # Factorize once, then resolve only the distinct values against the vocabulary
+        codes, uniques = pd.factorize(series)
+        if not (pd.api.types.is_object_dtype(uniques) or pd.api.types.is_string_dtype(uniques)):
+            # get_dummies names non-string categories by their str() form
+            uniques = uniques.astype(str)
+        lookup = np.append(labels.get_indexer(uniques), -1)
+        return lookup[codes]
+
+    def transform(self, raw_df):
+        """Encode a raw customer frame into a (rows x features) matrix"""
+        n_rows = len(raw_df)
+        # Column-major so every feature is one contiguous block to fill
+        out = np.zeros((n_rows, self.n_features), dtype=self.dtype, order="F")
+        flat = out.ravel(order="F")
+
+        for column, idx in self.numeric_index.items():
+            if column in raw_df.columns:
+                out[:, idx] = raw_df[column].to_numpy(dtype=self.dtype)
+
+        for column, (labels, indices) in self.category_index.items():
+            if column not in raw_df.columns:
+                continue
+            series = raw_df[column]
+
+            if series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+                # Plain strings: one equality mask per known category is
+                # cheaper than hashing every value into a code
+                values = series.to_numpy() if series.dtype == object else series
+                for label, idx in zip(labels, indices):
+                    out[:, idx] = values == label
+            else:
+                codes = self._category_codes(series, labels)
+                rows = np.flatnonzero(codes >= 0)
+                flat[indices[codes[rows]] * n_rows + rows] = 1
+
+        return out
+
+    def transform_records(self, records):
+        """
+        Encode a list of customer dicts into a (rows x features) matrix.
+
+        Same output as transform() on the equivalent frame, but without
+        building a DataFrame, which dominates the cost for a few rows.
+        """
+        out = np.zeros((len(records), self.n_features), dtype=self.dtype)
+        for row, record in enumerate(records):
+            for column, idx in self.numeric_index.items():
+                value = record.get(column)
+                if value is not None:
+                    out[row, idx] = value
+            for column, lookup in self.record_index.items():
+                value = record.get(column)
+                if value is not None and not isinstance(value, str):
+                    value = str(value)
+                idx = lookup.get(value)
+                if idx is not None:
+                    out[row, idx] = 1
+        return out
+
+    def _feature_slots(self, series, labels, indices, slot_dtype):
+        """Output feature index of each row's category, -1 for unknown or missing"""
+        if series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+            values = series.to_numpy() if series.dtype == object else series
+            slots = np.full(len(series), -1, dtype=slot_dtype)
+            for label, idx in zip(labels, indices):
+                slots[np.asarray(values == label)] = idx
+            return slots
+        codes = self._category_codes(series, labels)
+        return np.where(codes >= 0, indices[codes], -1).astype(slot_dtype)
+
+    def transform_sparse(self, raw_df):
+        """
+        Encode into a (numeric, onehot) pair without a dense one-hot block.
+
+        `numeric` is a dense float64 (rows x numeric features) array in
+        feature order (see numeric_positions); `onehot` is a CSR matrix
+        over the full feature list holding at most one 1 per source
+        column per row, with the numeric columns left empty.
+        """
+        from scipy import sparse
+
+        n_rows = len(raw_df)
+        numeric = np.zeros((n_rows, len(self.numeric_index)), dtype=np.float64)
+        for pos, column in enumerate(self.numeric_index):
+            if column in raw_df.columns:
+                numeric[:, pos] = raw_df[column].to_numpy(dtype=np.float64)
+
+        # One slot per source column and row, holding its feature index or -1
+        slot_dtype = np.int16 if self.n_features < 2**15 else np.int32
+        slots = np.full((n_rows, len(self.category_index)), -1, dtype=slot_dtype)
+        for pos, (column, (labels, indices)) in enumerate(self.category_index.items()):
+            if column in raw_df.columns:
+                slots[:, pos] = self._feature_slots(raw_df[column], labels, indices, slot_dtype)
+
+        # Row-major selection keeps the column indices grouped by row, i.e. CSR order
+        present = slots >= 0
+        indptr = np.zeros(n_rows + 1, dtype=np.int32)
+        np.cumsum(present.sum(axis=1), out=indptr[1:])
+        indices = slots[present].astype(np.int32)
+        data = np.ones(len(indices), dtype=np.int8)
+        onehot = sparse.csr_matrix((data, indices, indptr), shape=(n_rows, self.n_features))
+        return numeric, onehot
+
+    def transform_frame(self, raw_df):
+        """Same as transform(), wrapped as a DataFrame with the model's column names"""
+        return pd.DataFrame(self.transform(raw_df), columns=self.feature_cols, copy=False)
+
+
+#======== RISK LEVELS ========
+def assign_risk_levels(probabilities):
+    """Bin churn probabilities into the LOW / MEDIUM / HIGH categorical"""
+    return pd.cut(probabilities, bins=RISK_BINS, labels=RISK_LABELS)
+
+
+def risk_level(probability):
+    """LOW / MEDIUM / HIGH for a single churn probability"""
+    if probability >= RISK_BINS[2]:
+        return "HIGH"
+    if probability >= RISK_BINS[1]:
+        return "MEDIUM"
+    return "LOW"
+
+
+#======== RETENTION RULES ========
+# Rule conditions only use ==, <, >, & and |, so the same table evaluates
+# on one customer dict (giving a bool) and on a whole DataFrame (giving
+# a boolean column mask).
+
+# (factor, level, condition), in display order
+RISK_FACTOR_RULES = [
+    ("Month-to-month contract", "HIGH", lambda c: c["Contract"] == "Month-to-month"),
+    ("Short tenure (<12 months)", "HIGH", lambda c: c["tenure"] < 12),
+    ("Electronic check payment", "MEDIUM", lambda c: c["PaymentMethod"] == "Electronic check"),
+    ("High fiber optic charges", "MEDIUM",
+     lambda c: (c["InternetService"] == "Fiber optic") & (c["MonthlyCharges"] > 80)),
+    ("No online security", "MEDIUM", lambda c: c["OnlineSecurity"] == "No"),
+    ("No tech support", "MEDIUM", lambda c: c["TechSupport"] == "No"),
+    ("Senior citizen", "LOW", lambda c: c["SeniorCitizen"] == 1),
+]
+NO_RISK_FACTORS = ("No major risk factors identified", "LOW")
+
+# (icon, title, action, condition), in priority order
+RECOMMENDATION_RULES = [
+    ("📋", "Contract Upgrade", "Offer 15% discount to upgrade to 1-year or 2-year contract",
+     lambda c: c["Contract"] == "Month-to-month"),
+    ("🎁", "Welcome Package", "Provide onboarding support and loyalty rewards for first year",
+     lambda c: c["tenure"] < 12),
+    ("🛡️", "Service Bundle", "Offer free trial of security and support services for 3 months",
+     lambda c: (c["OnlineSecurity"] == "No") | (c["TechSupport"] == "No")),
+    ("💰", "Price Optimization", "Review pricing plan and offer customized package",
+     lambda c: c["MonthlyCharges"] > 80),
+    ("💳", "Payment Method", "Incentivize automatic payment methods with $5/month discount",
+     lambda c: c["PaymentMethod"] == "Electronic check"),
+]
+# Recommendations are only made from this churn probability up (MEDIUM and HIGH risk)
+RECOMMENDATION_THRESHOLD = RISK_BINS[1]
+MAX_RECOMMENDATIONS = 3
+
+
+def find_risk_factors(customer):
+    """Heuristic (factor, level) risk flags for one customer's attributes"""
+    risk_factors = [(factor, level) for factor, level, condition in RISK_FACTOR_RULES
+                    if condition(customer)]
+    return risk_factors or [NO_RISK_FACTORS]
+
+
+def recommend_retention(customer, limit=MAX_RECOMMENDATIONS):
+    """First `limit` (icon, title, action) retention recommendations for one customer"""
+    return [(icon, title, action) for icon, title, action, condition in RECOMMENDATION_RULES
+            if condition(customer)][:limit]
+
+
+def rule_masks(frame, conditions):
+    """
+    Boolean (rows x rules) matrix of which conditions hold for each row.
+
+    A condition on a column the frame lacks, or on a missing value,
+    counts as not holding.
+    """
+    masks = np.zeros((len(frame), len(conditions)), dtype=bool)
+    for j, condition in enumerate(conditions):
+        try:
+            mask = condition(frame)
+        except KeyError:
+            continue
+        masks[:, j] = mask.fillna(False).to_numpy(dtype=bool)
+    return masks
+
+
+def rule_keys(masks, limit=None):
+    """
+    One int64 per row with bit j set when rule j holds, keeping only each
+    row's first `limit` set rules when given.
+    """
+    if limit is not None:
+        masks = masks & (np.cumsum(masks, axis=1) <= limit)
+    return masks.astype(np.int64) @ (np.int64(1) << np.arange(masks.shape[1], dtype=np.int64))
+
+
+def _join_rule_labels(keys, labels, sep="; "):
+    """
+    Per-row categorical of the `sep`-joined labels set in rule_keys().
+    Only the few distinct combinations are ever joined as strings.
+    """
+    # Keys are below 2**len(labels), so a count per possible key replaces sorting the rows
+    present = np.bincount(keys, minlength=1 << len(labels)) > 0
+    combos = np.flatnonzero(present)
+    codes = (np.cumsum(present) - 1)[keys]
+    names = [sep.join(label for j, label in enumerate(labels) if combo >> j & 1) for combo in combos]
+    return pd.Categorical.from_codes(codes, categories=names)
+
+
+def retention_keys(frame, probabilities, limit=MAX_RECOMMENDATIONS):
+    """
+    (factor keys, recommendation keys): the rule_keys() of the risk
+    factors and recommendations of a batch, for retention_labels()
+    """
+    factor_masks = rule_masks(frame, [condition for *_, condition in RISK_FACTOR_RULES])
+    recommendation_masks = rule_masks(frame, [condition for *_, condition in RECOMMENDATION_RULES])
+    recommendation_masks &= (np.asarray(probabilities) >= RECOMMENDATION_THRESHOLD)[:, None]
+    return rule_keys(factor_masks), rule_keys(recommendation_masks, limit)
+
+
+def retention_labels(factor_keys, recommendation_keys):
+    """(risk_factors, recommendations) categoricals of retention_keys()"""
+    return (_join_rule_labels(factor_keys, [factor for factor, *_ in RISK_FACTOR_RULES]),
+            _join_rule_labels(recommendation_keys, [title for _, title, *_ in RECOMMENDATION_RULES]))
+
+
+def retention_columns(frame, probabilities, limit=MAX_RECOMMENDATIONS):
+    """
+    Vectorized risk factors and recommendations for a batch of customers.
+
+    Returns (risk_factors, recommendations) categoricals of "; "-joined
+    factor and recommendation titles, one entry per row. Rows without a
+    flagged factor get an empty string, and rows below
+    RECOMMENDATION_THRESHOLD get no recommendations, as in the
+    single-customer view.
+    """
+    return retention_labels(*retention_keys(frame, probabilities, limit))
+
+
+#======== CONTRIBUTIONS ========
+# How many risk-raising features batch exports list per customer
+TOP_DRIVERS = 3
+
+# Contribution to the churn log-odds from which a driver is shown as HIGH / MEDIUM
+IMPACT_BINS = [1.0, 0.4]
+
+# (when the value is above average, below average) wording for the numeric columns
+NUMERIC_DRIVER_LABELS = {
+    "SeniorCitizen": ("Senior citizen", "Not a senior citizen"),
+    "tenure": ("Long tenure", "Short tenure"),
+    "MonthlyCharges": ("High monthly charges", "Low monthly charges"),
+    "TotalCharges": ("High total charges", "Low total charges"),
+}
+
+
+def driver_label(feature, weight):
+    """
+    Wording of a feature that raises churn risk.
+
+    A positive contribution weight * (x - mean) means x is above the
+    training mean when the weight is positive and below it otherwise,
+    so the label only depends on the feature and its weight's sign.
+    """
+    above = weight > 0
+    if feature in NUMERIC_DRIVER_LABELS:
+        return NUMERIC_DRIVER_LABELS[feature][0 if above else 1]
+    for col, levels in CATEGORY_LEVELS.items():
+        if feature.startswith(col + "_"):
+            level = feature[len(col) + 1:]
+            if above:
+                return f"{col}: {level}"
+            # Two-level columns have a single alternative to name
+            others = [other for other in levels if other != level]
+            return f"{col}: {others[0]}" if len(others) == 1 else f"{col}: not {level}"
+    return feature if above else f"not {feature}"
+
+
+def impact_level(impact):
+    """HIGH / MEDIUM / LOW badge for a log-odds contribution"""
+    if impact >= IMPACT_BINS[0]:
+        return "HIGH"
+    if impact >= IMPACT_BINS[1]:
+        return "MEDIUM"
+    return "LOW"
+
+
+#======== SCORERS ========
+def encoded_rows(encoded):
+    """Row count of an encoded block, or of a (numeric, onehot) pair from transform_sparse"""
+    return encoded[0].shape[0] if isinstance(encoded, tuple) else encoded.shape[0]
+
+
+def _sigmoid(z):
+    """Numerically stable logistic function"""
+    return np.exp(-np.logaddexp(0.0, -z))
+
+
+class PipelineScorer:
+    """Churn probability through the pickled scaler and model, as trained"""
+
+    def __init__(self, scaler, model, feature_cols):
+        self.scaler = scaler
+        self.model = model
+        self.feature_cols = list(feature_cols)
+
+    def predict_proba(self, encoded):
+        """Churn probability for each row of an encoded matrix or frame"""
+        # sklearn rejects empty input, e.g. an incremental batch with no changes
+        if encoded.shape[0] == 0:
+            return np.empty(0, dtype=np.float64)
+        if not isinstance(encoded, pd.DataFrame):
+            encoded = pd.DataFrame(encoded, columns=self.feature_cols, copy=False)
+        with stage("scale", encoded.shape[0]):
+            scaled = self.scaler.transform(encoded)
+        return self.model.predict_proba(scaled)[:, 1]
+
+
+class FusedScorer:
+    """
+    StandardScaler + logistic regression folded into one weight vector.
+
+    ((x - mean) / scale) @ coef + b == x @ (coef / scale) + (b - (mean / scale) @ coef),
+    so scoring is a single matrix-vector product and a sigmoid with no
+    DataFrame round trip or sklearn input validation.
+
+    `offsets` (weights * mean) keeps the per-feature split of that
+    intercept, so each feature's exact share of the log-odds,
+    coef * scaled value, is weights * x - offsets.
+    """
+
+    def __init__(self, weights, intercept, feature_cols, offsets=None):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.feature_cols = list(feature_cols)
+        self.offsets = (np.zeros_like(self.weights) if offsets is None
+                        else np.asarray(offsets, dtype=np.float64))
+        self.numeric_positions = np.array(
+            [idx for idx, col in enumerate(self.feature_cols) if col in NUMERIC_COLS], dtype=np.intp)
+        # What a positive contribution of each feature means for the customer
+        self.driver_labels = [driver_label(col, weight) for col, weight in zip(self.feature_cols, self.weights)]
+        # Smallest signed type holding every feature position and -1, like transform_sparse's slot_dtype
+        self.code_dtype = np.int8 if len(self.weights) < 2**7 else np.int16 if len(self.weights) < 2**15 else np.int32
+
+    @classmethod
+    def from_pipeline(cls, model, scaler, feature_cols, check=True):
+        """
+        Derive the fused weights from a fitted scaler and linear model.
+
+        Raises ValueError if the model is not a binary linear classifier
+        or, with `check`, if the fused scores drift from predict_proba.
+        """
+        coef, intercept, mean, scale = linear_parameters(model, scaler)
+        scorer = cls.from_parameters(coef, intercept, mean, scale, feature_cols)
+        if check:
+            scorer.verify(PipelineScorer(scaler, model, feature_cols), probe_rows(mean, scale))
+        return scorer
+
+    @classmethod
+    def from_parameters(cls, coef, intercept, mean, scale, feature_cols):
+        """Fold raw coefficients, intercept and scaler mean / scale into a scorer"""
+        weights = coef / scale
+        return cls(weights, intercept - np.dot(mean, weights), feature_cols, offsets=weights * mean)
+
+    def decision_function(self, encoded):
+        """
+        Churn log-odds for each row of an encoded matrix or frame, or of a
+        (numeric, onehot) pair from FeatureEncoder.transform_sparse
+        """
+        if isinstance(encoded, tuple):
+            # Sparse dot over the one-hot block plus dense dot over the numerics
+            numeric, onehot = encoded
+            return onehot @ self.weights + numeric @ self.weights[self.numeric_positions] + self.intercept
+        return np.asarray(encoded) @ self.weights + self.intercept
+
+    def predict_proba(self, encoded):
+        """Churn probability for each row of an encoded input (see decision_function)"""
+        return _sigmoid(self.decision_function(encoded))
+
+    def contributions(self, encoded):
+        """
+        Per-feature log-odds contributions, (rows x features) float64.
+
+        Each row sums to its decision_function minus the model's own
+        intercept, i.e. it is the exact coef * scaled value breakdown.
+        """
+        if isinstance(encoded, tuple):
+            numeric, onehot = encoded
+            encoded = onehot.toarray().astype(np.float64)
+            encoded[:, self.numeric_positions] = numeric
+        return np.asarray(encoded) * self.weights - self.offsets
+
+    def top_contributions(self, encoded, k=TOP_DRIVERS, block_rows=65_536):
+        """
+        The `k` features raising each row's churn log-odds the most.
+
+        Returns (codes, impacts): (rows x k) code_dtype feature positions, -1
+        where a row has fewer than k risk-raising features, and float32
+        log-odds contributions (NaN for -1), largest first. Rows are
+        processed in blocks so the dense contribution matrix stays small.
+        """
+        n_rows = encoded_rows(encoded)
+        k = min(k, len(self.weights))
+        codes = np.full((n_rows, k), -1, dtype=self.code_dtype)
+        impacts = np.full((n_rows, k), np.nan, dtype=np.float32)
+
+        for start in range(0, n_rows, block_rows):
+            stop = min(start + block_rows, n_rows)
+            if isinstance(encoded, tuple):
+                block = (encoded[0][start:stop], encoded[1][start:stop])
+            elif isinstance(encoded, pd.DataFrame):
+                block = encoded.iloc[start:stop].to_numpy()
+            else:
+                block = encoded[start:stop]
+            contrib = self.contributions(block)
+
+            # Unordered top k per row, then sort just those k
+            top = np.argpartition(-contrib, k - 1, axis=1)[:, :k]
+            values = np.take_along_axis(contrib, top, axis=1)
+            order = np.argsort(-values, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            values = np.take_along_axis(values, order, axis=1)
+
+            raising = values > 0
+            codes[start:stop] = np.where(raising, top, -1)
+            impacts[start:stop] = np.where(raising, values, np.nan)
+        return codes, impacts
+
+    def driver_columns(self, codes, impacts):
+        """Driver_i (categorical label) and Driver_i_Impact columns from top_contributions()"""
+        columns = {}
+        for rank in range(codes.shape[1]):
+            columns[f"Driver_{rank + 1}"] = pd.Categorical.from_codes(codes[:, rank], categories=self.driver_labels)
+            columns[f"Driver_{rank + 1}_Impact"] = impacts[:, rank]
+        return columns
+
+    def top_factors(self, encoded_row, k=TOP_DRIVERS):
+        """[(driver label, log-odds impact)] for a single encoded row, largest first"""
+        codes, impacts = self.top_contributions(encoded_row, k)
+        return [(self.driver_labels[code], float(impact))
+                for code, impact in zip(codes[0], impacts[0]) if code >= 0]
+
+    def verify(self, reference, probe, tol=1e-9):
+        """Raise ValueError unless scores on `probe` match `reference` within `tol`"""
+        error = np.max(np.abs(self.predict_proba(probe) - reference.predict_proba(probe)))
+        if error > tol:
+            raise ValueError(f"Fused scorer differs from the model by {error:.2e} (tolerance {tol:.0e})")
+        return error
+
+
+def linear_parameters(model, scaler):
+    """
+    (coef, intercept, mean, scale) float64 parameters of a fitted scaler and
+    binary linear model; raises ValueError for any other kind of model
+    """
+    coef = getattr(model, "coef_", None)
+    if coef is None or coef.shape[0] != 1 or not hasattr(model, "intercept_"):
+        raise ValueError(f"{type(model).__name__} is not a binary linear model")
+    coef = coef[0].astype(np.float64)
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    mean = np.zeros_like(coef) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones_like(coef) if scale is None else np.asarray(scale, dtype=np.float64)
+    return coef, float(model.intercept_[0]), mean, scale
+
+
+def probe_rows(mean, scale, n_rows=256):
+    """
+    Rows drawn around the training distribution, one standard deviation
+    per feature, which keep the log-odds unsaturated for parity checks
+    """
+    rng = np.random.default_rng(0)
+    return mean + scale * rng.standard_normal((n_rows, len(mean)))
+
+
+def build_scorer(model, scaler, feature_cols):
+    """Fused scorer when the pipeline is linear and verifies, else the sklearn pipeline"""
+    try:
+        return FusedScorer.from_pipeline(model, scaler, feature_cols)
+    except ValueError:
+        return PipelineScorer(scaler, model, feature_cols)
+
+
+#======== LOOKUP-TABLE SCORER ========
+# Values of every discrete model input: the categoricals and the binary SeniorCitizen flag
+LOOKUP_LEVELS = {**CATEGORY_LEVELS, "SeniorCitizen": [0, 1]}
+# Largest table LookupScorer builds; the Telco inputs need about 5M entries
+LOOKUP_MAX_ENTRIES = 2**26
+
+
+def level_codes(series, levels):
+    """int32 position of each value in `levels` (a pd.Index), -1 for anything else or missing"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Resolve the few categories, then gather by the row codes (-1, missing, maps to the appended -1)
+        categories = series.cat.categories
+        if not (pd.api.types.is_object_dtype(categories) or pd.api.types.is_string_dtype(categories)):
+            categories = categories.astype(str) if levels.dtype == object else categories
+        lookup = np.append(levels.get_indexer(categories), -1).astype(np.int32)
+        return lookup[series.cat.codes.to_numpy()]
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return levels.get_indexer(series.to_numpy(dtype=np.float64)).astype(np.int32)
+    return FeatureEncoder._category_codes(series, levels).astype(np.int32)
+
+
+class LookupScorer:
+    """
+    FusedScorer with the log-odds of every discrete input combination precomputed.
+
+    Every input but tenure, MonthlyCharges and TotalCharges takes a
+    handful of values, so the intercept plus their share of the log-odds
+    is tabulated once for every combination of them. The table is
+    indexed by a mixed-radix key of their level codes and holds about 5M
+    float32 entries (19 MB) for the Telco schema. prepare() turns a raw
+    frame into keys plus the continuous columns, so predict_proba() is
+    one gather and a 3-column dot product. Rows with a value outside the
+    table (an unseen or missing category) are one-hot encoded in
+    prepare() and scored by the fused scorer instead. Table entries are
+    rounded to float32, so scores agree with the fused scorer to ~1e-7.
+    There are no per-feature contributions, so no churn drivers.
+    """
+
+    def __init__(self, fused, levels=LOOKUP_LEVELS, max_entries=LOOKUP_MAX_ENTRIES):
+        self.fused = fused
+        self.feature_cols = fused.feature_cols
+        self.encoder = FeatureEncoder(fused.feature_cols)
+        sources = self.encoder.source_columns
+        # Key columns, most significant first: the discrete inputs the model reads
+        self.levels = {column: pd.Index(values) for column, values in levels.items() if column in sources}
+        self.continuous = [column for column in self.encoder.numeric_index if column not in self.levels]
+        self.continuous_weights = fused.weights[[self.encoder.numeric_index[column] for column in self.continuous]]
+
+        entries = int(np.prod([len(values) for values in self.levels.values()]))
+        if entries > max_entries:
+            raise ValueError(f"A lookup table over {', '.join(self.levels)} needs {entries:,} entries "
+                             f"(limit {max_entries:,})")
+        # Outer sum, column by column, so the last key column varies fastest
+        table = np.array([fused.intercept])
+        for column, values in self.levels.items():
+            table = (table[:, None] + self._level_weights(column, values)).ravel()
+        self.table = table.astype(np.float32)
+
+    def _level_weights(self, column, values):
+        """Log-odds contribution of each value of a key column"""
+        if column in self.encoder.numeric_index:
+            return self.fused.weights[self.encoder.numeric_index[column]] * values.to_numpy(dtype=np.float64)
+        lookup = self.encoder.record_index.get(column, {})
+        # Dropped (reference) levels have no feature, so contribute nothing
+        return np.array([self.fused.weights[lookup[str(value)]] if str(value) in lookup else 0.0
+                         for value in values])
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def prepare(self, raw_df):
+        """
+        (keys, continuous, fallback rows, their one-hot block) of a raw
+        customer frame, for predict_proba(); the lookup counterpart of
+        FeatureEncoder.transform
+        """
+        n_rows = len(raw_df)
+        keys = np.zeros(n_rows, dtype=np.int32)
+        known = np.ones(n_rows, dtype=bool)
+        for column, levels in self.levels.items():
+            if column not in raw_df.columns:
+                known[:] = False
+                continue
+            codes = level_codes(raw_df[column], levels)
+            known &= codes >= 0
+            keys *= len(levels)
+            keys += codes
+        keys[~known] = 0
+
+        continuous = np.zeros((n_rows, len(self.continuous)), dtype=self.encoder.dtype)
+        for pos, column in enumerate(self.continuous):
+            if column in raw_df.columns:
+                continuous[:, pos] = raw_df[column].to_numpy(dtype=self.encoder.dtype)
+        fallback = np.flatnonzero(~known)
+        encoded = self.encoder.transform(raw_df.iloc[fallback]) if len(fallback) else None
+        return keys, continuous, fallback, encoded
+
+    def decision_function(self, prepared):
+        """Churn log-odds for each row of a prepare() result"""
+        keys, continuous, fallback, encoded = prepared
+        log_odds = continuous @ self.continuous_weights
+        log_odds += self.table[keys]
+        if len(fallback):
+            log_odds[fallback] = self.fused.decision_function(encoded)
+        return log_odds
+
+    def predict_proba(self, prepared):
+        """Churn probability for each row of a prepare() result"""
+        return _sigmoid(self.decision_function(prepared))
+
+
+#======== WHAT-IF ANALYSIS ========
+# Attributes a retention offer can change, in the order changes are listed
+WHAT_IF_COLUMNS = [
+    "Contract", "PaymentMethod", "PaperlessBilling", "TechSupport", "OnlineSecurity", "OnlineBackup",
+    "DeviceProtection", "StreamingTV", "StreamingMovies", "InternetService", "MultipleLines", "PhoneService",
+]
+# Monthly charge discounts offered as interventions
+WHAT_IF_DISCOUNTS = [0.1, 0.2, 0.3]
+INTERNET_ADD_ONS = ["OnlineSecurity", "OnlineBackup", "DeviceProtection", "TechSupport",
+                    "StreamingTV", "StreamingMovies"]
+NO_INTERNET = "No internet service"
+NO_PHONE = "No phone service"
+
+
+def attribute_changes(customer, columns=WHAT_IF_COLUMNS, discounts=WHAT_IF_DISCOUNTS):
+    """
+    Every single-attribute change to `customer` as [(label, {column: new value})].
+
+    Each change keeps the profile consistent the way the form does:
+    add-ons only change with internet service and multiple lines only
+    with phone service, while dropping or taking up a service also resets
+    the attributes that depend on it. Dropping the customer's only
+    service is not offered. A discount lowers MonthlyCharges only;
+    TotalCharges is what the customer has already paid.
+    """
+    internet = customer["InternetService"] != "No"
+    phone = customer["PhoneService"] != "No"
+    changes = []
+    for column in columns:
+        current = customer[column]
+        for level in CATEGORY_LEVELS[column]:
+            if level == current or level in (NO_INTERNET, NO_PHONE):
+                continue
+            if column in INTERNET_ADD_ONS and not internet or column == "MultipleLines" and not phone:
+                continue
+            change = {column: level}
+            if column == "InternetService":
+                if level == "No":
+                    if not phone:
+                        continue
+                    change.update(dict.fromkeys(INTERNET_ADD_ONS, NO_INTERNET))
+                elif not internet:
+                    change.update(dict.fromkeys(INTERNET_ADD_ONS, "No"))
+            if column == "PhoneService":
+                if level == "No" and not internet:
+                    continue
+                change["MultipleLines"] = NO_PHONE if level == "No" else "No"
+            changes.append((f"{column}: {current} → {level}", change))
+    for discount in discounts:
+        charges = round(float(customer["MonthlyCharges"]) * (1 - discount), 2)
+        changes.append((f"MonthlyCharges: {discount:.0%} discount (${charges:,.2f})", {"MonthlyCharges": charges}))
+    return changes
+
+
+def change_deltas(encoder, customer, changes, dtype=np.float32):
+    """
+    (changes x features) matrix that turns the encoded `customer` into
+    each changed profile when added to it: -1 on the old one-hot feature,
+    +1 on the new one, and the difference on numeric features
+    """
+    deltas = np.zeros((len(changes), encoder.n_features), dtype=dtype)
+    for row, (_, change) in enumerate(changes):
+        for column, value in change.items():
+            if column in encoder.numeric_index:
+                deltas[row, encoder.numeric_index[column]] += float(value) - float(customer[column])
+                continue
+            lookup = encoder.record_index.get(column, {})
+            # Dropped (reference) levels have no feature of their own
+            old, new = lookup.get(str(customer[column])), lookup.get(str(value))
+            if old is not None:
+                deltas[row, old] -= 1
+            if new is not None:
+                deltas[row, new] += 1
+    return deltas
+
+
+def change_pairs(changes):
+    """(first, second) positions of the changes that combine: disjoint attributes, some service kept"""
+    touched = [set(change) for _, change in changes]
+    dropped = [{column for column in ("PhoneService", "InternetService") if change.get(column) == "No"}
+               for _, change in changes]
+    first, second = np.triu_indices(len(changes), k=1)
+    keep = [not touched[i] & touched[j] and len(dropped[i] | dropped[j]) < 2
+            for i, j in zip(first.tolist(), second.tolist())]
+    return first[keep], second[keep]
+
+
+def what_if(scorer, encoder, customer, pairs=False, columns=WHAT_IF_COLUMNS, discounts=WHAT_IF_DISCOUNTS):
+    """
+    Score every attribute change to one customer (and, with `pairs`,
+    every compatible pair of changes) in a single predict_proba call.
+
+    The customer is encoded once; each variant is that row plus the
+    change's one-hot / numeric delta, so hundreds of counterfactuals
+    cost one matrix product. Returns (baseline probability, frame of
+    Change, Changes, Churn_Probability, Risk_Level and Reduction, largest
+    reduction first).
+    """
+    changes = attribute_changes(customer, columns, discounts)
+    base = encoder.transform_records([customer])
+    deltas = change_deltas(encoder, customer, changes, encoder.dtype)
+    labels = [label for label, _ in changes]
+    counts = [1] * len(changes)
+    if pairs:
+        first, second = change_pairs(changes)
+        deltas = np.vstack([deltas, deltas[first] + deltas[second]])
+        labels += [f"{labels[i]} + {labels[j]}" for i, j in zip(first.tolist(), second.tolist())]
+        counts += [2] * len(first)
+
+    # Row 0 is the unchanged customer, scored alongside the variants
+    variants = base + np.vstack([np.zeros_like(base), deltas])
+    with stage("what-if", len(variants)):
+        probabilities = scorer.predict_proba(variants)
+    baseline, probabilities = float(probabilities[0]), probabilities[1:]
+    # Ranked before the frame is built: a few hundred rows cost more in pandas than in the scorer
+    order = np.argsort(probabilities, kind="stable")
+    probabilities = probabilities[order]
+    return baseline, pd.DataFrame({
+        "Change": [labels[i] for i in order.tolist()],
+        "Changes": np.array(counts, dtype=np.int8)[order],
+        "Churn_Probability": probabilities,
+        "Risk_Level": [risk_level(probability) for probability in probabilities.tolist()],
+        "Reduction": baseline - probabilities,
+    })
+
+
+#======== PREDICTION CACHE ========
+def profile_key(customer):
+    """
+    Hashable, normalized key for one customer's 19 model attributes.
+
+    Numeric fields are compared as floats, so 12 and 12.0 share an entry;
+    anything outside INPUT_COLUMNS (IDs, notes) is ignored.
+    """
+    return tuple(
+        float(customer[col]) if col in NUMERIC_COLS else customer[col]
+        for col in INPUT_COLUMNS
+    )
+
+
+class PredictionCache:
+    """
+    Bounded, thread-safe LRU cache of churn probabilities by customer profile.
+
+    The cache holds no reference to the model, so build one per model
+    version (e.g. keyed on model_fingerprint) to invalidate it on reload.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_compute(self, customer, compute):
+        """Cached probability for `customer`, else `compute(customer)` stored as most recent"""
+        key = profile_key(customer)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute(customer)
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters plus current size and hit rate (None before the first lookup)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
@@ -0,0 +1,262 @@
+"""
+Budget-constrained retention targeting over scored batches.
+
+Each retention recommendation the app makes (RECOMMENDATION_RULES) is an
+action with a cost per targeted customer and an uplift: the share of the
+customer's churn probability it is expected to remove. A customer's
+revenue at risk is Churn_Probability x MonthlyCharges x the months a
+customer who stays is expected to remain, and an action saves its uplift
+times that. Those months are the rest of the customer's current contract
+term, from their Contract and tenure, plus MONTHS_AFTER_TERM (or the
+figure given) once it ends.
+
+A RetentionPlanner collects every customer's worthwhile actions chunk by
+chunk, so it can ride along with stream_score(), and solve() then picks
+the target list that saves the most revenue within a budget. Like
+churn_engine, nothing in here imports Streamlit.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from churn_engine import ID_COLUMN, RECOMMENDATION_RULES, RECOMMENDATION_THRESHOLD, rule_masks
+
+
+# Recommendation title -> (cost per targeted customer in $, share of churn probability removed).
+# Starting points only: replace them with the campaign's own figures.
+ACTION_ECONOMICS = {
+    "Contract Upgrade": (120.0, 0.40),
+    "Welcome Package": (40.0, 0.15),
+    "Service Bundle": (30.0, 0.20),
+    "Price Optimization": (90.0, 0.25),
+    "Payment Method": (60.0, 0.10),
+}
+# Months a customer who doesn't churn is expected to stay after their current contract term
+MONTHS_AFTER_TERM = 24
+# Length in months of each Contract's term, which renews until the customer leaves
+CONTRACT_TERMS = {"Month-to-month": 1, "One year": 12, "Two year": 24}
+# Column revenue at risk is valued from
+CHARGES_COLUMN = "MonthlyCharges"
+
+
+#======== REVENUE ========
+def remaining_tenure(frame, months_after_term=MONTHS_AFTER_TERM):
+    """
+    Months each customer of a frame is expected to stay if retained: what
+    is left of their current contract term (a One year customer at tenure
+    15 has 9) plus `months_after_term`. Without a known Contract and
+    tenure only `months_after_term` counts.
+    """
+    left = np.zeros(len(frame))
+    if "Contract" in frame.columns and "tenure" in frame.columns:
+        tenure = np.nan_to_num(frame["tenure"].to_numpy(dtype=np.float64, na_value=np.nan))
+        for contract, term in CONTRACT_TERMS.items():
+            holders = (frame["Contract"] == contract).to_numpy(dtype=bool, na_value=False)
+            left[holders] = term - tenure[holders] % term
+    return left + months_after_term
+
+
+def revenue_at_risk(probabilities, monthly_charges, remaining_months):
+    """Revenue each customer is expected to take with them: p x MonthlyCharges x remaining tenure (per customer)"""
+    return (np.asarray(probabilities, dtype=np.float64) * np.asarray(monthly_charges, dtype=np.float64)
+            * remaining_months)
+
+
+#======== ACTIONS ========
+def check_actions(actions):
+    """
+    Validated {title: (cost, uplift)} of the recommendation titles to plan
+    with, in recommendation order. Raises ValueError for an unknown title,
+    a cost that isn't positive or an uplift outside [0, 1].
+    """
+    titles = [title for _, title, *_ in RECOMMENDATION_RULES]
+    unknown = [title for title in actions if title not in titles]
+    if unknown:
+        raise ValueError(f"Unknown retention action(s) {', '.join(unknown)} (choose from {', '.join(titles)})")
+    checked = {}
+    for title in titles:
+        if title not in actions:
+            continue
+        cost, uplift = (float(value) for value in actions[title])
+        if not cost > 0:
+            raise ValueError(f"Cost of '{title}' must be positive, got {cost}")
+        if not 0 <= uplift <= 1:
+            raise ValueError(f"Uplift of '{title}' must be between 0 and 1, got {uplift}")
+        checked[title] = (cost, uplift)
+    return checked
+
+
+def load_actions(path):
+    """Action economics from a JSON file of {"<title>": {"cost": ..., "uplift": ...}}"""
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    try:
+        return check_actions({title: (entry["cost"], entry["uplift"]) for title, entry in spec.items()})
+    except (AttributeError, KeyError, TypeError) as e:
+        raise ValueError(f"{path}: expected {{\"<action>\": {{\"cost\": ..., \"uplift\": ...}}}} ({e})") from None
+
+
+#======== PLANNING ========
+class RetentionPlan:
+    """The customers to target, their actions, and what the plan spends and saves"""
+
+    def __init__(self, budget, targets, bound, planner):
+        self.budget = budget
+        # One row per targeted customer: customerID, Churn_Probability, MonthlyCharges, Action, Cost,
+        # Revenue_At_Risk and Revenue_Saved, best value per dollar first
+        self.targets = targets
+        self.spent = float(targets["Cost"].sum())
+        self.saved = float(targets["Revenue_Saved"].sum())
+        # Most the budget could save if actions were divisible: the greedy plan is within one action of it
+        self.bound = bound
+        self.rows = planner.rows
+        self.candidates = planner.candidates
+        self.revenue_at_risk = planner.revenue_at_risk
+
+    @property
+    def return_on_spend(self):
+        return self.saved / self.spent if self.spent else None
+
+    def action_counts(self):
+        """Targeted customers per action"""
+        return self.targets["Action"].value_counts(sort=False).to_dict()
+
+
+class RetentionPlanner:
+    """
+    Worthwhile retention actions of a scored batch, collected chunk by chunk.
+
+    update() reads each chunk's Churn_Probability, MonthlyCharges, Contract,
+    tenure and recommendation rule columns. A customer is a candidate from
+    `min_probability` up (the app's recommendation threshold), for the
+    actions their recommendations name. Of those, only the upper convex
+    hull of (cost, revenue saved) is kept, as increments: the action with
+    the best return per dollar, then each upgrade to a costlier action
+    with its extra cost and extra revenue, while every increment returns
+    more than it costs. solve() takes increments by return per dollar
+    until the budget is spent, the greedy solution of this
+    multiple-choice knapsack; each customer's increments come in order,
+    so a customer is never upgraded without the cheaper step.
+    """
+
+    def __init__(self, actions=ACTION_ECONOMICS, months_after_term=MONTHS_AFTER_TERM,
+                 min_probability=RECOMMENDATION_THRESHOLD):
+        self.actions = check_actions(actions)
+        self.titles = list(self.actions)
+        self.months_after_term = months_after_term
+        self.min_probability = min_probability
+        self.rows = 0
+        self.candidates = 0
+        self.revenue_at_risk = 0.0
+        self._conditions = [condition for _, title, _, condition in RECOMMENDATION_RULES if title in self.actions]
+        self._costs = np.array([cost for cost, _ in self.actions.values()])
+        self._uplifts = np.array([uplift for _, uplift in self.actions.values()])
+        # Per chunk: candidate columns, and (candidate, action, step, extra cost, extra revenue) increments
+        self._customers = [(np.empty(0, dtype=object), np.empty(0), np.empty(0, dtype=np.float32), np.empty(0))]
+        self._increments = [(np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int8),
+                             np.empty(0), np.empty(0))]
+
+    def update(self, chunk):
+        """Add a scored chunk. Returns self; raises ValueError if it has no MonthlyCharges."""
+        if CHARGES_COLUMN not in chunk.columns:
+            raise ValueError(f"Retention planning needs a '{CHARGES_COLUMN}' column to value customers by")
+        probabilities = chunk["Churn_Probability"].to_numpy(dtype=np.float64)
+        charges = chunk[CHARGES_COLUMN].to_numpy(dtype=np.float64)
+        at_risk = revenue_at_risk(probabilities, charges, remaining_tenure(chunk, self.months_after_term))
+        eligible = rule_masks(chunk, self._conditions)
+        # NaN probabilities compare False, so unscored rows are never candidates
+        eligible &= (probabilities >= self.min_probability)[:, None]
+        rows = np.flatnonzero(eligible.any(axis=1) & np.isfinite(at_risk))
+        eligible = eligible[rows]
+        saved = at_risk[rows, None] * self._uplifts
+
+        # Walk each customer's hull: from the current (cost, saved), the step with the best return per dollar
+        current_cost = np.zeros(len(rows))
+        current_saved = np.zeros(len(rows))
+        steps = []
+        for step in range(len(self.titles)):
+            extra_cost = self._costs - current_cost[:, None]
+            extra_saved = saved - current_saved[:, None]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(eligible & (extra_cost > 0) & (extra_saved > extra_cost),
+                                 extra_saved / extra_cost, 0.0)
+            best = ratio.argmax(axis=1)
+            movers = np.flatnonzero(ratio[np.arange(len(rows)), best] > 0)
+            if not len(movers):
+                break
+            action = best[movers]
+            steps.append((movers, action, np.full(len(movers), step, dtype=np.int8),
+                          extra_cost[movers, action], extra_saved[movers, action]))
+            current_cost[movers] = self._costs[action]
+            current_saved[movers] = saved[movers, action]
+
+        # Candidates are the customers with a first step; later steps are a subset of them
+        keep = steps[0][0] if steps else np.empty(0, dtype=np.intp)
+        for movers, action, step, extra_cost, extra_saved in steps:
+            self._increments.append((np.searchsorted(keep, movers) + self.candidates, action.astype(np.int8),
+                                     step, extra_cost, extra_saved))
+
+        positions = rows[keep]
+        if ID_COLUMN in chunk.columns:
+            ids = chunk[ID_COLUMN].to_numpy(dtype=object)[positions]
+        else:
+            ids = positions + self.rows
+        # MonthlyCharges keeps the input's dtype, so the target list prints it as read
+        self._customers.append((ids, probabilities[positions], chunk[CHARGES_COLUMN].to_numpy()[positions],
+                                at_risk[positions]))
+        self.rows += len(chunk)
+        self.candidates += len(keep)
+        self.revenue_at_risk += float(np.nansum(at_risk))
+        return self
+
+    def _consolidate(self):
+        """Merge the per-chunk arrays, so repeated solve() calls don't redo it"""
+        if len(self._customers) > 1:
+            self._customers = [tuple(np.concatenate(column) for column in zip(*self._customers))]
+        if len(self._increments) > 1:
+            self._increments = [tuple(np.concatenate(column) for column in zip(*self._increments))]
+        return self._customers[0], self._increments[0]
+
+    def solve(self, budget):
+        """RetentionPlan saving the most revenue for at most `budget` dollars; raises ValueError below 0"""
+        if not budget >= 0:
+            raise ValueError(f"Budget must be 0 or more, got {budget}")
+        (ids, probabilities, charges, at_risk), (customer, action, step, extra_cost, extra_saved) = self._consolidate()
+
+        # Best return per dollar first; a customer's own steps tie-break in order
+        order = np.lexsort((step, -(extra_saved / extra_cost)))
+        spent = np.cumsum(extra_cost[order])
+        n_taken = int(np.searchsorted(spent, budget, side="right"))
+        taken = order[:n_taken]
+        bound = float(extra_saved[taken].sum())
+        if n_taken < len(order):
+            # The next increment, taken in part with what the budget has left
+            remaining = budget - (spent[n_taken - 1] if n_taken else 0.0)
+            bound += remaining / extra_cost[order[n_taken]] * extra_saved[order[n_taken]]
+
+        # Each targeted customer ends on their last step taken, listed in the order they were first picked
+        targeted, first = np.unique(customer[taken], return_index=True)
+        by_customer = taken[np.lexsort((step[taken], customer[taken]))]
+        last = by_customer[np.diff(customer[by_customer], append=-1) != 0]
+        rank = np.argsort(first, kind="stable")
+        targeted, last = targeted[rank], last[rank]
+        final = action[last]
+
+        titles = np.asarray(self.titles, dtype=object)
+        targets = pd.DataFrame({
+            ID_COLUMN: ids[targeted],
+            "Churn_Probability": probabilities[targeted],
+            "MonthlyCharges": charges[targeted],
+            "Action": pd.Categorical(titles[final], categories=self.titles),
+            "Cost": self._costs[final],
+            "Revenue_At_Risk": at_risk[targeted],
+            "Revenue_Saved": at_risk[targeted] * self._uplifts[final],
+        })
+        return RetentionPlan(budget, targets, bound, self)
+
+
+def plan_retention(frame, budget, actions=ACTION_ECONOMICS, months_after_term=MONTHS_AFTER_TERM,
+                   min_probability=RECOMMENDATION_THRESHOLD):
+    """RetentionPlan for a scored frame in memory (see RetentionPlanner)"""
+    return RetentionPlanner(actions, months_after_term, min_probability).update(frame).solve(budget)
@@ -0,0 +1,310 @@
+"""
+Stage timing, memory and profiling instrumentation for scoring runs.
+
+Pipeline steps are wrapped in `with stage("encode", rows):` blocks. A
+block costs one ContextVar lookup unless a RunProfile is active in the
+current context (the CLI's main thread, or the Streamlit session's script
+thread). Then it adds its wall time, rows and peak resident memory to
+the run's totals for that stage. A stage opened inside another is
+recorded under both names, e.g. "predict/scale". A run exports as JSON
+or as Prometheus text exposition format, and can run under cProfile or
+py-spy. Like churn_engine, nothing in here imports Streamlit.
+"""
+import contextvars
+import cProfile
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+PROFILERS = ["cprofile", "py-spy"]
+# File each profiler writes: pstats for cProfile (snakeviz, pstats), speedscope JSON for py-spy
+PROFILE_EXTENSIONS = {"cprofile": ".prof", "py-spy": ".speedscope.json"}
+METRICS_FORMATS = ["json", "prometheus"]
+METRICS_PREFIX = "churn"
+# Seconds to wait for py-spy to write its profile once the run is over
+PY_SPY_TIMEOUT = 30
+
+_active_run = contextvars.ContextVar("churn_perf_run", default=None)
+
+
+#======== PEAK MEMORY ========
+def peak_rss():
+    """
+    Peak resident set size of this process in bytes: since the last
+    reset_peak_rss() where Linux allows it, else since the process started
+    """
+    try:
+        with open("/proc/self/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmHWM"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    # ru_maxrss is in bytes on macOS, KiB elsewhere
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def reset_peak_rss():
+    """Restart the peak RSS from the current RSS; False where the kernel doesn't allow it"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+#======== STAGES ========
+class StageStats:
+    """Totals of one stage over a run"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.peak_rss = 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.rows and self.seconds else None
+
+    def as_dict(self):
+        return {"stage": self.name, "calls": self.calls, "seconds": self.seconds, "rows": self.rows,
+                "rows_per_second": self.rows_per_second, "peak_rss_bytes": self.peak_rss}
+
+
+class _Stage:
+    """One timed block; set `rows` inside it when the count is only known at the end"""
+
+    def __init__(self, run, name, rows):
+        self.run = run
+        self.name = name
+        self.rows = rows
+        self.peak = 0
+
+    def __enter__(self):
+        self.run._enter(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.run._exit(self, time.perf_counter() - self.start)
+        return False
+
+
+class _NoStage:
+    """Stand-in for _Stage outside a run"""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name, rows=None):
+    """Context manager timing a pipeline step into the active RunProfile, if any"""
+    run = _active_run.get()
+    return _NO_STAGE if run is None else run.stage(name, rows)
+
+
+#======== RUNS ========
+class RunProfile:
+    """
+    Per-stage wall time, rows, rows/sec and peak RSS of one scoring run.
+
+    Between start() and stop() (or within a `with` block) every stage()
+    in the same context is recorded here. Peak RSS is per stage where
+    Linux lets the peak be reset (`per_stage_peaks`), else the process
+    peak so far. Either way it is the whole process's memory, including
+    other sessions of a shared server. With `profiler` set to "cprofile"
+    or "py-spy" the run also writes a profile to `profile_path`. cProfile
+    sees only the calling thread. py-spy samples the whole process and
+    its worker processes from outside, so it needs py-spy on the PATH
+    and permission to ptrace this process.
+    """
+
+    def __init__(self, name="scoring", profiler=None, profile_path=None):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}' (choose from {', '.join(PROFILERS)})")
+        if profiler is not None and profile_path is None:
+            raise ValueError("A profiler needs a profile_path to write to")
+        if profiler == "py-spy" and shutil.which("py-spy") is None:
+            raise ValueError("py-spy is not installed (pip install py-spy)")
+        self.name = name
+        self.profiler = profiler
+        self.profile_path = profile_path
+        # stage name -> StageStats, in the order the stages were first entered
+        self.stages = {}
+        self.started = None
+        self.seconds = None
+        self.peak_rss = 0
+        self.per_stage_peaks = False
+        self._open = []
+        self._start = None
+        self._token = None
+        self._profiler = None
+
+    def stage(self, name, rows=None):
+        return _Stage(self, name, rows)
+
+    def _fold_peak(self):
+        """Credit the peak RSS since the last reset to every open stage"""
+        peak = peak_rss()
+        self.peak_rss = max(self.peak_rss, peak)
+        for record in self._open:
+            record.peak = max(record.peak, peak)
+
+    def _enter(self, record):
+        self._fold_peak()
+        if self._open:
+            record.name = f"{self._open[-1].name}/{record.name}"
+        if record.name not in self.stages:
+            self.stages[record.name] = StageStats(record.name)
+        self._open.append(record)
+        if self.per_stage_peaks:
+            reset_peak_rss()
+
+    def _exit(self, record, seconds):
+        self._fold_peak()
+        self._open.remove(record)
+        stats = self.stages[record.name]
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.rows += record.rows or 0
+        stats.peak_rss = max(stats.peak_rss, record.peak)
+
+    @property
+    def staged_seconds(self):
+        """Wall time inside top-level stages; the rest of the run is untimed glue"""
+        return sum(stats.seconds for stats in self.stages.values() if "/" not in stats.name)
+
+    def start(self):
+        if self.profiler == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profiler == "py-spy":
+            self._profiler = _start_py_spy(self.profile_path)
+        self.started = datetime.now(timezone.utc)
+        self.per_stage_peaks = reset_peak_rss()
+        self._token = _active_run.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self._start
+        if isinstance(self._profiler, cProfile.Profile):
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+        elif self._profiler is not None:
+            _stop_py_spy(self._profiler)
+        self._profiler = None
+        _active_run.reset(self._token)
+        self._fold_peak()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def as_dict(self):
+        return {
+            "run": self.name,
+            "started": self.started.isoformat() if self.started else None,
+            "seconds": self.seconds,
+            "staged_seconds": self.staged_seconds,
+            "peak_rss_bytes": self.peak_rss,
+            "per_stage_peaks": self.per_stage_peaks,
+            "stages": [stats.as_dict() for stats in self.stages.values()],
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=2)
+
+    def to_prometheus(self, prefix=METRICS_PREFIX):
+        """
+        The run in Prometheus text exposition format, e.g. for the
+        node_exporter textfile collector; every sample is labelled with the run
+        """
+        run = f'run="{_escape(self.name)}"'
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.extend(f"{prefix}_{name}{{{labels}}} {_number(value)}" for labels, value in samples)
+
+        stages = [(f'{run},stage="{_escape(stats.name)}"', stats) for stats in self.stages.values()]
+        metric("run_seconds", "gauge", "Wall time of the scoring run.", [(run, self.seconds or 0.0)])
+        metric("run_peak_rss_bytes", "gauge", "Peak resident memory of the process during the run.",
+               [(run, self.peak_rss)])
+        metric("stage_seconds_total", "counter", "Wall time spent in the stage.",
+               [(labels, stats.seconds) for labels, stats in stages])
+        metric("stage_calls_total", "counter", "Times the stage ran, e.g. once per chunk.",
+               [(labels, stats.calls) for labels, stats in stages])
+        metric("stage_rows_total", "counter", "Rows the stage processed.",
+               [(labels, stats.rows) for labels, stats in stages])
+        metric("stage_rows_per_second", "gauge", "Rows processed per second of the stage's wall time.",
+               [(labels, stats.rows_per_second) for labels, stats in stages if stats.rows_per_second])
+        metric("stage_peak_rss_bytes", "gauge", "Peak resident memory of the process during the stage.",
+               [(labels, stats.peak_rss) for labels, stats in stages])
+        return "\n".join(lines) + "\n"
+
+    def export(self, fmt="json"):
+        if fmt not in METRICS_FORMATS:
+            raise ValueError(f"Unsupported metrics format '{fmt}' (choose from {', '.join(METRICS_FORMATS)})")
+        return self.to_json() if fmt == "json" else self.to_prometheus()
+
+
+def metrics_format(path):
+    """Metrics format of an output path: prometheus for .prom and .txt, else json"""
+    return "prometheus" if path.endswith((".prom", ".txt")) else "json"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+#======== PY-SPY ========
+def _start_py_spy(path):
+    """Attach `py-spy record` to this process (and its workers) until _stop_py_spy()"""
+    return subprocess.Popen(
+        [shutil.which("py-spy"), "record", "--pid", str(os.getpid()), "--subprocesses",
+         "--format", "speedscope", "--output", path, "--nonblocking"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def _stop_py_spy(process):
+    """Stop sampling; py-spy writes its profile when interrupted"""
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(PY_SPY_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
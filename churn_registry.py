@@ -0,0 +1,185 @@
+"""
+Hot-swappable model versions for long-running processes.
+
+A ModelRegistry watches a models directory (plus the default model next
+to the app) from a background thread. Model files that appear or change
+are loaded on that thread, so nobody's request waits on a load, and the
+set of resident versions is replaced with a single assignment once a
+load succeeds: readers see either the old set or the new one. The
+newest `max_versions` files stay loaded, so a session can score with an
+older version or with a second one in shadow. Like churn_engine,
+nothing in here imports Streamlit.
+"""
+import os
+import pickle
+import threading
+import time
+from collections import Counter
+
+from churn_engine import model_fingerprint, open_model, preferred_model_file, resolve_model_path
+
+
+MODELS_DIR = "models"
+MODEL_EXTENSIONS = (".npz", ".pkl")
+MAX_VERSIONS = 3
+# Seconds between scans of the models directory
+WATCH_INTERVAL = 2.0
+
+
+class ModelVersion:
+    """One loaded model file: its scorer and feature columns, and what loading it cost"""
+
+    def __init__(self, path, fingerprint, scorer, feature_cols, load_seconds):
+        self.path = path
+        # Label only: files in different directories may share it, so versions are told apart by path
+        self.name = os.path.basename(path)
+        self.fingerprint = fingerprint
+        self.scorer = scorer
+        self.feature_cols = feature_cols
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        # Serialized size of the scorer: its arrays and labels, what stays resident per version
+        self.footprint = len(pickle.dumps(scorer, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @property
+    def key(self):
+        """(path, fingerprint), which changes whenever the file is replaced"""
+        return self.path, self.fingerprint
+
+    @classmethod
+    def load(cls, path, fingerprint, loader=open_model):
+        start = time.perf_counter()
+        scorer, feature_cols = loader(path)
+        return cls(path, fingerprint, scorer, feature_cols, time.perf_counter() - start)
+
+
+class ModelRegistry:
+    """
+    The newest model files of `directory` (and of `default_directory`,
+    see resolve_model_path), loaded and kept current.
+
+    Within the directory each stem is one version: `v2.npz` stands for
+    `v2.pkl` when it was exported from it. refresh() scans and loads
+    synchronously; start() repeats it every `interval` seconds on a
+    daemon thread. `active` is the most recently modified resident
+    version. A file that fails to load is reported in `errors` and
+    retried once it changes again; a version already loaded from it stays
+    resident meanwhile.
+    """
+
+    def __init__(self, directory=MODELS_DIR, default_directory=None, max_versions=MAX_VERSIONS,
+                 interval=WATCH_INTERVAL, loader=open_model):
+        self.directory = directory
+        self.default_directory = default_directory
+        self.max_versions = max_versions
+        self.interval = interval
+        self.loader = loader
+        # path -> (fingerprint, message) of files that failed to load
+        self.errors = {}
+        # path -> ModelVersion; replaced, never mutated, so readers need no lock
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def versions(self):
+        """Resident versions, newest first"""
+        return sorted(self._versions.values(), key=lambda version: version.fingerprint, reverse=True)
+
+    @property
+    def active(self):
+        """The newest resident version, or None before any model loaded"""
+        versions = self.versions
+        return versions[0] if versions else None
+
+    def get(self, path):
+        """Resident version loaded from `path`, or None"""
+        return self._versions.get(path)
+
+    @property
+    def labels(self):
+        """{path: label} of the resident versions: the file name, prefixed by its directory's when shared"""
+        versions = self._versions
+        names = Counter(version.name for version in versions.values())
+        return {path: version.name if names[version.name] == 1
+                else os.path.join(os.path.basename(os.path.dirname(os.path.abspath(path))), version.name)
+                for path, version in versions.items()}
+
+    def _candidates(self):
+        """{path: fingerprint} of every model file, newest first"""
+        paths = []
+        if self.default_directory is not None:
+            paths.append(resolve_model_path(self.default_directory))
+        if os.path.isdir(self.directory):
+            stems = {}
+            for entry in os.scandir(self.directory):
+                stem, extension = os.path.splitext(entry.name)
+                if extension in MODEL_EXTENSIONS and entry.is_file():
+                    stems.setdefault(stem, {})[extension] = entry.path
+            for files in stems.values():
+                paths.append(preferred_model_file(files.get(".npz"), files.get(".pkl")))
+
+        found = [(model_fingerprint(path), path) for path in paths]
+        return {path: fingerprint for fingerprint, path in sorted(found, reverse=True) if fingerprint is not None}
+
+    def refresh(self):
+        """
+        Load the newest `max_versions` model files that load, reusing
+        resident versions of unchanged files; True if the resident set changed
+        """
+        with self._lock:
+            current = self._versions
+            resident = {}
+            candidates = self._candidates()
+            errors = {path: error for path, error in self.errors.items() if path in candidates}
+            for path, fingerprint in candidates.items():
+                if len(resident) == self.max_versions:
+                    break
+                version = current.get(path)
+                if version is None or version.fingerprint != fingerprint:
+                    if errors.get(path, (None,))[0] == fingerprint:
+                        # Failed at this version already; wait for the file to change
+                        if version is not None:
+                            resident[path] = version
+                        continue
+                    try:
+                        version = ModelVersion.load(path, fingerprint, self.loader)
+                    # Unpickling a bad file can raise nearly anything
+                    except Exception as e:
+                        errors[path] = (fingerprint, str(e))
+                        version = current.get(path)
+                        if version is None:
+                            continue
+                    else:
+                        errors.pop(path, None)
+                resident[path] = version
+
+            # Both are replaced rather than updated, so readers never see them half-built
+            self.errors = errors
+            changed = resident.keys() != current.keys() or any(
+                resident[path] is not current[path] for path in resident)
+            if changed:
+                self._versions = resident
+            return changed
+
+    def start(self):
+        """Keep refreshing every `interval` seconds on a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except OSError:
+                # A file vanished mid-scan; the next pass sees the settled directory
+                pass
@@ -0,0 +1,212 @@
+"""
+Headless churn scoring from the command line.
+
+    python churn_score.py customers.csv -o scored.parquet
+    python churn_score.py customers.parquet -o scored.arrow
+    cat customers.csv | python churn_score.py - > scored.csv
+    python churn_score.py customers.csv -o scored.csv --metrics run.prom --profile run.prof
+    python churn_score.py customers.csv -o scored.csv --budget 50000 --targets targets.csv
+
+Shares the model loading, encoding and chunked scoring pipeline with the
+Streamlit app but never imports Streamlit or Plotly, so it starts fast
+enough for cron jobs and batch schedulers.
+"""
+import argparse
+import io
+import os
+import sys
+
+from churn_batch import (DEFAULT_CHUNKSIZE, INPUT_FORMATS, OUTPUT_FORMATS, detect_format, export_frame,
+                         model_columns, stream_score)
+from churn_engine import (TOP_DRIVERS, FeatureEncoder, FusedScorer, LookupScorer, model_digest, open_model,
+                          resolve_model_path)
+from churn_optimizer import ACTION_ECONOMICS, MONTHS_AFTER_TERM, RetentionPlanner, load_actions
+from churn_perf import PROFILERS, RunProfile, metrics_format, stage
+from churn_store import ScoreStore
+
+
+DEFAULT_MODEL = resolve_model_path(os.path.dirname(os.path.abspath(__file__)))
+
+
+def dollars(text):
+    """argparse type of --budget: an amount of 0 or more"""
+    value = float(text)
+    if not value >= 0:
+        raise argparse.ArgumentTypeError(f"budget must be 0 or more, got {text}")
+    return value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="churn-score",
+        description="Score a Telco customer file (CSV, Parquet or Arrow IPC) with the churn model."
+    )
+    parser.add_argument("input", nargs="?", default="-",
+                        help="input path, or '-' for stdin (default)")
+    parser.add_argument("-i", "--input-format", choices=INPUT_FORMATS,
+                        help="input format (default: from the input extension, else csv)")
+    parser.add_argument("--all-columns", action="store_true",
+                        help="keep every input column in the output, "
+                             "not just the model's columns and customerID")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output path, or '-' for stdout (default)")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS,
+                        help="output format (default: from the output extension, else csv)")
+    parser.add_argument("-c", "--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"rows scored per chunk (default: {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="worker processes (default: 1)")
+    parser.add_argument("-s", "--sparse", action="store_true",
+                        help="keep the one-hot block sparse (lower memory, linear models only)")
+    parser.add_argument("-l", "--lookup", action="store_true",
+                        help="score through a table of precomputed log-odds per category combination, "
+                             "built at load (linear models only, no churn drivers)")
+    parser.add_argument("-d", "--drivers", type=int, default=TOP_DRIVERS,
+                        help=f"strongest churn drivers listed per customer, 0 for none (default: {TOP_DRIVERS})")
+    parser.add_argument("--store", metavar="PATH",
+                        help="incremental mode: reuse scores kept in this Arrow file for customers "
+                             "whose inputs are unchanged, and update it")
+    parser.add_argument("-m", "--model", default=DEFAULT_MODEL,
+                        help="model file, an .npz artifact or a pickled pipeline (default: churn_model.npz "
+                             "next to this script, else churn_pipeline.pkl)")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write the wall time, rows/sec and peak memory of each pipeline stage here, "
+                             "as Prometheus text for .prom/.txt paths, else JSON")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="profile the run and write the profile here (see --profiler)")
+    parser.add_argument("--profiler", choices=PROFILERS, default="cprofile",
+                        help="profiler for --profile: cprofile writes pstats, py-spy samples the process "
+                             "and its workers into a speedscope file (default: cprofile)")
+    parser.add_argument("--budget", type=dollars, metavar="DOLLARS",
+                        help="also pick the customers whose retention actions save the most revenue "
+                             "for this budget, and write them to --targets")
+    parser.add_argument("--targets", metavar="PATH",
+                        help="target list for --budget, in the format of its extension (default: csv)")
+    parser.add_argument("--actions", metavar="PATH",
+                        help="JSON cost and uplift of each retention action for --budget, as "
+                             '{"Contract Upgrade": {"cost": 120, "uplift": 0.4}, ...} (default: built-in estimates)')
+    parser.add_argument("--months-after-term", type=float, default=MONTHS_AFTER_TERM,
+                        help="months a retained customer is expected to stay after their current contract "
+                             "term, which counts towards revenue at risk too (default: "
+                             f"{MONTHS_AFTER_TERM})")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="don't report progress on stderr")
+    return parser.parse_args(argv)
+
+
+def input_format(args):
+    """Explicit --input-format, else the input file's extension, else csv"""
+    if args.input_format:
+        return args.input_format
+    return "csv" if args.input == "-" else detect_format(args.input)
+
+
+def output_format(args):
+    """Explicit --format, else the output file's extension, else csv"""
+    if args.format:
+        return args.format
+    return "csv" if args.output == "-" else detect_format(args.output)
+
+
+def report_progress(summary, fraction):
+    done = f" ({fraction:.0%})" if fraction is not None else ""
+    counts = " ".join(f"{label}={count:,}" for label, count in summary.risk_counts.items())
+    print(f"\rscored {summary.rows:,} customers{done}  {counts}", end="", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    in_fmt = input_format(args)
+    fmt = output_format(args)
+
+    try:
+        scorer, feature_cols = open_model(args.model)
+    except (OSError, ValueError) as e:
+        print(f"churn-score: cannot load model: {e}", file=sys.stderr)
+        return 2
+
+    encoder = FeatureEncoder(feature_cols)
+    for flag, used in (("--sparse", args.sparse), ("--lookup", args.lookup)):
+        if used and not isinstance(scorer, FusedScorer):
+            print(f"churn-score: {flag} needs a linear model", file=sys.stderr)
+            return 2
+    if args.sparse and args.lookup:
+        print("churn-score: --sparse and --lookup are alternatives", file=sys.stderr)
+        return 2
+    if args.lookup:
+        scorer = LookupScorer(scorer)
+        prepare = scorer.prepare
+    else:
+        prepare = encoder.transform_sparse if args.sparse else encoder.transform
+
+    if args.input != "-":
+        source = args.input
+    elif in_fmt == "csv":
+        source = sys.stdin.buffer
+    else:
+        # Parquet and Arrow readers need to seek, which a pipe can't
+        source = io.BytesIO(sys.stdin.buffer.read())
+    # Inputs are projected onto the model's columns (+ customerID) on read
+    columns = None if args.all_columns else model_columns(encoder)
+
+    if args.output == "-":
+        destination = sys.stdout if fmt == "csv" else sys.stdout.buffer
+    else:
+        destination = args.output
+
+    if (args.budget is None) != (args.targets is None):
+        print("churn-score: --budget and --targets go together", file=sys.stderr)
+        return 2
+    try:
+        actions = load_actions(args.actions) if args.actions else ACTION_ECONOMICS
+        planner = RetentionPlanner(actions, args.months_after_term) if args.budget is not None else None
+    except (OSError, ValueError) as e:
+        print(f"churn-score: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        run = RunProfile("churn-score", args.profiler if args.profile else None, args.profile)
+    except ValueError as e:
+        print(f"churn-score: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        store = ScoreStore(args.store, model_digest(args.model), scorer, args.drivers) if args.store else None
+        with run:
+            summary = stream_score(
+                source, destination, prepare, scorer,
+                chunksize=args.chunksize, fmt=fmt, workers=args.workers,
+                on_chunk=None if args.quiet else report_progress,
+                input_format=in_fmt, columns=columns, top_k=args.drivers, store=store, planner=planner
+            )
+            if planner is not None:
+                with stage("optimize", planner.candidates):
+                    plan = planner.solve(args.budget)
+                with stage("export", len(plan.targets)):
+                    export_frame(plan.targets, args.targets, detect_format(args.targets))
+        if args.metrics:
+            with open(args.metrics, "w", encoding="utf-8") as f:
+                f.write(run.export(metrics_format(args.metrics)))
+    except (OSError, ValueError) as e:
+        print(f"\nchurn-score: {e}", file=sys.stderr)
+        return 1
+
+    if not args.quiet:
+        print(file=sys.stderr)
+        if summary.count:
+            print(f"churn probability: mean {summary.mean:.1%}  median {summary.quantile(0.5):.1%}  "
+                  f"p90 {summary.quantile(0.9):.1%}  p99 {summary.quantile(0.99):.1%}", file=sys.stderr)
+        if store is not None:
+            print(f"reused {store.reused:,} stored scores, scored {store.scored:,} new or changed customers"
+                  + (" (new model, store rebuilt)" if store.invalidated else ""), file=sys.stderr)
+        if planner is not None:
+            print(f"targeting {len(plan.targets):,} of {plan.candidates:,} candidates for ${plan.spent:,.0f} "
+                  f"of ${plan.budget:,.0f}: saves ${plan.saved:,.0f} of ${plan.revenue_at_risk:,.0f} revenue "
+                  f"at risk, target list written to {args.targets}", file=sys.stderr)
+        print(f"{summary.rows / run.seconds:,.0f} rows/s, peak memory {run.peak_rss / 2**20:,.0f} MiB"
+              + (f", profile written to {args.profile}" if args.profile else ""), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Low-latency HTTP scoring service.
+
+    python churn_service.py --port 8080 --window-ms 2 --max-batch 64
+
+POST /score with a JSON object holding the 19 customer attributes of the
+single-customer form; the response carries the churn probability, risk
+level and risk factors. Concurrent requests arriving within the latency
+window are coalesced into one encode + score call. GET /health reports
+liveness and batching settings.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from aiohttp import web
+
+from churn_engine import (INPUT_COLUMNS, FeatureEncoder, find_risk_factors, open_model, resolve_model_path,
+                          risk_level)
+
+
+DEFAULT_MODEL = resolve_model_path(os.path.dirname(os.path.abspath(__file__)))
+
+
+#======== MICRO-BATCHING ========
+class MicroBatcher:
+    """
+    Coalesce concurrent scoring requests into small batches.
+
+    The first queued request opens a window of `window_ms`; everything that
+    arrives before it closes (up to `max_batch` customers) is scored in a
+    single call. A zero window scores each request on its own.
+    """
+
+    def __init__(self, encoder, scorer, max_batch=64, window_ms=2.0):
+        self.encoder = encoder
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.batches = 0
+        self.scored = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def score(self, customer):
+        """Churn probability for one customer, scored in the next batch"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((customer, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self._score_batch(batch)
+
+    def _score_batch(self, batch):
+        customers, futures = zip(*batch)
+        try:
+            probabilities = self.scorer.predict_proba(self.encoder.transform_records(customers))
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.scored += len(batch)
+        for future, probability in zip(futures, probabilities):
+            if not future.done():
+                future.set_result(float(probability))
+
+
+#======== HTTP HANDLERS ========
+def parse_customer(payload):
+    """Validate a request body into a customer dict, raising ValueError"""
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+
+    missing = [col for col in INPUT_COLUMNS if col not in payload]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+    customer = {col: payload[col] for col in INPUT_COLUMNS}
+    for col in ("SeniorCitizen", "tenure", "MonthlyCharges", "TotalCharges"):
+        try:
+            customer[col] = float(customer[col])
+        except (TypeError, ValueError):
+            raise ValueError(f"Field '{col}' must be numeric") from None
+    return customer
+
+
+async def handle_score(request):
+    try:
+        customer = parse_customer(await request.json())
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+
+    probability = await request.app["batcher"].score(customer)
+    return web.json_response({
+        "churn_probability": probability,
+        "risk_level": risk_level(probability),
+        "risk_factors": [
+            {"factor": factor, "level": level} for factor, level in find_risk_factors(customer)
+        ],
+    })
+
+
+async def handle_health(request):
+    batcher = request.app["batcher"]
+    return web.json_response({
+        "status": "ok",
+        "max_batch": batcher.max_batch,
+        "window_ms": batcher.window * 1000,
+        "batches": batcher.batches,
+        "scored": batcher.scored,
+    })
+
+
+def create_app(model_path=DEFAULT_MODEL, max_batch=64, window_ms=2.0):
+    """Build the aiohttp application, loading the model once"""
+    scorer, feature_cols = open_model(model_path)
+    batcher = MicroBatcher(FeatureEncoder(feature_cols), scorer,
+                           max_batch=max_batch, window_ms=window_ms)
+
+    async def batcher_context(app):
+        batcher.start()
+        yield
+        await batcher.stop()
+
+    app = web.Application()
+    app["batcher"] = batcher
+    app.cleanup_ctx.append(batcher_context)
+    app.router.add_post("/score", handle_score)
+    app.router.add_get("/health", handle_health)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Churn scoring HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=64,
+                        help="most customers scored per model call (default: 64)")
+    parser.add_argument("--window-ms", type=float, default=2.0,
+                        help="how long to wait for a batch to fill, 0 disables batching (default: 2)")
+    parser.add_argument("-m", "--model", default=DEFAULT_MODEL)
+    args = parser.parse_args(argv)
+
+    web.run_app(create_app(args.model, args.max_batch, args.window_ms),
+                host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
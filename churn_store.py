@@ -0,0 +1,290 @@
+"""
+Incremental rescoring for repeated uploads of the customer base.
+
+A ScoreStore keeps, per customerID, the model inputs the customer was
+last scored with, next to everything scoring derived from them: the
+churn probability, the churn drivers and which risk factor and
+recommendation rules held. Inputs are kept exactly, as the category
+level codes packed into one integer plus the bit patterns of the four
+numbers, so a row is reused only when it would encode and match rules
+exactly as before. Scoring a new snapshot through the store only
+encodes, scores and evaluates rules for customers that are new or whose
+inputs changed. The store is tagged with the model file's digest, so a
+new model discards it and everything is rescored once.
+
+Customers are looked up by a 64-bit hash of their customerID. Two IDs
+sharing a hash look like one customer, but as stored rows are only
+reused for identical inputs, that costs a rescore, never a wrong score.
+Among n distinct IDs the chance of any shared hash is below
+n**2 / 2**65: about 3e-6 for ten million customers.
+"""
+import os
+import tempfile
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_array
+
+from churn_batch import attach_scores, explains, iter_scored_chunks, parallel_score_frame
+from churn_engine import CATEGORY_LEVELS, ID_COLUMN, NUMERIC_COLS, TOP_DRIVERS, level_codes, retention_keys
+from churn_perf import stage
+
+
+STORE_PATH = "churn_scores.arrow"
+# Version of the stored columns; a store with another layout is rebuilt
+STORE_LAYOUT = b"2"
+
+_LEVELS = {column: pd.Index(values) for column, values in CATEGORY_LEVELS.items()}
+# Bit pattern (a NaN payload) standing in for a numeric column the frame lacks, which the
+# encoder reads as 0 and no rule matches, unlike a missing value
+_MISSING_COLUMN = np.uint64(0x7FF8_0000_DEAD_BEEF)
+
+
+def input_codes(frame):
+    """
+    {name: uint64 array} capturing each row's 19 model inputs exactly.
+
+    "levels" packs every category column's level code. A value outside
+    the vocabulary, a missing value and a missing column share one extra
+    code, since the encoder and the rules treat them all alike.
+    "input_<column>" holds the float64 bit pattern of each number.
+    """
+    levels = np.zeros(len(frame), dtype=np.uint64)
+    for column, values in _LEVELS.items():
+        other = len(values)
+        if column in frame.columns:
+            codes = level_codes(frame[column], values)
+            codes[codes < 0] = other
+        else:
+            codes = np.full(len(frame), other, dtype=np.int32)
+        # The radixes multiply to about 3e8, far inside 64 bits
+        levels = levels * np.uint64(other + 1) + codes.astype(np.uint64)
+
+    inputs = {"levels": levels}
+    for column in NUMERIC_COLS:
+        if column not in frame.columns:
+            inputs[f"input_{column}"] = np.full(len(frame), _MISSING_COLUMN)
+            continue
+        values = frame[column]
+        if not pd.api.types.is_numeric_dtype(values.dtype):
+            values = pd.to_numeric(values, errors="coerce")
+        inputs[f"input_{column}"] = values.to_numpy(dtype=np.float64, na_value=np.nan).view(np.uint64)
+    return inputs
+
+
+def customer_keys(chunk):
+    """uint64 hash of each row's customerID"""
+    if ID_COLUMN not in chunk.columns:
+        raise ValueError(f"Incremental scoring needs a '{ID_COLUMN}' column")
+    ids = chunk[ID_COLUMN]
+    if not pd.api.types.is_string_dtype(ids.dtype):
+        ids = ids.astype(str)
+    return hash_array(ids.to_numpy(dtype=object), categorize=False)
+
+
+class ScoreStore:
+    """
+    Stored scores by customerID, reused while a customer's inputs and the
+    model stay the same.
+
+    Rows are scored through score_frame() (in memory) or score_chunks()
+    (streaming); save() then merges this snapshot's customers into the
+    store, so customers missing from a smaller upload keep their scores.
+    `reused` and `scored` count rows since construction and
+    `invalidated` says whether an existing store was dropped because it
+    came from another model or driver count.
+    """
+
+    def __init__(self, path, model_digest, scorer, top_k=TOP_DRIVERS):
+        self.path = path
+        self.model_digest = model_digest
+        self.scorer = scorer
+        self.top_k = top_k if explains(scorer, top_k) else 0
+        code_dtype = scorer.code_dtype if self.top_k else np.int8
+        # Stored columns: the customer key, their inputs, and what scoring derived from them
+        self._dtypes = {"customer_key": np.uint64, "levels": np.uint64,
+                        **{f"input_{column}": np.uint64 for column in NUMERIC_COLS},
+                        "Churn_Probability": np.float64, "risk_factors": np.int64, "recommendations": np.int64}
+        for rank in range(1, self.top_k + 1):
+            self._dtypes.update({f"code_{rank}": code_dtype, f"impact_{rank}": np.float32})
+        self.reused = 0
+        self.scored = 0
+        self._snapshot = []
+        self._stored, self._loaded = self._read()
+        self.invalidated = self._stored is None and self._loaded is not None
+        if self._stored is None:
+            self._stored = self._empty()
+        self._index = pd.Index(self._stored["customer_key"])
+
+    def _empty(self):
+        return {name: np.empty(0, dtype=dtype) for name, dtype in self._dtypes.items()}
+
+    def _stamp(self):
+        """Modification time of the store on disk, None when there is none"""
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _read(self):
+        """
+        (stored columns, file stamp) of the store on disk. The columns are
+        None when there is no store, or (with a stamp) when it belongs to
+        another model or driver count or isn't a store this version wrote.
+        """
+        import pyarrow as pa
+
+        stamp = self._stamp()
+        if stamp is None:
+            return None, None
+        try:
+            with pa.OSFile(self.path, "rb") as source:
+                table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            return None, stamp
+        metadata = table.schema.metadata or {}
+        if (metadata.get(b"model_digest", b"").decode() != self.model_digest
+                or int(metadata.get(b"top_k", b"-1")) != self.top_k
+                or metadata.get(b"layout") != STORE_LAYOUT):
+            return None, stamp
+        return {name: table.column(name).to_numpy().astype(dtype, copy=False)
+                for name, dtype in self._dtypes.items()}, stamp
+
+    def __len__(self):
+        return len(self._index)
+
+    def _gather(self, name, positions):
+        """Stored column `name` at `positions`, as a new array (rows to fill when the store is empty)"""
+        if len(self._index):
+            return self._stored[name][positions]
+        return np.empty(len(positions), dtype=self._dtypes[name])
+
+    def split(self, chunk):
+        """
+        (keys, inputs, reuse, positions) for a raw chunk: its customer keys
+        and input_codes(), which rows have an up-to-date stored score and
+        where that score is.
+        """
+        with stage("lookup", len(chunk)):
+            keys = customer_keys(chunk)
+            inputs = input_codes(chunk)
+            positions = self._index.get_indexer(keys)
+            reuse = positions >= 0
+            if len(self._index):
+                # Row 0 stands in for new customers, who are already ruled out
+                source = np.maximum(positions, 0)
+                for name, values in inputs.items():
+                    reuse &= self._stored[name][source] == values
+        return keys, inputs, reuse, positions
+
+    def merge(self, chunk, lookup, probabilities, drivers=None):
+        """
+        Attach scores to a chunk in place: stored ones where split() found
+        them, `probabilities` / `drivers` (scored for the remaining rows,
+        in order) elsewhere. Only the remaining rows go through the
+        retention rules. The result is remembered for save().
+        """
+        keys, inputs, reuse, positions = lookup
+        fresh = np.flatnonzero(~reuse)
+        source = np.maximum(positions, 0)
+
+        with stage("rules", len(chunk)):
+            fresh_rows = chunk if len(fresh) == len(chunk) else chunk.iloc[fresh]
+            values = dict(zip(["risk_factors", "recommendations"], retention_keys(fresh_rows, probabilities)))
+            values["Churn_Probability"] = probabilities
+            for rank in range(1, self.top_k + 1):
+                values[f"code_{rank}"] = pd.Series(drivers[f"Driver_{rank}"]).cat.codes.to_numpy()
+                values[f"impact_{rank}"] = np.asarray(drivers[f"Driver_{rank}_Impact"])
+            columns = {"customer_key": keys, **inputs}
+            for name, fresh_values in values.items():
+                columns[name] = self._gather(name, source)
+                columns[name][fresh] = fresh_values
+
+            ranks = range(1, self.top_k + 1)
+            driver_columns = None
+            if self.top_k:
+                driver_columns = self.scorer.driver_columns(
+                    np.stack([columns[f"code_{rank}"] for rank in ranks], axis=1),
+                    np.stack([columns[f"impact_{rank}"] for rank in ranks], axis=1))
+            attach_scores(chunk, columns["Churn_Probability"], driver_columns,
+                          (columns["risk_factors"], columns["recommendations"]))
+        # Reused rows are already stored as they are, so only the rescored ones are kept for save()
+        self._snapshot.append({name: column[fresh] for name, column in columns.items()})
+        self.reused += len(chunk) - len(fresh)
+        self.scored += len(fresh)
+        return chunk
+
+    def score_frame(self, frame, prepare, workers=1):
+        """Score an in-memory frame in place, encoding only new and changed customers"""
+        lookup = self.split(frame)
+        probabilities, drivers = parallel_score_frame(frame[~lookup[2]], prepare, self.scorer, workers,
+                                                      top_k=self.top_k)
+        return self.merge(frame, lookup, probabilities, drivers)
+
+    def score_chunks(self, chunks, prepare, workers=1):
+        """Like iter_scored_chunks, but only new and changed customers reach the scorer"""
+        pending = deque()
+
+        def changed_rows():
+            for chunk in chunks:
+                lookup = self.split(chunk)
+                pending.append((chunk, lookup))
+                yield chunk[~lookup[2]]
+
+        for _, probabilities, drivers in iter_scored_chunks(changed_rows(), prepare, self.scorer, workers,
+                                                            self.top_k, attach=False):
+            chunk, lookup = pending.popleft()
+            yield self.merge(chunk, lookup, probabilities, drivers)
+
+    def save(self):
+        """
+        Merge the customers scored since construction into the store on
+        disk: they replace their stored rows, and customers this snapshot
+        didn't include are kept. A store written by someone else meanwhile
+        is re-read first, so their customers are kept too. Returns False,
+        leaving the file alone, when every row was reused.
+        """
+        import pyarrow as pa
+
+        if not self.scored and not self.invalidated and self._loaded is not None:
+            return False
+
+        stored, index = self._stored, self._index
+        if self._stamp() != self._loaded:
+            stored = self._read()[0] or self._empty()
+            index = pd.Index(stored["customer_key"])
+        scored = self._empty()
+        scored = {name: np.concatenate([scored[name], *(part[name] for part in self._snapshot)])
+                  for name in scored}
+        # A customer scored twice (a repeated customerID) keeps their last row
+        latest = ~pd.Index(scored["customer_key"]).duplicated(keep="last")
+        scored = {name: values[latest] for name, values in scored.items()}
+
+        positions = index.get_indexer(scored["customer_key"])
+        known = positions >= 0
+        merged = {}
+        for name, values in stored.items():
+            merged[name] = np.concatenate([values, scored[name][~known]])
+            merged[name][positions[known]] = scored[name][known]
+        table = pa.table(merged).replace_schema_metadata({
+            "model_digest": self.model_digest,
+            "top_k": str(self.top_k),
+            "layout": STORE_LAYOUT,
+        })
+
+        # Write to a file of our own beside the store and swap it in, so readers never see half a
+        # file and concurrent writers never share a temporary
+        directory, name = os.path.split(os.path.abspath(self.path))
+        handle, temporary = tempfile.mkstemp(prefix=f"{name}.", suffix=".tmp", dir=directory)
+        os.close(handle)
+        try:
+            with stage("save", len(table)), pa.OSFile(temporary, "wb") as sink, \
+                    pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(temporary, self.path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return True
@@ -0,0 +1,43 @@
+"""The shipped churn_model.npz artifact against the pickled pipeline it was exported from"""
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_customers
+from churn_engine import (ARTIFACT_ARRAYS, ARTIFACT_PATH, MODEL_PATH, FeatureEncoder, PipelineScorer, artifact_hash,
+                          load_artifact, load_pipeline, model_digest)
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARTIFACT = os.path.join(HERE, ARTIFACT_PATH)
+PIPELINE = os.path.join(HERE, MODEL_PATH)
+
+
+def test_artifact_scores_like_pipeline():
+    model, scaler, feature_cols = load_pipeline(PIPELINE)
+    scorer, _ = load_artifact(ARTIFACT)
+    assert scorer.feature_cols == list(feature_cols)
+
+    # float64 so both sides see the same inputs; the parameters are what is compared
+    encoded = FeatureEncoder(feature_cols, dtype=np.float64).transform(make_customers(5_000, seed=1))
+    expected = PipelineScorer(scaler, model, feature_cols).predict_proba(encoded)
+    assert np.allclose(scorer.predict_proba(encoded), expected, rtol=0, atol=1e-9)
+
+
+def test_manifest_hash():
+    _, manifest = load_artifact(ARTIFACT)
+    with np.load(ARTIFACT, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in ARTIFACT_ARRAYS}
+    assert artifact_hash(manifest, arrays) == manifest["sha256"]
+    assert manifest["source_digest"] == model_digest(PIPELINE)
+
+
+def test_edited_artifact_is_rejected(tmp_path):
+    with np.load(ARTIFACT, allow_pickle=False) as data:
+        contents = {name: data[name] for name in data.files}
+    contents["coef"] = contents["coef"] * 1.01
+    path = tmp_path / "edited.npz"
+    np.savez(path, **contents)
+
+    with pytest.raises(ValueError, match="Content hash mismatch"):
+        load_artifact(str(path))
@@ -0,0 +1,74 @@
+"""CSV reads of numeric inputs holding blanks and junk, and of piped input"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from churn_batch import ChunkReader, conform_inputs, read_frame
+
+CSV = (
+    "customerID,SeniorCitizen,tenure,MonthlyCharges,TotalCharges\n"
+    "a,0,1,20.5, \n"
+    "b,1, 2 , 30 ,  \n"
+    "c,0,3,40,abc\n"
+    "d,x,4,50,12.5\n"
+    "e,0,5,60,\n"
+)
+
+
+def test_blank_and_junk_numbers(tmp_path):
+    path = tmp_path / "customers.csv"
+    path.write_text(CSV)
+    frame = read_frame(str(path))
+
+    assert frame["tenure"].dtype == np.int16
+    assert frame["tenure"].tolist() == [1, 2, 3, 4, 5]
+    assert frame["MonthlyCharges"].tolist() == [20.5, 30, 40, 50, 60]
+    # Blank TotalCharges count as nothing billed yet; junk stays missing rather than passing for 0
+    assert frame["TotalCharges"].iloc[[0, 1, 3, 4]].tolist() == [0, 0, 12.5, 0]
+    assert np.isnan(frame["TotalCharges"].iloc[2])
+    # Other columns keep junk as missing, so SeniorCitizen can't narrow to int8
+    assert np.isnan(frame["SeniorCitizen"].iloc[3])
+    assert frame["SeniorCitizen"].iloc[[0, 1, 2, 4]].tolist() == [0, 1, 0, 0]
+
+
+def test_total_charges_in_memory():
+    frame = conform_inputs(pd.DataFrame({"TotalCharges": ["", "  ", None, "1,234.5", "abc", "7"]}))
+
+    assert frame["TotalCharges"].iloc[[0, 1, 2, 5]].tolist() == [0, 0, 0, 7]
+    assert frame["TotalCharges"].iloc[[3, 4]].isna().all()
+
+
+def test_blank_numbers_stay_narrow(tmp_path):
+    path = tmp_path / "customers.csv"
+    path.write_text("customerID,SeniorCitizen,tenure\na,0, 7\nb, 1,8\n")
+    frame = read_frame(str(path))
+
+    assert frame["SeniorCitizen"].dtype == np.int8
+    assert frame["tenure"].tolist() == [7, 8]
+
+
+class Trickle(io.RawIOBase):
+    """A pipe delivering a few bytes per read, so the header line spans many reads"""
+
+    def __init__(self, data, size=7):
+        self._data = io.BytesIO(data)
+        self._size = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._data.read(min(len(buffer), self._size))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def test_header_split_across_pipe_reads():
+    stream = io.BufferedReader(Trickle(CSV.encode()))
+    chunks = list(ChunkReader(stream, "csv", 2, columns=["customerID", "tenure", "TotalCharges"]))
+    frame = pd.concat(chunks, ignore_index=True)
+
+    assert list(frame.columns) == ["customerID", "tenure", "TotalCharges"]
+    assert frame["customerID"].tolist() == ["a", "b", "c", "d", "e"]
+    assert frame["tenure"].tolist() == [1, 2, 3, 4, 5]
@@ -0,0 +1,77 @@
+"""Retention plans against brute force on small instances, and their budget"""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_customers
+from churn_engine import RECOMMENDATION_RULES, rule_masks
+from churn_optimizer import ACTION_ECONOMICS, RetentionPlanner, remaining_tenure, revenue_at_risk
+
+
+def customers(n_rows, seed):
+    """Scored customers, all likely enough to churn to be candidates"""
+    frame = make_customers(n_rows, seed=seed)
+    frame["Churn_Probability"] = np.random.default_rng(seed).uniform(0.4, 0.95, n_rows)
+    return frame
+
+
+def best_savings(frame, actions, budget):
+    """Most revenue any choice of at most one action per customer saves within `budget`"""
+    titles = list(actions)
+    conditions = [condition for _, title, _, condition in RECOMMENDATION_RULES if title in actions]
+    eligible = rule_masks(frame, conditions)
+    at_risk = revenue_at_risk(frame["Churn_Probability"], frame["MonthlyCharges"], remaining_tenure(frame))
+    options = [[None, *np.flatnonzero(row)] for row in eligible]
+    best = 0.0
+    for choice in itertools.product(*options):
+        taken = [(row, action) for row, action in enumerate(choice) if action is not None]
+        cost = sum(actions[titles[action]][0] for _, action in taken)
+        if cost <= budget:
+            best = max(best, sum(at_risk[row] * actions[titles[action]][1] for row, action in taken))
+    return best
+
+
+def test_matches_brute_force_for_equal_costs():
+    # With one cost for every action each customer is worth their best uplift, and greedy is exact
+    actions = {"Welcome Package": (50.0, 0.15), "Service Bundle": (50.0, 0.2), "Payment Method": (50.0, 0.1)}
+    frame = customers(8, seed=4)
+    planner = RetentionPlanner(actions).update(frame)
+    for budget in range(0, 450, 50):
+        plan = planner.solve(budget)
+        assert plan.saved == pytest.approx(best_savings(frame, actions, budget))
+
+
+def test_within_one_action_of_brute_force():
+    frame = customers(6, seed=5)
+    planner = RetentionPlanner(ACTION_ECONOMICS).update(frame)
+    largest = max(uplift for _, uplift in ACTION_ECONOMICS.values()) * revenue_at_risk(
+        frame["Churn_Probability"], frame["MonthlyCharges"], remaining_tenure(frame)).max()
+    for budget in range(0, 700, 35):
+        plan = planner.solve(budget)
+        best = best_savings(frame, ACTION_ECONOMICS, budget)
+        assert plan.saved <= best + 1e-6
+        assert best <= plan.bound + 1e-6
+        assert plan.saved >= best - largest
+
+
+def test_never_exceeds_budget():
+    planner = RetentionPlanner().update(customers(2_000, seed=6))
+    for budget in [0, 0.5, 29.99, 30, 1_000, 12_345.67, 1e9]:
+        plan = planner.solve(budget)
+        assert plan.spent <= budget
+        assert not plan.targets["customerID"].duplicated().any()
+    assert planner.solve(0).targets.empty
+
+
+def test_negative_budget_is_rejected():
+    planner = RetentionPlanner().update(customers(10, seed=7))
+    with pytest.raises(ValueError, match="Budget must be 0 or more"):
+        planner.solve(-1)
+
+
+def test_remaining_tenure_follows_contract():
+    frame = pd.DataFrame({"Contract": ["Month-to-month", "One year", "Two year", None],
+                          "tenure": [5, 15, 24, 3]})
+    assert remaining_tenure(frame, 24).tolist() == [25, 33, 48, 24]
@@ -0,0 +1,22 @@
+"""Model versions of the same file name in different directories"""
+import os
+import shutil
+
+from churn_engine import ARTIFACT_PATH
+from churn_registry import ModelRegistry
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_same_name_in_two_directories(tmp_path):
+    app_dir, models = tmp_path / "app", tmp_path / "app" / "models"
+    models.mkdir(parents=True)
+    shutil.copy(os.path.join(HERE, ARTIFACT_PATH), app_dir / ARTIFACT_PATH)
+    shutil.copy(os.path.join(HERE, ARTIFACT_PATH), models / ARTIFACT_PATH)
+
+    registry = ModelRegistry(str(models), default_directory=str(app_dir))
+    registry.refresh()
+    paths = {str(app_dir / ARTIFACT_PATH), str(models / ARTIFACT_PATH)}
+    assert {version.path for version in registry.versions} == paths
+    assert all(registry.get(path).path == path for path in paths)
+    assert sorted(registry.labels.values()) == [f"app/{ARTIFACT_PATH}", f"models/{ARTIFACT_PATH}"]
@@ -0,0 +1,81 @@
+"""Incremental rescoring through a ScoreStore"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_customers
+from churn_engine import MODEL_PATH, TOP_DRIVERS, FeatureEncoder, build_scorer, load_pipeline
+from churn_store import ScoreStore
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL, SCALER, FEATURE_COLS = load_pipeline(os.path.join(HERE, MODEL_PATH))
+SCORER = build_scorer(MODEL, SCALER, FEATURE_COLS)
+ENCODER = FeatureEncoder(FEATURE_COLS)
+
+
+def score(path, frame, digest="model-a"):
+    """(scored frame, store) after scoring `frame` through the store at `path` and saving it"""
+    store = ScoreStore(str(path), digest, SCORER, TOP_DRIVERS)
+    scored = store.score_frame(frame.copy(), ENCODER.transform)
+    store.save()
+    return scored, store
+
+
+def test_unchanged_rows_are_reused(tmp_path):
+    path = tmp_path / "scores.arrow"
+    customers = make_customers(200, seed=3)
+    first, store = score(path, customers)
+    assert (store.reused, store.scored) == (0, 200)
+
+    again, store = score(path, customers)
+    assert (store.reused, store.scored) == (200, 0)
+    pd.testing.assert_frame_equal(again, first)
+
+
+def test_changed_inputs_are_rescored(tmp_path):
+    path = tmp_path / "scores.arrow"
+    customers = make_customers(200, seed=3)
+    score(path, customers)
+
+    changed = customers.copy()
+    changed.loc[5, "MonthlyCharges"] += 0.01
+    changed.loc[7, "Contract"] = "Two year" if changed.loc[7, "Contract"] != "Two year" else "Month-to-month"
+    scored, store = score(path, changed)
+    assert (store.reused, store.scored) == (198, 2)
+
+    fresh, _ = score(tmp_path / "fresh.arrow", changed)
+    assert np.allclose(scored["Churn_Probability"], fresh["Churn_Probability"], rtol=0, atol=1e-12)
+    derived = fresh.columns.difference([*changed.columns, "Churn_Probability"])
+    pd.testing.assert_frame_equal(scored[derived], fresh[derived])
+
+
+def test_new_model_rebuilds_the_store(tmp_path):
+    path = tmp_path / "scores.arrow"
+    customers = make_customers(50, seed=3)
+    score(path, customers, digest="model-a")
+
+    _, store = score(path, customers, digest="model-b")
+    assert store.invalidated
+    assert (store.reused, store.scored) == (0, 50)
+
+    _, store = score(path, customers, digest="model-b")
+    assert not store.invalidated
+    assert (store.reused, store.scored) == (50, 0)
+
+
+def test_partial_upload_keeps_other_customers(tmp_path):
+    path = tmp_path / "scores.arrow"
+    customers = make_customers(100, seed=3)
+    score(path, customers)
+
+    _, store = score(path, customers.iloc[:30])
+    assert (store.reused, store.scored) == (30, 0)
+    changed = customers.iloc[60:70].copy()
+    changed["tenure"] += 1
+    score(path, changed)
+    assert len(ScoreStore(str(path), "model-a", SCORER, TOP_DRIVERS)) == 100
+
+    # Everyone is still stored: only the ten changed customers are rescored
+    _, store = score(path, customers)
+    assert (store.reused, store.scored) == (90, 10)